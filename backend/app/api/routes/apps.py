@@ -1,29 +1,128 @@
 """
 API routes for Docker Compose application management
 """
-from fastapi import APIRouter, HTTPException, Query
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import TypeAdapter
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import os
 import structlog
 
-from app.models.compose import ComposeApp, AppActionRequest, ResourceUsage, DiscoverAppsRequest
-from app.services.docker_service import docker_service
+from app.core.config import settings
+
+from app.models.compose import (
+    APP_SUMMARY_EXCLUDE, AppState, ComposeApp, ComposeAppUpdate, AppActionRequest, BatchActionRequest, ResourceUsage, DiscoverAppsRequest, LogEntry
+)
+from app.services.async_docker import async_docker_service, DockerTimeoutError
 from app.services.compose_service import compose_service
+from app.services.batch_actions import plan_batch, run_batch, DependencyCycleError
+from app.services.job_queue import job_queue
+from app.services.port_inventory import port_inventory
+from app.services.docker_service import sum_resource_usage
+from app.services.stats_sampler import resource_sampler
+from app.services.log_streamer import log_broadcaster
+from app.services.app_registry import app_registry
+from app.services.docker_events import docker_event_subscriber
+from app.services.discovery_index import compose_index
 
 logger = structlog.get_logger()
 
 router = APIRouter()
 
-# In-memory storage (will be replaced with persistent storage in v1.1)
-discovered_apps: dict[str, ComposeApp] = {}
+
+SORT_KEYS = {
+    "name": lambda app: app.name.lower(),
+    "cpu": lambda app: -app.cpu_percent,
+    "memory": lambda app: -app.memory_mb,
+}
+
+# Field projections for the app listing
+PROJECTIONS = {
+    "full": None,
+    "summary": APP_SUMMARY_EXCLUDE,
+}
+
+MAX_PAGE_SIZE = 500
+
+_apps_adapter = TypeAdapter(List[ComposeApp])
+# Serialised listings by ETag, shared by every client polling the same view
+_listing_cache: "OrderedDict[str, Tuple[bytes, str]]" = OrderedDict()
+_LISTING_CACHE_SIZE = 32
 
 
 @router.get("/", response_model=List[ComposeApp])
-async def list_apps():
-    """List all discovered Docker Compose applications"""
+async def list_apps(
+    request: Request,
+    sort: Optional[str] = Query(None, pattern="^(name|cpu|memory)$"),
+    state: Optional[List[AppState]] = Query(None),
+    name_prefix: Optional[str] = None,
+    path: Optional[str] = Query(None, description="Only apps located in or below this directory"),
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    fields: str = Query("full", pattern="^(full|summary)$")
+):
+    """
+    List discovered Docker Compose applications.
+
+    Supports filtering, pagination (the unpaginated count is returned in
+    `X-Total-Count`) and a `summary` projection without service environment
+    and volumes. Responses carry an ETag derived from the registry
+    generation and the sampler's usage generation, which moves only when
+    the rendered CPU and memory figures change, and `If-None-Match`
+    revalidation answers 304 without touching the apps.
+    """
+    # Return cached apps (empty if not discovered yet)
+    # User must click "Discover Apps" button to scan, unless the
+    # compose watcher is enabled and keeping the registry live
+    params = json.dumps([sort, sorted(state or []), name_prefix, path, offset, limit, fields])
+    version = f"{app_registry.generation}-{resource_sampler.usage_generation}-{params}"
+    etag = f'W/"{hashlib.sha1(version.encode()).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+
+    cached = _listing_cache.get(etag)
+    if cached is not None:
+        _listing_cache.move_to_end(etag)
+        body, total = cached
+        return Response(content=body, media_type="application/json", headers={**headers, "X-Total-Count": total})
+
     try:
-        # Return cached apps (empty if not discovered yet)
-        # User must click "Discover Apps" button to scan
-        return list(discovered_apps.values())
+        apps = app_registry.list_by_state(state[0]) if state and len(state) == 1 else app_registry.list()
+        if state:
+            apps = [app for app in apps if app.state in state]
+        if name_prefix:
+            prefix = name_prefix.lower()
+            apps = [app for app in apps if app.name.lower().startswith(prefix)]
+        if path:
+            directory = os.path.abspath(path)
+            below = directory.rstrip(os.sep) + os.sep
+            apps = [app for app in apps if app.path == directory or app.path.startswith(below)]
+        total = str(len(apps))
+
+        # Resource figures come from the sampler's cache, never a live stats call;
+        # only the returned page needs them unless they decide the order
+        if sort in ("cpu", "memory"):
+            resource_sampler.apply_usage(apps)
+        if sort:
+            apps.sort(key=SORT_KEYS[sort])
+        page = apps[offset:offset + limit if limit else None]
+        if sort not in ("cpu", "memory"):
+            resource_sampler.apply_usage(page)
+
+        exclude = PROJECTIONS[fields]
+        body = _apps_adapter.dump_json(page, exclude={"__all__": exclude} if exclude else None)
+        _listing_cache[etag] = (body, total)
+        while len(_listing_cache) > _LISTING_CACHE_SIZE:
+            _listing_cache.popitem(last=False)
+
+        return Response(content=body, media_type="application/json", headers={**headers, "X-Total-Count": total})
     except Exception as e:
         logger.error("list_apps_failed", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
@@ -34,19 +133,26 @@ async def refresh_apps(request: DiscoverAppsRequest = DiscoverAppsRequest()):
     """Discover/refresh Docker Compose applications"""
     try:
         logger.info("discovering_apps", search_paths=request.search_paths)
-        apps = docker_service.discover_compose_apps(request.search_paths)
+        # Concurrent identical discoveries share one scan
+        generation = app_registry.generation
+        apps = await async_docker_service.discover_compose_apps(request.search_paths)
 
-        # Update cache
-        discovered_apps.clear()
-        for app in apps:
-            discovered_apps[app.id] = app
+        # Update cache, keeping apps that changed while the scan ran
+        app_registry.replace_all(apps, since=generation)
 
         logger.info("apps_discovered", count=len(apps))
         return {
             "status": "success",
             "count": len(apps),
-            "apps": apps
+            "apps": apps,
+            "slowest_parses": [
+                {"path": entry.path, "parse_ms": entry.parse_ms, "size": entry.size}
+                for entry in compose_index.slowest(5)
+            ]
         }
+    except DockerTimeoutError as e:
+        logger.error("discover_apps_timed_out", error=str(e))
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         logger.error("discover_apps_failed", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
@@ -55,88 +161,305 @@ async def refresh_apps(request: DiscoverAppsRequest = DiscoverAppsRequest()):
 @router.get("/{app_id}", response_model=ComposeApp)
 async def get_app(app_id: str):
     """Get details of a specific application"""
-    if app_id not in discovered_apps:
+    app = app_registry.get(app_id)
+    if app is None:
         raise HTTPException(status_code=404, detail=f"App {app_id} not found")
 
-    return discovered_apps[app_id]
+    resource_sampler.apply_usage([app])
+    return app
+
+
+@router.patch("/{app_id}", response_model=ComposeApp)
+async def update_app(app_id: str, request: ComposeAppUpdate):
+    """Update an application's DockPilot settings"""
+    if app_id not in app_registry:
+        raise HTTPException(status_code=404, detail=f"App {app_id} not found")
+    if request.environment is not None:
+        raise HTTPException(status_code=400, detail="Updating environment is not supported")
+
+    if request.auto_start is not None:
+        app_registry.set_auto_start(app_id, request.auto_start)
+    app = app_registry.get(app_id)
+    resource_sampler.apply_usage([app])
+    return app
 
 
 @router.post("/{app_id}/action")
 async def perform_action(app_id: str, request: AppActionRequest):
-    """Perform an action on an application (start, stop, restart, rebuild)"""
-    if app_id not in discovered_apps:
+    """
+    Perform an action on an application (start, stop, restart, rebuild, pull).
+
+    Rebuild and pull can take minutes; they are queued as background jobs
+    and answered with 202 and a `job_id` to follow under /api/jobs. Start
+    answers 409 with the conflicting ports when a host port the app
+    declares is already held by something else, unless `force` is set.
+    """
+    app = app_registry.get(app_id)
+    if app is None:
         raise HTTPException(status_code=404, detail=f"App {app_id} not found")
 
-    app = discovered_apps[app_id]
     action = request.action.lower()
+    if action not in compose_service.ACTIONS:
+        raise HTTPException(status_code=400, detail=f"Invalid action: {action}")
 
-    try:
-        if action == "start":
-            result = await compose_service.start_app(app)
-        elif action == "stop":
-            result = await compose_service.stop_app(app)
-        elif action == "restart":
-            result = await compose_service.restart_app(app)
-        elif action == "rebuild":
-            result = await compose_service.rebuild_app(app)
-        elif action == "pull":
-            result = await compose_service.pull_images(app)
-        else:
-            raise HTTPException(status_code=400, detail=f"Invalid action: {action}")
-
-        # Refresh app state after action
-        await refresh_apps()
+    if action == "start" and not request.force:
+        conflicts = await port_inventory.conflicts_for(app)
+        if conflicts:
+            raise HTTPException(
+                status_code=409,
+                detail={"message": f"Ports needed by {app.name} are already in use", "conflicts": conflicts}
+            )
 
+    if action in compose_service.JOB_ACTIONS:
+        job = job_queue.submit(app, action, after=_refresh_after_action)
+        return JSONResponse(
+            status_code=202,
+            content={"status": "accepted", "message": f"Queued {action} of {app.name}", "job_id": job.id}
+        )
+
+    try:
+        result = await compose_service.run_action(app, action)
+        await _refresh_after_action(app)
         return result
     except Exception as e:
         logger.error("action_failed", app_id=app_id, action=action, error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/actions/batch")
+async def perform_batch_action(request: BatchActionRequest):
+    """
+    Perform an action on several applications concurrently.
+
+    At most `parallelism` apps are acted on at once. With
+    `respect_dependencies`, apps wait for the apps named in their
+    `x-dockpilot.depends_on` (reversed for stop), and are skipped if one of
+    those fails. A start fails for an app whose declared host ports are
+    already in use (its result lists the conflicts), unless `force` is set.
+    Results are returned in completion order, or streamed as NDJSON when
+    `stream` is set.
+    """
+    action = request.action.lower()
+    if action not in compose_service.ACTIONS:
+        raise HTTPException(status_code=400, detail=f"Invalid action: {action}")
+
+    app_ids = list(dict.fromkeys(request.app_ids))
+    missing = [app_id for app_id in app_ids if app_id not in app_registry]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Apps not found: {', '.join(missing)}")
+    apps = [app_registry.get(app_id) for app_id in app_ids]
+
+    try:
+        waits = plan_batch(apps, action, request.respect_dependencies)
+    except DependencyCycleError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    parallelism = min(request.parallelism or settings.BATCH_ACTION_PARALLELISM, settings.BATCH_ACTION_MAX_PARALLELISM)
+    results = run_batch(
+        apps, action, waits, parallelism,
+        after=_refresh_after_action,
+        check_ports=action == "start" and not request.force
+    )
+
+    if request.stream:
+        async def lines():
+            async for result in results:
+                yield json.dumps(result) + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    completed = [result async for result in results]
+    return {
+        "action": action,
+        "results": completed,
+        "succeeded": sum(1 for r in completed if r["status"] == "success"),
+        "failed": sum(1 for r in completed if r["status"] == "error"),
+        "skipped": sum(1 for r in completed if r["status"] == "skipped"),
+    }
+
+
+async def _refresh_after_action(app: ComposeApp) -> None:
+    # Container state changes arrive through the Docker events stream;
+    # without it, re-resolve just this app rather than rediscovering everything
+    if not docker_event_subscriber.connected:
+        refreshed = await async_docker_service.refresh_compose_file(os.path.join(app.path, app.compose_file))
+        if refreshed:
+            app_registry.upsert(refreshed)
+
+
 @router.get("/{app_id}/stats")
 async def get_app_stats(app_id: str):
     """Get resource usage statistics for an application"""
-    if app_id not in discovered_apps:
+    app = app_registry.get(app_id)
+    if app is None:
         raise HTTPException(status_code=404, detail=f"App {app_id} not found")
 
-    app = discovered_apps[app_id]
-
     try:
+        services = [s for s in app.services if s.container_id]
+
+        # Serve from the background sampler; fetch live only what it lacks
+        usage = {s.container_id: resource_sampler.latest(s.container_id) for s in services}
+        missing = [container_id for container_id, u in usage.items() if u is None]
+        if missing:
+            usage.update(await async_docker_service.get_containers_stats(missing))
+
         stats = []
-        for service in app.services:
-            if service.container_id:
-                service_stats = docker_service.get_container_stats(service.container_id)
-                if service_stats:
-                    stats.append({
-                        "service": service.name,
-                        "stats": service_stats
-                    })
+        for service in services:
+            service_stats = usage.get(service.container_id)
+            if service_stats:
+                stats.append({
+                    "service": service.name,
+                    "stats": service_stats
+                })
 
         return {
             "app_id": app_id,
             "app_name": app.name,
-            "stats": stats
+            "stats": stats,
+            "total": sum_resource_usage([s["stats"] for s in stats])
         }
     except Exception as e:
         logger.error("get_stats_failed", app_id=app_id, error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/{app_id}/stats/history")
+async def get_app_stats_history(
+    app_id: str,
+    limit: Optional[int] = Query(None, ge=1)
+):
+    """Get sampled resource usage history for an application's services"""
+    app = app_registry.get(app_id)
+    if app is None:
+        raise HTTPException(status_code=404, detail=f"App {app_id} not found")
+
+    services = []
+    for service in app.services:
+        if service.container_id:
+            history = resource_sampler.history(service.container_id, limit)
+            if history:
+                services.append({
+                    "service": service.name,
+                    "container_id": service.container_id,
+                    "history": history
+                })
+
+    return {
+        "app_id": app_id,
+        "app_name": app.name,
+        "interval": resource_sampler.interval,
+        "services": services
+    }
+
+
 @router.get("/{app_id}/logs")
 async def get_app_logs(
+    request: Request,
     app_id: str,
     tail: int = Query(100, ge=1, le=10000),
     follow: bool = False
 ):
     """Get logs for an application"""
-    if app_id not in discovered_apps:
+    app = app_registry.get(app_id)
+    if app is None:
         raise HTTPException(status_code=404, detail=f"App {app_id} not found")
 
-    app = discovered_apps[app_id]
+    if follow:
+        # `compose logs -f` never exits; follow through the streaming endpoint instead
+        return await stream_app_logs(request, app_id, tail=min(tail, 1000), service=None, stream=None)
 
     try:
-        result = await compose_service.get_app_logs(app, tail=tail, follow=follow)
+        result = await compose_service.get_app_logs(app, tail=tail)
         return result
     except Exception as e:
         logger.error("get_logs_failed", app_id=app_id, error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{app_id}/logs/stream")
+async def stream_app_logs(
+    request: Request,
+    app_id: str,
+    tail: int = Query(0, ge=0, le=1000),
+    service: Optional[List[str]] = Query(None),
+    stream: Optional[str] = Query(None, pattern="^(stdout|stderr)$")
+):
+    """
+    Stream logs of every container in an application as Server-Sent Events.
+
+    Emits `log` events carrying a LogEntry, `dropped` events when this client
+    fell behind and lines were skipped, and `end` events when a container's
+    stream finishes. `stream` limits output to stdout or stderr.
+    """
+    app = app_registry.get(app_id)
+    if app is None:
+        raise HTTPException(status_code=404, detail=f"App {app_id} not found")
+
+    containers = [
+        (s.container_id, s.name) for s in app.services
+        if s.container_id and (not service or s.name in service)
+    ]
+    # Subscribe before fetching the backlog so no line falls between the two
+    subscriber = log_broadcaster.subscribe(containers)
+
+    backlog: List[LogEntry] = []
+    # Newest backlog timestamp per service; live lines up to it were already sent
+    seen: Dict[str, str] = {}
+    if tail:
+        try:
+            results = await asyncio.gather(*(
+                async_docker_service.get_container_logs(container_id, tail=tail, stream=stream)
+                for container_id, _ in containers
+            ))
+        except BaseException:
+            # Timeouts and client disconnects would otherwise leak the followers
+            log_broadcaster.unsubscribe(subscriber)
+            raise
+        for (_, name), entries in zip(containers, results):
+            for entry in entries:
+                entry.service = name
+                backlog.append(entry)
+            if entries:
+                # Timestamps use a fixed-width format, so they compare as strings
+                seen[name] = max(entry.timestamp for entry in entries)
+        backlog.sort(key=lambda entry: entry.timestamp)
+
+    async def events():
+        try:
+            for entry in backlog:
+                yield _sse("log", entry.model_dump_json())
+            while True:
+                try:
+                    event, payload = await asyncio.wait_for(
+                        subscriber.queue.get(),
+                        timeout=settings.LOG_STREAM_KEEPALIVE
+                    )
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+
+                dropped = subscriber.take_dropped()
+                if dropped:
+                    yield _sse("dropped", json.dumps({"count": dropped}))
+                if event == "log":
+                    last = seen.get(payload.service)
+                    if last is not None and payload.timestamp <= last:
+                        continue
+                    if stream is None or payload.stream == stream:
+                        yield _sse(event, payload.model_dump_json())
+                else:
+                    yield _sse(event, json.dumps(payload))
+        finally:
+            log_broadcaster.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _sse(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
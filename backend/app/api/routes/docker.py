@@ -4,7 +4,7 @@ API routes for Docker engine information
 from fastapi import APIRouter, HTTPException
 import structlog
 
-from app.services.docker_service import docker_service
+from app.services.engine_probe import engine_probe
 
 logger = structlog.get_logger()
 
@@ -13,13 +13,20 @@ router = APIRouter()
 
 @router.get("/info")
 async def get_docker_info():
-    """Get Docker engine information"""
+    """Get Docker engine information, as last fetched by the engine probe"""
     try:
-        if not docker_service.is_docker_available():
+        engine = await engine_probe.status()
+        if not engine["available"]:
             raise HTTPException(status_code=503, detail="Docker engine is not available")
+        if engine["info"] is None:
+            raise HTTPException(status_code=503, detail="Docker engine information is not available yet")
 
-        info = docker_service.get_docker_info()
-        return info
+        return {
+            "version": engine["version"],
+            "info": engine["info"]
+        }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error("get_docker_info_failed", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
@@ -27,12 +34,23 @@ async def get_docker_info():
 
 @router.get("/status")
 async def get_docker_status():
-    """Check if Docker engine is available"""
+    """
+    Check if Docker engine is available. `status` is healthy, degraded
+    (failed or slow pings, or the events stream is down), unavailable (the
+    probe's circuit is open) or unknown (not probed yet).
+    """
     try:
-        available = docker_service.is_docker_available()
+        engine = await engine_probe.status()
         return {
-            "available": available,
-            "status": "healthy" if available else "unavailable"
+            "available": engine["available"],
+            "status": engine["status"],
+            "circuit": engine["circuit"],
+            "latency_ms": engine["latency_ms"],
+            "consecutive_failures": engine["consecutive_failures"],
+            "last_error": engine["last_error"],
+            "checked_at": engine["checked_at"],
+            "last_success_at": engine["last_success_at"],
+            "events_connected": engine["events_connected"]
         }
     except Exception as e:
         logger.error("get_docker_status_failed", error=str(e))
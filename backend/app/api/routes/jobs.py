@@ -0,0 +1,119 @@
+"""
+API routes for background compose jobs
+"""
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+import asyncio
+import json
+import structlog
+
+from app.core.config import settings
+from app.models.compose import Job
+from app.services.job_queue import job_queue, FINISHED_STATES
+
+logger = structlog.get_logger()
+
+router = APIRouter()
+
+
+@router.get("/", response_model=List[Job])
+async def list_jobs(app_id: Optional[str] = None):
+    """List recent jobs, newest first"""
+    return job_queue.list(app_id)
+
+
+@router.get("/{job_id}", response_model=Job)
+async def get_job(job_id: str):
+    """Get a job's status and progress"""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+
+@router.get("/{job_id}/output")
+async def get_job_output(job_id: str, since: int = Query(0, ge=0)):
+    """Get a job's output lines numbered `since` and later"""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return {
+        "job_id": job_id,
+        "status": job.status,
+        "lines": job_queue.output(job_id, since),
+        "next": job.output_lines
+    }
+
+
+@router.post("/{job_id}/cancel", response_model=Job)
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job"""
+    if job_queue.get(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    job = job_queue.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=409, detail=f"Job {job_id} already finished")
+    return job
+
+
+@router.get("/{job_id}/events")
+async def stream_job_events(request: Request, job_id: str, since: int = Query(0, ge=0)):
+    """
+    Stream a job as Server-Sent Events: kept `output` lines from `since`
+    first, then live `output`, `progress` and `status` events. The stream
+    ends after the job finishes.
+    """
+    subscriber = job_queue.subscribe(job_id)
+    if subscriber is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    job = job_queue.get(job_id)
+    backlog = job_queue.output(job_id, since)
+
+    async def events():
+        try:
+            yield _sse("status", job.model_dump_json())
+            sent = since
+            for line in backlog:
+                yield _sse("output", json.dumps(line))
+                sent = line["line"] + 1
+            if job.status in FINISHED_STATES:
+                return
+
+            while True:
+                try:
+                    event, payload = await asyncio.wait_for(
+                        subscriber.queue.get(),
+                        timeout=settings.LOG_STREAM_KEEPALIVE
+                    )
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+
+                dropped = subscriber.take_dropped()
+                if dropped:
+                    yield _sse("dropped", json.dumps({"count": dropped}))
+                if event == "output":
+                    # Skip lines already sent from the backlog
+                    if payload["line"] >= sent:
+                        yield _sse(event, json.dumps(payload))
+                elif event == "status":
+                    yield _sse(event, payload.model_dump_json())
+                    if payload.status in FINISHED_STATES:
+                        break
+                else:
+                    yield _sse(event, json.dumps(payload))
+        finally:
+            job_queue.unsubscribe(job_id, subscriber)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _sse(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
@@ -2,11 +2,16 @@
 API routes for log management
 """
 from fastapi import APIRouter, HTTPException, Query
-from typing import List
+from datetime import datetime
+from typing import List, Optional
+import asyncio
+import re
 import structlog
 
+from app.core.config import settings
 from app.models.compose import LogEntry
-from app.services.docker_service import docker_service
+from app.services.async_docker import async_docker_service, DockerTimeoutError
+from app.services.log_store import log_store
 
 logger = structlog.get_logger()
 
@@ -16,12 +21,56 @@ router = APIRouter()
 @router.get("/container/{container_id}")
 async def get_container_logs(
     container_id: str,
-    tail: int = Query(100, ge=1, le=10000)
+    tail: int = Query(100, ge=1, le=10000),
+    stream: Optional[str] = Query(None, pattern="^(stdout|stderr)$")
 ) -> List[LogEntry]:
-    """Get logs from a specific container"""
+    """Get logs from a specific container, optionally only stdout or stderr"""
     try:
-        logs = docker_service.get_container_logs(container_id, tail=tail)
+        logs = await async_docker_service.get_container_logs(container_id, tail=tail, stream=stream)
         return logs
+    except DockerTimeoutError as e:
+        logger.error("get_container_logs_timed_out", container_id=container_id, error=str(e))
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         logger.error("get_container_logs_failed", container_id=container_id, error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/search")
+async def search_logs(
+    app_id: Optional[str] = None,
+    container_id: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    q: Optional[List[str]] = Query(None),
+    regex: Optional[str] = None,
+    stream: Optional[str] = Query(None, pattern="^(stdout|stderr)$"),
+    limit: int = Query(settings.MAX_LOG_LINES, ge=1, le=settings.MAX_LOG_LINES)
+):
+    """
+    Search stored container logs, oldest first. Every `q` term must appear
+    in a line (case-insensitive); `regex`, if given, must match it.
+    """
+    try:
+        pattern = re.compile(regex) if regex else None
+    except re.error as e:
+        raise HTTPException(status_code=400, detail=f"Invalid regex: {e}")
+
+    try:
+        # Segment reads are file I/O; keep them off the event loop
+        return await asyncio.get_running_loop().run_in_executor(
+            None,
+            lambda: log_store.search(
+                app_id=app_id,
+                container_id=container_id,
+                start=start,
+                end=end,
+                terms=q,
+                pattern=pattern,
+                stream=stream,
+                limit=limit
+            )
+        )
+    except Exception as e:
+        logger.error("search_logs_failed", app_id=app_id, error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,10 +1,12 @@
 """
 API routes for system information and resources
 """
-from fastapi import APIRouter, HTTPException
-import psutil
+from fastapi import APIRouter, HTTPException, Query
 import structlog
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+
+from app.services.port_inventory import port_inventory
+from app.services.system_metrics import system_metrics
 
 logger = structlog.get_logger()
 
@@ -13,50 +15,42 @@ router = APIRouter()
 
 @router.get("/info")
 async def get_system_info() -> Dict[str, Any]:
-    """Get system information"""
+    """Get system information from the latest host metrics sample"""
     try:
-        cpu_percent = psutil.cpu_percent(interval=1)
-        memory = psutil.virtual_memory()
-        disk = psutil.disk_usage('/')
-
-        return {
-            "cpu": {
-                "count": psutil.cpu_count(),
-                "percent": cpu_percent,
-            },
-            "memory": {
-                "total_mb": memory.total / (1024 * 1024),
-                "available_mb": memory.available / (1024 * 1024),
-                "used_mb": memory.used / (1024 * 1024),
-                "percent": memory.percent,
-            },
-            "disk": {
-                "total_gb": disk.total / (1024 * 1024 * 1024),
-                "used_gb": disk.used / (1024 * 1024 * 1024),
-                "free_gb": disk.free / (1024 * 1024 * 1024),
-                "percent": disk.percent,
-            },
-            "platform": psutil.os.name,
-        }
+        return await system_metrics.info()
     except Exception as e:
         logger.error("get_system_info_failed", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/history")
+async def get_system_history(limit: Optional[int] = Query(None, ge=1)) -> Dict[str, Any]:
+    """Get sampled host metrics history, oldest first"""
+    return {
+        "interval": system_metrics.interval,
+        "cores": system_metrics.cores,
+        "history": system_metrics.history(limit),
+    }
+
+
 @router.get("/ports")
-async def get_open_ports():
-    """Get list of open network ports"""
+async def get_open_ports(conflicts_only: bool = False):
+    """
+    Get host ports in use or declared by compose services, with the
+    containers holding them and the apps declaring them. Served from the
+    port inventory, which rescans in the background.
+    """
     try:
-        connections = psutil.net_connections(kind='inet')
-        ports = set()
-
-        for conn in connections:
-            if conn.laddr and conn.status == 'LISTEN':
-                ports.add(conn.laddr.port)
+        entries = await port_inventory.entries()
+        in_use = sorted({e["port"] for e in entries if e["listening"] or e["containers"]})
+        conflicts = [e for e in entries if e["conflict"]]
 
         return {
-            "ports": sorted(list(ports)),
-            "count": len(ports)
+            "ports": in_use,
+            "count": len(in_use),
+            "conflicts": len(conflicts),
+            "entries": conflicts if conflicts_only else entries,
+            "scanned_at": port_inventory.scanned_at,
         }
     except Exception as e:
         logger.error("get_open_ports_failed", error=str(e))
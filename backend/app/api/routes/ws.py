@@ -0,0 +1,61 @@
+"""
+WebSocket channel for live dashboard updates
+"""
+import asyncio
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+import structlog
+
+from app.services.event_hub import event_hub
+
+logger = structlog.get_logger()
+
+router = APIRouter()
+
+
+@router.websocket("")
+async def dashboard_updates(websocket: WebSocket):
+    """
+    Push dashboard updates: a `snapshot` first, then `apps`, `usage`,
+    `system` and `engine` deltas as they happen. A client that falls too far
+    behind is sent a fresh snapshot instead of the deltas it missed.
+    """
+    await websocket.accept()
+    subscriber, snapshot = event_hub.subscribe()
+
+    async def drain_client():
+        # Nothing is expected from the client; reading notices when it goes away
+        while True:
+            await websocket.receive_text()
+
+    client = asyncio.create_task(drain_client())
+    try:
+        await websocket.send_text(snapshot)
+        while True:
+            message = asyncio.ensure_future(subscriber.queue.get())
+            done, _ = await asyncio.wait({message, client}, return_when=asyncio.FIRST_COMPLETED)
+            if client in done:
+                message.cancel()
+                break
+
+            text = message.result()
+            if text is None:
+                # The hub is shutting down
+                break
+            if subscriber.take_dropped():
+                # Everything still queued is covered by the snapshot
+                while not subscriber.queue.empty() and text is not None:
+                    text = subscriber.queue.get_nowait()
+                if text is None:
+                    break
+                text = event_hub.snapshot()
+            await websocket.send_text(text)
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.warning("dashboard_updates_failed", error=str(e))
+    finally:
+        event_hub.unsubscribe(subscriber)
+        client.cancel()
+        if client.done() and not client.cancelled():
+            client.exception()
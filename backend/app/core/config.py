@@ -18,9 +18,45 @@ class Settings(BaseSettings):
     # In production, you should restrict this to specific domains
     CORS_ORIGINS: List[str] = ["*"]
 
+    # SQLite database holding the app registry
+    DATABASE_PATH: str = "data/dockpilot.db"
+    DATABASE_WRITE_DELAY: float = 0.5  # seconds changes are batched before a write
+
     # Docker Settings
     DOCKER_HOST: str = os.getenv("DOCKER_HOST", "unix:///var/run/docker.sock")
 
+    # Blocking Docker SDK calls run on a bounded thread pool
+    DOCKER_MAX_WORKERS: int = 16
+    DOCKER_CALL_TIMEOUT: float = 30.0  # seconds
+    DOCKER_DISCOVERY_TIMEOUT: float = 120.0  # seconds
+
+    # Patch container state from the Docker events stream instead of rediscovering
+    DOCKER_EVENTS_ENABLED: bool = True
+    DOCKER_EVENTS_MAX_BACKOFF: float = 30.0  # seconds between reconnect attempts
+    # Background engine probe serving /health and /api/docker/*
+    ENGINE_PROBE_INTERVAL: float = 5.0  # seconds between pings
+    ENGINE_PROBE_TIMEOUT: float = 5.0  # seconds per ping or info call
+    ENGINE_PROBE_TTL: float = 30.0  # older results are refreshed when asked for
+    ENGINE_PROBE_INFO_TTL: float = 60.0  # seconds between version/info fetches
+    ENGINE_PROBE_SLOW_MS: float = 500.0  # slower pings report the engine as degraded
+    ENGINE_PROBE_FAILURE_THRESHOLD: int = 3  # failed pings in a row that open the circuit
+    ENGINE_PROBE_MAX_BACKOFF: float = 60.0  # seconds between pings while the circuit is open
+
+    # Batch actions
+    BATCH_ACTION_PARALLELISM: int = 4  # default apps acted on at once
+    BATCH_ACTION_MAX_PARALLELISM: int = 16
+
+    # Background jobs for long compose operations (rebuild, pull)
+    JOB_WORKERS: int = 2
+    JOB_HISTORY_SIZE: int = 100  # finished jobs kept for polling
+    JOB_OUTPUT_LINES: int = 2000  # output lines kept per job
+    COMPOSE_IDLE_TIMEOUT: float = 900.0  # stop a job after this long without output; 0 disables
+
+    # Run start/stop/restart on existing containers through the Engine API,
+    # falling back to the compose CLI when the project needs reconciling
+    COMPOSE_FAST_PATH_ENABLED: bool = True
+    COMPOSE_FAST_PATH_TIMEOUT: float = 120.0  # seconds per container
+
     # App Discovery Settings
     SEARCH_PATHS: List[str] = [
         "/host/Development",
@@ -30,13 +66,53 @@ class Settings(BaseSettings):
         "/opt/apps",
         "/opt/docker",
     ]
+    # Directory names never descended into while looking for compose files
+    DISCOVERY_IGNORE_DIRS: List[str] = [
+        "node_modules",
+        ".git",
+        ".hg",
+        ".svn",
+        "__pycache__",
+        ".venv",
+        "venv",
+        ".tox",
+        ".cache",
+    ]
+    # Keep discovered apps live by watching SEARCH_PATHS (inotify, else polling)
+    DISCOVERY_WATCH_ENABLED: bool = False
+    DISCOVERY_WATCH_POLL_INTERVAL: float = 5.0  # seconds, polling fallback only
+    # Compose files are parsed on a thread pool with the libyaml loader if available
+    DISCOVERY_PARSE_WORKERS: int = 4
+    DISCOVERY_PARSE_TIMEOUT: float = 10.0  # seconds per file
+    DISCOVERY_MAX_FILE_SIZE: int = 1024 * 1024  # bytes, larger files are skipped
+    DISCOVERY_SLOW_PARSE_MS: float = 200.0  # log parses slower than this
 
     # Resource Monitoring
     RESOURCE_POLL_INTERVAL: int = 2  # seconds
+    STATS_MAX_CONCURRENCY: int = 8  # concurrent stats calls per request
+    STATS_SAMPLER_ENABLED: bool = True
+    STATS_SAMPLER_MAX_STREAMS: int = 256
+    STATS_HISTORY_SIZE: int = 300  # samples kept per container
+    STATS_CACHE_MAX_AGE: float = 10.0  # seconds before a sample is considered stale
+    SYSTEM_METRICS_INTERVAL: float = 2.0  # seconds between host samples
+    SYSTEM_METRICS_HISTORY_SIZE: int = 300  # host samples kept
+    SYSTEM_METRICS_DISK_PATH: str = "/"  # filesystem reported as the host disk
+    PORT_INVENTORY_INTERVAL: float = 10.0  # seconds between listening socket scans
+
+    # Dashboard updates pushed over the /api/ws WebSocket
+    EVENT_HUB_INTERVAL: float = 1.0  # seconds between change checks
+    EVENT_HUB_QUEUE_SIZE: int = 100  # per-client backlog before it is resynced
 
     # Log Settings
     LOG_RETENTION_DAYS: int = 7
     MAX_LOG_LINES: int = 1000
+    LOG_STREAM_QUEUE_SIZE: int = 1000  # per-viewer buffer before oldest lines are dropped
+    LOG_STREAM_MAX_FOLLOWERS: int = 128  # containers followed at once
+    LOG_STREAM_KEEPALIVE: float = 15.0  # seconds between SSE keepalive comments
+    LOG_STORE_ENABLED: bool = True  # ingest container output for /api/logs/search
+    LOG_STORE_PATH: str = "data/logs"
+    LOG_STORE_FLUSH_INTERVAL: float = 5.0  # seconds between segment writes
+    LOG_STORE_MAX_TOKENS: int = 20000  # per-segment token index size before it is dropped
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,179 @@
+"""
+Prometheus metrics: HTTP routes, Docker Engine API calls, compose commands,
+discovery phases and per-container resource usage
+"""
+import re
+import time
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, Metric
+
+MB = 1024 * 1024
+
+HTTP_REQUESTS = Counter(
+    "dockpilot_http_requests_total",
+    "HTTP requests handled, by route template and status",
+    ["method", "route", "status"]
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "dockpilot_http_request_duration_seconds",
+    "Time until the response started; streaming responses are not timed to their end",
+    ["method", "route"]
+)
+DOCKER_API_REQUESTS = Counter(
+    "dockpilot_docker_api_requests_total",
+    "Docker Engine API requests, by call and HTTP status",
+    ["call", "status"]
+)
+DOCKER_API_DURATION = Histogram(
+    "dockpilot_docker_api_request_duration_seconds",
+    "Docker Engine API time until the response headers arrived",
+    ["call"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+COMPOSE_COMMANDS = Counter(
+    "dockpilot_compose_commands_total",
+    "docker compose commands run, by action and exit code",
+    ["action", "exit_code"]
+)
+COMPOSE_COMMAND_DURATION = Histogram(
+    "dockpilot_compose_command_duration_seconds",
+    "docker compose command run time",
+    ["action"],
+    buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+)
+DISCOVERY_PHASE_DURATION = Histogram(
+    "dockpilot_discovery_phase_duration_seconds",
+    "Discovery time per phase: walk (including waiting for parses), parse "
+    "(summed over changed files), containers and resolve",
+    ["phase"]
+)
+COMPOSE_PARSE_DURATION = Histogram(
+    "dockpilot_compose_parse_duration_seconds",
+    "YAML parse time per changed compose file",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 10)
+)
+DOCKER_ENGINE_UP = Gauge(
+    "dockpilot_docker_engine_up",
+    "1 while the engine probe reaches the Docker daemon"
+)
+
+_API_VERSION = re.compile(r"^/v[\d.]+(?=/)")
+# Object names and ids would make a series per object
+_OBJECT_ID = re.compile(r"^/(containers|images|networks|volumes|exec|plugins)/(?!(?:json|create|prune)$)[^/]+")
+
+
+def docker_call_name(method: str, path: str) -> str:
+    """Call label for an Engine API request, e.g. `GET /containers/{id}/stats`"""
+    path = _API_VERSION.sub("", path.split("?", 1)[0])
+    path = _OBJECT_ID.sub(r"/\1/{id}", path)
+    return f"{method} {path}"
+
+
+def _observe_docker_response(response: Any, *args: Any, **kwargs: Any) -> None:
+    call = docker_call_name(response.request.method, response.request.path_url)
+    DOCKER_API_REQUESTS.labels(call, str(response.status_code)).inc()
+    DOCKER_API_DURATION.labels(call).observe(response.elapsed.total_seconds())
+
+
+def instrument_docker_client(api: Any) -> Any:
+    """Time every request a docker-py APIClient (a requests session) makes"""
+    api.hooks["response"].append(_observe_docker_response)
+    return api
+
+
+def observe_compose_command(action: str, exit_code: Any, seconds: float) -> None:
+    COMPOSE_COMMANDS.labels(action, str(exit_code)).inc()
+    COMPOSE_COMMAND_DURATION.labels(action).observe(seconds)
+
+
+class MetricsMiddleware:
+    """
+    Count and time every HTTP request by route template, so paths with ids
+    share a series. Requests no route matched are labelled `unmatched`.
+    """
+
+    def __init__(self, app: Callable):
+        self.app = app
+        self._routes: Optional[Dict[Callable, str]] = None
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_timed(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                HTTP_REQUEST_DURATION.labels(scope["method"], self._route(scope)).observe(
+                    time.perf_counter() - started
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            HTTP_REQUESTS.labels(scope["method"], self._route(scope), str(status)).inc()
+
+    def _route(self, scope: Dict[str, Any]) -> str:
+        # The router records the matched endpoint in the shared scope
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if self._routes is None:
+            self._routes = {
+                route.endpoint: route.path
+                for route in scope["app"].routes if hasattr(route, "endpoint")
+            }
+        return self._routes.get(endpoint, "unmatched")
+
+
+class ContainerUsageCollector:
+    """
+    Per-container resource usage, read from the stats sampler's cache at
+    scrape time for the containers of registered apps. Scrapes never call
+    the Docker daemon.
+    """
+
+    GAUGES = {
+        "cpu_percent": ("dockpilot_container_cpu_percent", "CPU usage percent", 1),
+        "memory_mb": ("dockpilot_container_memory_usage_bytes", "Memory usage", MB),
+        "memory_percent": ("dockpilot_container_memory_percent", "Memory usage percent of the limit", 1),
+        "memory_limit_mb": ("dockpilot_container_memory_limit_bytes", "Memory limit", MB),
+    }
+    COUNTERS = {
+        "network_rx_mb": ("dockpilot_container_network_receive_bytes", "Network bytes received", MB),
+        "network_tx_mb": ("dockpilot_container_network_transmit_bytes", "Network bytes sent", MB),
+        "disk_read_mb": ("dockpilot_container_block_read_bytes", "Block device bytes read", MB),
+        "disk_write_mb": ("dockpilot_container_block_write_bytes", "Block device bytes written", MB),
+    }
+    LABELS = ["app", "service", "container_id"]
+
+    def __init__(self, sampler: Any, registry: Any):
+        self.sampler = sampler
+        self.registry = registry
+
+    def collect(self) -> Iterator[Metric]:
+        families = {}
+        for field, (name, documentation, _) in self.GAUGES.items():
+            families[field] = GaugeMetricFamily(name, documentation, labels=self.LABELS)
+        for field, (name, documentation, _) in self.COUNTERS.items():
+            families[field] = CounterMetricFamily(name, documentation, labels=self.LABELS)
+        scales = {field: scale for field, (_, _, scale) in {**self.GAUGES, **self.COUNTERS}.items()}
+
+        for app in self.registry.list():
+            for service in app.services:
+                if not service.container_id:
+                    continue
+                usage = self.sampler.latest(service.container_id)
+                if usage is None:
+                    continue
+                labels = [app.name, service.name, service.container_id[:12]]
+                for field, family in families.items():
+                    family.add_metric(labels, getattr(usage, field) * scales[field])
+        yield from families.values()
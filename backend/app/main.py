@@ -2,13 +2,27 @@
 DockPilot Backend - FastAPI Application
 Main entry point for the Docker Compose orchestration API
 """
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
 import structlog
 
 from app.core.config import settings
-from app.api.routes import apps, docker, system, logs
+from app.core.metrics import ContainerUsageCollector, MetricsMiddleware
+from app.api.routes import apps, docker, system, logs, jobs, ws
+from app.services.app_registry import app_registry
+from app.services.app_watcher import compose_watcher
+from app.services.async_docker import async_docker_service
+from app.services.docker_events import docker_event_subscriber
+from app.services.engine_probe import engine_probe
+from app.services.event_hub import event_hub
+from app.services.job_queue import job_queue
+from app.services.log_store import log_ingester
+from app.services.port_inventory import port_inventory
+from app.services.stats_sampler import resource_sampler
+from app.services.system_metrics import system_metrics
 
 # Configure structured logging
 structlog.configure(
@@ -20,11 +34,48 @@ structlog.configure(
 
 logger = structlog.get_logger()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background services"""
+    try:
+        # Serve the apps known before the restart right away
+        app_registry.open(settings.DATABASE_PATH)
+    except Exception as e:
+        logger.error("app_registry_open_failed", path=settings.DATABASE_PATH, error=str(e))
+    await job_queue.start()
+    await engine_probe.start()
+    await system_metrics.start()
+    await port_inventory.start()
+    if settings.DISCOVERY_WATCH_ENABLED:
+        await compose_watcher.start()
+    if settings.DOCKER_EVENTS_ENABLED:
+        await docker_event_subscriber.start()
+    if settings.STATS_SAMPLER_ENABLED:
+        await resource_sampler.start()
+    if settings.LOG_STORE_ENABLED:
+        await log_ingester.start()
+    await event_hub.start()
+    yield
+    await event_hub.stop()
+    await log_ingester.stop()
+    await resource_sampler.stop()
+    await docker_event_subscriber.stop()
+    await compose_watcher.stop()
+    await job_queue.stop()
+    await port_inventory.stop()
+    await system_metrics.stop()
+    await engine_probe.stop()
+    async_docker_service.shutdown()
+    app_registry.close()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="DockPilot API",
     description="Docker Compose orchestration and management API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -34,28 +85,51 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Total-Count"],
 )
+app.add_middleware(MetricsMiddleware)
+
+# Container usage is exported from the stats sampler's cache when scraped
+REGISTRY.register(ContainerUsageCollector(resource_sampler, app_registry))
 
 # Include routers
 app.include_router(apps.router, prefix="/api/apps", tags=["apps"])
 app.include_router(docker.router, prefix="/api/docker", tags=["docker"])
 app.include_router(system.router, prefix="/api/system", tags=["system"])
 app.include_router(logs.router, prefix="/api/logs", tags=["logs"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["jobs"])
+app.include_router(ws.router, prefix="/api/ws", tags=["updates"])
 
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
+    """
+    Readiness check, answered from the engine probe's cache: 200 while the
+    Docker engine is reachable (healthy or degraded), 503 while it is not
+    """
     try:
-        # TODO: Add Docker engine connectivity check
+        engine = await engine_probe.status()
+        if engine["available"]:
+            status = "healthy" if engine["status"] == "healthy" else "degraded"
+        else:
+            status = "unhealthy"
         return JSONResponse(
             content={
-                "status": "healthy",
+                "status": status,
                 "version": "1.0.0",
                 "services": {
-                    "docker": "unknown"
+                    "docker": engine["status"]
+                },
+                "docker": {
+                    "circuit": engine["circuit"],
+                    "latency_ms": engine["latency_ms"],
+                    "consecutive_failures": engine["consecutive_failures"],
+                    "last_error": engine["last_error"],
+                    "checked_at": engine["checked_at"],
+                    "events_connected": engine["events_connected"]
                 }
-            }
+            },
+            status_code=200 if engine["available"] else 503
         )
     except Exception as e:
         logger.error("health_check_failed", error=str(e))
@@ -68,6 +142,12 @@ async def health_check():
         )
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics in the text exposition format"""
+    return Response(content=generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.get("/")
 async def root():
     """Root endpoint"""
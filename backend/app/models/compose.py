@@ -28,6 +28,7 @@ class ContainerState(str, Enum):
 
 class PortMapping(BaseModel):
     """Port mapping information"""
+    host_ip: Optional[str] = None  # None binds all interfaces
     host_port: int
     container_port: int
     protocol: str = "tcp"
@@ -63,6 +64,7 @@ class ComposeApp(BaseModel):
     name: str
     path: str
     compose_file: str
+    override_files: List[str] = []  # merged into compose_file, in order
     state: AppState
     services: List[ServiceInfo] = []
     networks: List[str] = []
@@ -70,10 +72,19 @@ class ComposeApp(BaseModel):
     created_at: Optional[str] = None
     updated_at: Optional[str] = None
     auto_start: bool = False
+    depends_on: List[str] = []  # names of apps to start before this one
     cpu_percent: float = 0.0
     memory_mb: float = 0.0
 
 
+# Fields left out of the summary view of an app: the bulky per-service details
+APP_SUMMARY_EXCLUDE = {
+    "networks": True,
+    "volumes": True,
+    "services": {"__all__": {"environment", "volumes"}},
+}
+
+
 class ComposeAppCreate(BaseModel):
     """Create a new compose app"""
     path: str
@@ -90,6 +101,41 @@ class ComposeAppUpdate(BaseModel):
 class AppActionRequest(BaseModel):
     """Request to perform an action on an app"""
     action: str = Field(..., description="Action to perform: start, stop, restart, rebuild")
+    force: bool = Field(False, description="Start even if a declared host port is already in use")
+
+
+class BatchActionRequest(BaseModel):
+    """Request to perform one action on several apps"""
+    app_ids: List[str] = Field(..., min_length=1)
+    action: str = Field(..., description="Action to perform: start, stop, restart, rebuild, pull")
+    parallelism: Optional[int] = Field(None, ge=1, description="Apps acted on at once")
+    respect_dependencies: bool = True
+    stream: bool = Field(False, description="Stream results as NDJSON as they complete")
+    force: bool = Field(False, description="Start apps even if a declared host port is already in use")
+
+
+class JobStatus(str, Enum):
+    """Background job states"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class Job(BaseModel):
+    """A compose operation running in the background"""
+    id: str
+    app_id: str
+    app_name: str
+    action: str
+    status: JobStatus = JobStatus.QUEUED
+    created_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    progress: Optional[float] = None  # percent, when compose reports steps
+    message: Optional[str] = None
+    output_lines: int = 0
 
 
 class ResourceUsage(BaseModel):
@@ -101,6 +147,7 @@ class ResourceUsage(BaseModel):
     disk_write_mb: float
     network_rx_mb: float
     network_tx_mb: float
+    memory_limit_mb: float = 0.0
 
 
 class LogEntry(BaseModel):
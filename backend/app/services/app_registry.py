@@ -0,0 +1,376 @@
+"""
+Registry of discovered Docker Compose applications
+"""
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+import structlog
+
+from app.core.config import settings
+from app.models.compose import AppState, ComposeApp
+
+logger = structlog.get_logger()
+
+SCHEMA_VERSION = 1
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS apps (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    path TEXT NOT NULL,
+    state TEXT NOT NULL,
+    auto_start INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS apps_name ON apps (name);
+CREATE INDEX IF NOT EXISTS apps_path ON apps (path);
+CREATE INDEX IF NOT EXISTS apps_state ON apps (state);
+"""
+
+# Left out of the stored JSON: live figures from the resource sampler,
+# and the fields kept in their own columns
+VOLATILE_FIELDS = {
+    "cpu_percent": True,
+    "memory_mb": True,
+    "created_at": True,
+    "updated_at": True,
+    "auto_start": True,
+    "services": {"__all__": {"cpu_percent", "memory_mb", "memory_limit_mb"}},
+}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class AppRegistry:
+    """
+    Registry of discovered apps, keyed by app id, with lookups by name,
+    path and state.
+
+    Apps are served from memory. Once `open()` attaches a SQLite database,
+    every change is queued for a writer thread, which waits
+    DATABASE_WRITE_DELAY so a burst of changes (a discovery, a stream of
+    Docker events) lands in one transaction, off the event loop. The stored
+    apps are loaded back at startup, so a restart does not need a
+    rediscovery. Rows are only rewritten when an app's stored content
+    actually changed; `created_at`, `updated_at` and `auto_start` are kept
+    across rediscoveries.
+
+    Every change bumps `generation`. A discovery takes a while, so it
+    records the generation it started at and passes it to `replace_all`,
+    which keeps any app updated in the meantime rather than overwriting it
+    with the older discovery result.
+    """
+
+    def __init__(self):
+        self._apps: Dict[str, ComposeApp] = {}
+        self._generation = 0
+        self._changed_at: Dict[str, int] = {}
+
+        # Secondary indexes, keyed on the values each app was indexed under
+        self._keys: Dict[str, Tuple[str, str, AppState]] = {}
+        self._by_name: Dict[str, Set[str]] = {}
+        self._by_path: Dict[str, Set[str]] = {}
+        self._by_state: Dict[AppState, Set[str]] = {}
+
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._stored: Dict[str, str] = {}
+        # Rows waiting for the writer by app id; None deletes the row
+        self._pending: Dict[str, Optional[tuple]] = {}
+        self._pending_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closing = False
+        self._writer: Optional[threading.Thread] = None
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def __contains__(self, app_id: str) -> bool:
+        return app_id in self._apps
+
+    def __len__(self) -> int:
+        return len(self._apps)
+
+    def open(self, path: str) -> None:
+        """Attach SQLite persistence at `path` and load the stored apps"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.executescript(SCHEMA)
+        db.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+        apps = []
+        for app_id, auto_start, created_at, updated_at, data in db.execute(
+            "SELECT id, auto_start, created_at, updated_at, data FROM apps ORDER BY name"
+        ):
+            try:
+                app = ComposeApp.model_validate_json(data)
+            except ValueError as e:
+                logger.warning("app_registry_row_invalid", app_id=app_id, error=str(e))
+                continue
+            app.auto_start = bool(auto_start)
+            app.created_at = created_at
+            app.updated_at = updated_at
+            apps.append(app)
+            self._stored[app.id] = data
+
+        self._db = db
+        for app in apps:
+            self._put(app)
+        self._generation += 1
+        self._closing = False
+        self._writer = threading.Thread(target=self._write_loop, name="app-registry-writer", daemon=True)
+        self._writer.start()
+        logger.info("app_registry_loaded", path=path, count=len(apps))
+
+    def close(self) -> None:
+        """Write what is queued and detach the database"""
+        if self._writer is not None:
+            self._closing = True
+            self._wake.set()
+            self._writer.join()
+            self._writer = None
+        if self._db is not None:
+            self.flush()
+            with self._db_lock:
+                self._db.close()
+            self._db = None
+
+    def get(self, app_id: str) -> Optional[ComposeApp]:
+        """Get an app by id"""
+        return self._apps.get(app_id)
+
+    def list(self) -> List[ComposeApp]:
+        """List all registered apps"""
+        return list(self._apps.values())
+
+    def find_by_name(self, name: str) -> List[ComposeApp]:
+        """Apps with a given name (names are not unique across directories)"""
+        return [self._apps[app_id] for app_id in self._by_name.get(name, ())]
+
+    def find_by_path(self, path: str) -> List[ComposeApp]:
+        """Apps located in a directory"""
+        return [self._apps[app_id] for app_id in self._by_path.get(os.path.abspath(path), ())]
+
+    def list_by_state(self, state: AppState) -> List[ComposeApp]:
+        """Apps currently in a given state"""
+        return [self._apps[app_id] for app_id in self._by_state.get(state, ())]
+
+    def replace_all(self, apps: List[ComposeApp], since: Optional[int] = None) -> None:
+        """
+        Replace the registry contents with a fresh discovery result. With
+        `since`, apps changed after that generation keep their current entry.
+        Only apps that were added, changed or removed touch the database.
+        """
+        fresh = {app.id: app for app in apps}
+        if since is not None:
+            for app_id, changed_at in self._changed_at.items():
+                if changed_at > since and app_id in self._apps and app_id in fresh:
+                    fresh[app_id] = self._apps[app_id]
+
+        removed = [app_id for app_id in self._apps if app_id not in fresh]
+        for app_id in removed:
+            self._drop(app_id)
+        for app in fresh.values():
+            self._put(app)
+
+        self._generation += 1
+        self._changed_at = {app_id: self._generation for app_id in fresh}
+        self._persist(list(fresh.values()), removed)
+
+    def upsert(self, app: ComposeApp) -> None:
+        """
+        Add or update a single app. Also call this after changing a
+        registered app in place, so indexes and storage catch up.
+        """
+        self._put(app)
+        self._generation += 1
+        self._changed_at[app.id] = self._generation
+        self._persist([app], [])
+        logger.debug("app_registry_upserted", app_id=app.id)
+
+    def set_auto_start(self, app_id: str, auto_start: bool) -> Optional[ComposeApp]:
+        """Change an app's auto_start flag"""
+        app = self._apps.get(app_id)
+        if app is None:
+            return None
+        app.auto_start = auto_start
+        app.updated_at = _now()
+        app.created_at = app.created_at or app.updated_at
+        self._generation += 1
+        self._changed_at[app_id] = self._generation
+        if self._db is not None:
+            with self._pending_lock:
+                data = self._stored.get(app_id) or app.model_dump_json(exclude=VOLATILE_FIELDS)
+                self._stored[app_id] = data
+                self._pending[app_id] = self._row(app, data)
+            self._wake.set()
+        return app
+
+    def remove(self, app_id: str) -> Optional[ComposeApp]:
+        """Remove an app by id"""
+        app = self._drop(app_id)
+        if app:
+            self._generation += 1
+            self._changed_at.pop(app_id, None)
+            self._persist([], [app_id])
+            logger.debug("app_registry_removed", app_id=app_id)
+        return app
+
+    def find_by_compose_path(self, compose_path: str) -> Optional[ComposeApp]:
+        """Find the app defined by a compose file"""
+        directory, filename = os.path.split(os.path.abspath(compose_path))
+        for app in self.find_by_path(directory):
+            if app.compose_file == filename:
+                return app
+        return None
+
+    def find_by_project(self, project: str, working_dir: Optional[str] = None) -> List[ComposeApp]:
+        """
+        Find the apps matching a compose project name. If several share the
+        name, prefer the one whose path matches the project's working dir.
+        """
+        matches = self.find_by_name(project)
+        if len(matches) > 1 and working_dir:
+            exact = [app for app in matches if app.path == working_dir]
+            if exact:
+                return exact
+        return matches
+
+    def remove_under(self, directory: str) -> List[ComposeApp]:
+        """Remove every app located in or below a directory"""
+        directory = os.path.abspath(directory)
+        prefix = directory.rstrip(os.sep) + os.sep
+        removed = [
+            app for app in self._apps.values()
+            if app.path == directory or app.path.startswith(prefix)
+        ]
+        for app in removed:
+            self.remove(app.id)
+        return removed
+
+    def _put(self, app: ComposeApp) -> None:
+        existing = self._apps.get(app.id)
+        if existing is not None and existing is not app:
+            # Rediscovered apps carry defaults; keep what the registry owns
+            app.auto_start = existing.auto_start
+            app.created_at = existing.created_at
+            app.updated_at = existing.updated_at
+
+        keys = (app.name, app.path, app.state)
+        old_keys = self._keys.get(app.id)
+        if old_keys != keys:
+            if old_keys is not None:
+                self._unindex(app.id, old_keys)
+            self._by_name.setdefault(app.name, set()).add(app.id)
+            self._by_path.setdefault(app.path, set()).add(app.id)
+            self._by_state.setdefault(app.state, set()).add(app.id)
+            self._keys[app.id] = keys
+        self._apps[app.id] = app
+
+    def _drop(self, app_id: str) -> Optional[ComposeApp]:
+        app = self._apps.pop(app_id, None)
+        keys = self._keys.pop(app_id, None)
+        if keys is not None:
+            self._unindex(app_id, keys)
+        return app
+
+    def _unindex(self, app_id: str, keys: Tuple[str, str, AppState]) -> None:
+        for index, key in zip((self._by_name, self._by_path, self._by_state), keys):
+            ids = index.get(key)
+            if ids is not None:
+                ids.discard(app_id)
+                if not ids:
+                    del index[key]
+
+    @staticmethod
+    def _row(app: ComposeApp, data: str) -> tuple:
+        return (
+            app.id, app.name, app.path, app.state.value, int(app.auto_start),
+            app.created_at, app.updated_at, data
+        )
+
+    def _persist(self, apps: List[ComposeApp], removed: List[str]) -> None:
+        """Queue changed apps and deletions for the writer"""
+        now = _now()
+        queued = False
+        with self._pending_lock:
+            for app in apps:
+                data = app.model_dump_json(exclude=VOLATILE_FIELDS)
+                if self._stored.get(app.id) == data:
+                    continue
+                app.created_at = app.created_at or now
+                app.updated_at = now
+                self._stored[app.id] = data
+                if self._db is not None:
+                    self._pending[app.id] = self._row(app, data)
+                    queued = True
+            for app_id in removed:
+                self._stored.pop(app_id, None)
+                if self._db is not None:
+                    self._pending[app_id] = None
+                    queued = True
+        if queued:
+            self._wake.set()
+
+    def _write_loop(self) -> None:
+        while not self._closing:
+            self._wake.wait()
+            if self._closing:
+                break
+            # Let the rest of a burst of changes join this write
+            time.sleep(settings.DATABASE_WRITE_DELAY)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self) -> None:
+        """Write queued changes and deletions in one transaction"""
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        if self._db is None or not pending:
+            return
+        rows = [row for row in pending.values() if row is not None]
+        removed = [app_id for app_id, row in pending.items() if row is None]
+        try:
+            with self._db_lock:
+                self._db.execute("BEGIN")
+                self._db.executemany("DELETE FROM apps WHERE id = ?", [(app_id,) for app_id in removed])
+                self._db.executemany(
+                    """
+                    INSERT INTO apps (id, name, path, state, auto_start, created_at, updated_at, data)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (id) DO UPDATE SET
+                        name = excluded.name,
+                        path = excluded.path,
+                        state = excluded.state,
+                        auto_start = excluded.auto_start,
+                        updated_at = excluded.updated_at,
+                        data = excluded.data
+                    """,
+                    rows
+                )
+                self._db.execute("COMMIT")
+        except sqlite3.Error as e:
+            logger.error("app_registry_persist_failed", error=str(e))
+            # Forget what was not written so the next change retries it
+            with self._pending_lock:
+                for row in rows:
+                    if self._stored.get(row[0]) == row[7]:
+                        self._stored.pop(row[0], None)
+            with self._db_lock:
+                if self._db.in_transaction:
+                    self._db.execute("ROLLBACK")
+
+
+app_registry = AppRegistry()
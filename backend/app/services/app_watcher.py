@@ -0,0 +1,157 @@
+"""
+Background watcher that keeps the app registry in sync with compose files on disk
+"""
+import asyncio
+import os
+from typing import Iterable, List, Optional
+
+import structlog
+
+from app.core.config import settings
+from app.services.app_registry import app_registry
+from app.services.async_docker import async_docker_service
+from app.services.compose_resolver import compose_resolver
+from app.services.discovery_index import COMPOSE_FILENAMES, compose_index
+
+try:
+    from watchfiles import Change, DefaultFilter, awatch
+except ImportError:  # pragma: no cover - watchfiles ships with uvicorn[standard]
+    awatch = None
+
+logger = structlog.get_logger()
+
+
+class ComposeWatcher:
+    """
+    Watches the search paths and updates only the apps whose compose files
+    were created, modified or deleted.
+
+    Uses inotify (via watchfiles) when available and falls back to polling
+    the incremental compose index and the files resolved projects read,
+    which is cheap when nothing changed.
+    """
+
+    def __init__(self, search_paths: Optional[List[str]] = None, poll_interval: Optional[float] = None):
+        self.search_paths = search_paths
+        self.poll_interval = poll_interval or settings.DISCOVERY_WATCH_POLL_INTERVAL
+        self._task: Optional[asyncio.Task] = None
+        self._stop_event: Optional[asyncio.Event] = None
+        self.mode: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        """Prime the registry and start watching in the background"""
+        if self.running:
+            return
+        self._stop_event = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop watching"""
+        if not self.running:
+            return
+        self._stop_event.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("compose_watcher_stopped")
+
+    def _paths(self) -> List[str]:
+        paths = self.search_paths if self.search_paths is not None else settings.SEARCH_PATHS
+        return [os.path.abspath(os.path.expanduser(p)) for p in paths]
+
+    async def _run(self) -> None:
+        paths = self._paths()
+
+        # Initial discovery also warms the compose index
+        generation = app_registry.generation
+        apps = await async_docker_service.discover_compose_apps(paths)
+        app_registry.replace_all(apps, since=generation)
+        logger.info("compose_watcher_primed", count=len(apps))
+
+        existing = [p for p in paths if os.path.isdir(p)]
+        if awatch is not None and existing:
+            try:
+                self.mode = "inotify"
+                logger.info("compose_watcher_started", mode=self.mode, paths=existing)
+                await self._watch(existing)
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("compose_watcher_inotify_unavailable", error=str(e))
+
+        self.mode = "poll"
+        logger.info("compose_watcher_started", mode=self.mode, interval=self.poll_interval)
+        await self._poll(paths)
+
+    async def _watch(self, paths: List[str]) -> None:
+        watch_filter = _ComposeFilter(ignore_dirs=settings.DISCOVERY_IGNORE_DIRS)
+        async for changes in awatch(*paths, watch_filter=watch_filter, stop_event=self._stop_event):
+            deleted_dirs = set()
+            compose_paths = set()
+            for change, path in changes:
+                if os.path.basename(path) in COMPOSE_FILENAMES:
+                    compose_paths.add(path)
+                elif compose_resolver.projects_using(path):
+                    # An override file, .env or included file of a known project
+                    compose_paths.update(compose_resolver.projects_using(path))
+                elif change == Change.deleted:
+                    deleted_dirs.add(path)
+                elif change == Change.added and os.path.isdir(path):
+                    # A directory moved into place emits no events for its contents
+                    scan = await asyncio.get_running_loop().run_in_executor(None, compose_index.scan, [path])
+                    compose_paths.update(entry.path for entry in scan.files)
+
+            for directory in deleted_dirs:
+                for app in app_registry.remove_under(directory):
+                    logger.info("compose_app_removed", name=app.name, path=app.path)
+            await self._apply(compose_paths)
+
+    async def _poll(self, paths: List[str]) -> None:
+        loop = asyncio.get_running_loop()
+        while not self._stop_event.is_set():
+            await asyncio.sleep(self.poll_interval)
+            try:
+                scan = await loop.run_in_executor(None, compose_index.scan, paths)
+                compose_paths = scan.added + scan.modified + scan.removed if scan.changed else []
+                # The index only tracks compose files; .env, override and included files are polled here
+                stale = await loop.run_in_executor(None, compose_resolver.changed_projects)
+                compose_paths += [path for path in stale if path not in compose_paths]
+                if compose_paths:
+                    await self._apply(compose_paths)
+            except Exception as e:
+                logger.error("compose_watcher_poll_failed", error=str(e))
+
+    async def _apply(self, compose_paths: Iterable[str]) -> None:
+        """Rebuild or drop the apps defined by the given compose files"""
+        for path in compose_paths:
+            try:
+                app = await async_docker_service.refresh_compose_file(path)
+                if app:
+                    app_registry.upsert(app)
+                    logger.info("compose_app_updated", name=app.name, path=path)
+                else:
+                    existing = app_registry.find_by_compose_path(path)
+                    if existing:
+                        app_registry.remove(existing.id)
+                        logger.info("compose_app_removed", name=existing.name, path=path)
+            except Exception as e:
+                logger.error("compose_watcher_update_failed", path=path, error=str(e))
+
+
+if awatch is not None:
+    class _ComposeFilter(DefaultFilter):
+        """Ignore the same directories as the discovery walk"""
+
+        def __init__(self, ignore_dirs: List[str]):
+            super().__init__(ignore_dirs=list(DefaultFilter.ignore_dirs) + list(ignore_dirs))
+
+
+compose_watcher = ComposeWatcher()
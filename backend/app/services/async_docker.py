@@ -0,0 +1,126 @@
+"""
+Async facade over DockerService so blocking docker-py calls stay off the event loop
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import structlog
+
+from app.core.config import settings
+from app.models.compose import ComposeApp, LogEntry, ResourceUsage
+from app.services.concurrency import SingleFlight
+from app.services.docker_service import DockerService, docker_service
+
+logger = structlog.get_logger()
+
+
+class DockerTimeoutError(Exception):
+    """A Docker Engine call did not finish within its timeout"""
+
+
+class AsyncDockerService:
+    """
+    Runs DockerService calls on a bounded thread pool with per-call timeouts.
+
+    The pool size caps how many blocking Engine API requests are in flight at
+    once. A call that times out is abandoned, not interrupted: its worker
+    thread finishes in the background and the result is discarded.
+
+    Discovery and stats calls are single-flight: concurrent identical
+    requests share one in-flight call and its result.
+    """
+
+    def __init__(
+        self,
+        service: DockerService,
+        max_workers: Optional[int] = None,
+        timeout: Optional[float] = None
+    ):
+        self.service = service
+        self.max_workers = max_workers or settings.DOCKER_MAX_WORKERS
+        self.timeout = timeout or settings.DOCKER_CALL_TIMEOUT
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="docker")
+        self._flights = SingleFlight()
+
+    async def run(self, func: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Run a blocking callable on the Docker thread pool"""
+        timeout = timeout or self.timeout
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            name = getattr(func, "__name__", repr(func))
+            logger.warning("docker_call_timed_out", call=name, timeout=timeout)
+            raise DockerTimeoutError(f"Docker call {name} timed out after {timeout} seconds")
+
+    async def is_docker_available(self) -> bool:
+        return await self.run(self.service.is_docker_available)
+
+    async def ping(self, timeout: Optional[float] = None) -> None:
+        await self.run(self.service.ping, timeout=timeout)
+
+    async def get_docker_info(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        return await self.run(self.service.get_docker_info, timeout=timeout)
+
+    async def discover_compose_apps(self, search_paths: Optional[List[str]] = None) -> List[ComposeApp]:
+        key = ("discover", tuple(search_paths) if search_paths else None)
+        return await self._flights.do(key, lambda: self.run(
+            self.service.discover_compose_apps,
+            search_paths,
+            timeout=settings.DOCKER_DISCOVERY_TIMEOUT
+        ))
+
+    async def refresh_compose_file(self, compose_path: str) -> Optional[ComposeApp]:
+        return await self.run(self.service.refresh_compose_file, compose_path)
+
+    async def refresh_app_states(self, apps: List[ComposeApp]) -> List[ComposeApp]:
+        return await self.run(self.service.refresh_app_states, apps)
+
+    async def list_published_ports(self) -> List[Dict[str, Any]]:
+        return await self.run(self.service.list_published_ports)
+
+    async def get_container_stats(self, container_id: str) -> Optional[ResourceUsage]:
+        return await self._flights.do(
+            ("stats", container_id),
+            lambda: self.run(self.service.get_container_stats, container_id)
+        )
+
+    async def get_containers_stats(
+        self,
+        container_ids: List[str],
+        concurrency: Optional[int] = None
+    ) -> Dict[str, Optional[ResourceUsage]]:
+        """
+        Fetch stats for several containers concurrently. Each stats call
+        blocks while the daemon takes two CPU samples, so fanning out makes
+        the total latency roughly that of the slowest container.
+        """
+        semaphore = asyncio.Semaphore(concurrency or settings.STATS_MAX_CONCURRENCY)
+
+        async def fetch(container_id: str) -> Optional[ResourceUsage]:
+            async with semaphore:
+                try:
+                    return await self.get_container_stats(container_id)
+                except DockerTimeoutError:
+                    return None
+
+        results = await asyncio.gather(*(fetch(cid) for cid in container_ids))
+        return dict(zip(container_ids, results))
+
+    async def get_container_logs(
+        self,
+        container_id: str,
+        tail: int = 100,
+        stream: Optional[str] = None
+    ) -> List[LogEntry]:
+        return await self.run(self.service.get_container_logs, container_id, tail=tail, stream=stream)
+
+    def shutdown(self) -> None:
+        """Stop accepting work; running calls are left to finish"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+async_docker_service = AsyncDockerService(docker_service)
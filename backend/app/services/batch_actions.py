@@ -0,0 +1,146 @@
+"""
+Batch app actions: bounded parallelism with cross-app dependency ordering
+"""
+import asyncio
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set
+
+import structlog
+
+from app.models.compose import ComposeApp, JobStatus
+from app.services.compose_service import compose_service
+from app.services.job_queue import job_queue
+from app.services.port_inventory import port_inventory
+
+logger = structlog.get_logger()
+
+# Actions that tear apps down run consumers before the apps they depend on
+REVERSED_ACTIONS = {"stop"}
+
+# Batch tasks outlive a caller that disconnects mid-stream
+_running: Set[asyncio.Task] = set()
+
+
+class DependencyCycleError(ValueError):
+    """Apps in a batch depend on each other in a cycle"""
+
+
+def plan_batch(apps: List[ComposeApp], action: str, respect_dependencies: bool = True) -> Dict[str, Set[str]]:
+    """
+    Map each app ID to the IDs of apps in the batch that must finish first.
+
+    Dependencies come from each app's `depends_on` (app names or IDs).
+    Dependencies outside the batch are ignored. For REVERSED_ACTIONS the
+    edges are flipped, so a database is stopped after its consumers.
+    """
+    waits: Dict[str, Set[str]] = {app.id: set() for app in apps}
+    if not respect_dependencies:
+        return waits
+
+    ids = {}
+    for app in apps:
+        ids[app.name] = app.id
+        ids[app.id] = app.id
+
+    for app in apps:
+        for dependency in app.depends_on:
+            dependency_id = ids.get(dependency)
+            if dependency_id is None or dependency_id == app.id:
+                continue
+            if action in REVERSED_ACTIONS:
+                waits[dependency_id].add(app.id)
+            else:
+                waits[app.id].add(dependency_id)
+
+    # Kahn's algorithm: whatever can never become ready is part of a cycle
+    remaining = {app_id: set(deps) for app_id, deps in waits.items()}
+    ready = [app_id for app_id, deps in remaining.items() if not deps]
+    while ready:
+        finished = ready.pop()
+        del remaining[finished]
+        for app_id, deps in remaining.items():
+            if finished in deps:
+                deps.discard(finished)
+                if not deps:
+                    ready.append(app_id)
+    if remaining:
+        names = sorted(app.name for app in apps if app.id in remaining)
+        raise DependencyCycleError(f"Dependency cycle between apps: {', '.join(names)}")
+
+    return waits
+
+
+async def run_batch(
+    apps: List[ComposeApp],
+    action: str,
+    waits: Dict[str, Set[str]],
+    parallelism: int,
+    after: Optional[Callable[[ComposeApp], Awaitable[None]]] = None,
+    check_ports: bool = False
+) -> AsyncIterator[Dict]:
+    """
+    Run `action` on every app, at most `parallelism` at a time, each waiting
+    for the apps in `waits` first. Yields one result per app as it completes.
+    An app whose dependency did not succeed is skipped. With `check_ports`,
+    a start whose declared host ports are already in use fails with the
+    conflicts instead of running.
+    """
+    names = {app.id: app.name for app in apps}
+    semaphore = asyncio.Semaphore(parallelism)
+    done = {app.id: asyncio.Event() for app in apps}
+    status: Dict[str, str] = {}
+    results: asyncio.Queue = asyncio.Queue()
+
+    async def run(app: ComposeApp) -> None:
+        started = time.monotonic()
+        try:
+            for dependency_id in waits[app.id]:
+                await done[dependency_id].wait()
+
+            failed = [names[d] for d in waits[app.id] if status.get(d) != "success"]
+            if failed:
+                result = {"status": "skipped", "message": f"Skipped: {', '.join(sorted(failed))} did not succeed"}
+            else:
+                async with semaphore:
+                    started = time.monotonic()
+                    # Checked only now, so ports taken by apps started earlier in the batch count
+                    conflicts = await port_inventory.conflicts_for(app) if check_ports and action == "start" else []
+                    if conflicts:
+                        result = {
+                            "status": "error",
+                            "message": f"Ports needed by {app.name} are already in use",
+                            "conflicts": conflicts
+                        }
+                    elif action in compose_service.JOB_ACTIONS:
+                        job = await job_queue.run(app, action, after=after)
+                        result = {
+                            "status": "success" if job.status == JobStatus.SUCCEEDED else "error",
+                            "message": job.message or "",
+                            "job_id": job.id
+                        }
+                    else:
+                        result = await compose_service.run_action(app, action)
+                        if after is not None:
+                            await after(app)
+        except Exception as e:
+            logger.error("batch_action_failed", app_id=app.id, action=action, error=str(e))
+            result = {"status": "error", "message": str(e)}
+
+        status[app.id] = result.get("status", "error")
+        done[app.id].set()
+        results.put_nowait({
+            "app_id": app.id,
+            "app_name": app.name,
+            "duration": round(time.monotonic() - started, 3),
+            **result
+        })
+
+    logger.info("batch_action_started", action=action, count=len(apps), parallelism=parallelism)
+    for app in apps:
+        task = asyncio.create_task(run(app))
+        _running.add(task)
+        task.add_done_callback(_running.discard)
+
+    for _ in apps:
+        yield await results.get()
+    logger.info("batch_action_finished", action=action, count=len(apps))
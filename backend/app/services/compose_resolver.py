@@ -0,0 +1,524 @@
+"""
+Resolves a compose file into a normalised project model, memoised by the hash of every file it reads
+"""
+import copy
+import hashlib
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import structlog
+from dotenv import dotenv_values
+
+from app.models.compose import PortMapping
+from app.services.discovery_index import parse_compose_yaml
+
+logger = structlog.get_logger()
+
+# Override files compose merges into each default compose file
+OVERRIDE_FILENAMES = {
+    "docker-compose.yml": ("docker-compose.override.yml", "docker-compose.override.yaml"),
+    "docker-compose.yaml": ("docker-compose.override.yml", "docker-compose.override.yaml"),
+    "compose.yml": ("compose.override.yml", "compose.override.yaml"),
+    "compose.yaml": ("compose.override.yml", "compose.override.yaml"),
+}
+
+# Sequences an override replaces rather than extends
+REPLACED_SEQUENCES = {"command", "entrypoint", "test"}
+
+# Service keys whose list form ("KEY=value" / names) is normalised to a mapping before merging
+MAPPING_KEYS = {"environment", "labels", "depends_on", "extra_hosts", "sysctls", "annotations"}
+
+# Characters compose strips from project names
+PROJECT_NAME_INVALID = re.compile(r"[^a-z0-9_-]")
+
+# Ranges wider than this are not expanded into individual mappings
+MAX_PORT_RANGE = 1024
+
+INTERPOLATION_PATTERN = re.compile(r"\$(?:(\$)|\{([^}]*)\}|([A-Za-z_][A-Za-z0-9_]*))")
+BRACED_PATTERN = re.compile(r"^([A-Za-z_][A-Za-z0-9_]*)(?:(:?[-?+])(.*))?$", re.DOTALL)
+
+
+class ComposeResolveError(ValueError):
+    """A compose project cannot be resolved (bad YAML, missing or cyclic extends/include)"""
+
+
+@dataclass
+class ResolvedProject:
+    """A compose project with includes, extends and overrides merged and values normalised"""
+    path: str
+    hash: str
+    name: str
+    services: Dict[str, Dict[str, Any]]
+    networks: List[str] = field(default_factory=list)
+    volumes: List[str] = field(default_factory=list)
+    extensions: Dict[str, Any] = field(default_factory=dict)
+    files: List[str] = field(default_factory=list)
+    override_files: List[str] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+
+
+@dataclass
+class _FileState:
+    mtime_ns: int
+    size: int
+    inode: int
+    hash: str
+    data: Any = None
+    parsed: bool = False
+
+
+@dataclass
+class _CachedProject:
+    project: ResolvedProject
+    main_hash: str
+    dependencies: List[str]
+
+
+@dataclass
+class _Context:
+    """State of one resolution: variables, and every path consulted"""
+    variables: Dict[str, str]
+    dependencies: List[str] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+
+
+def interpolate(value: Any, variables: Dict[str, str], warnings: Optional[List[str]] = None) -> Any:
+    """
+    Substitute `$VAR`, `${VAR}`, `${VAR:-default}`, `${VAR-default}`,
+    `${VAR:?error}`, `${VAR?error}`, `${VAR:+alt}` and `${VAR+alt}` in every
+    string of a parsed compose document; `$$` is a literal `$`.
+    """
+    if isinstance(value, dict):
+        return {key: interpolate(item, variables, warnings) for key, item in value.items()}
+    if isinstance(value, list):
+        return [interpolate(item, variables, warnings) for item in value]
+    if not isinstance(value, str) or "$" not in value:
+        return value
+
+    def substitute(match: re.Match) -> str:
+        if match.group(1):
+            return "$"
+        if match.group(3):
+            return variables.get(match.group(3), "")
+        braced = BRACED_PATTERN.match(match.group(2))
+        if braced is None:
+            if warnings is not None:
+                warnings.append(f"Invalid interpolation: ${{{match.group(2)}}}")
+            return match.group(0)
+        name, operator, argument = braced.groups()
+        current = variables.get(name)
+        if operator is None:
+            return current or ""
+        is_set = current is not None and (current != "" or not operator.startswith(":"))
+        symbol = operator[-1]
+        if symbol == "-":
+            return current if is_set else interpolate(argument, variables, warnings)
+        if symbol == "+":
+            return interpolate(argument, variables, warnings) if is_set else ""
+        # "?": required
+        if not is_set and warnings is not None:
+            warnings.append(f"Required variable {name} is not set: {argument}" if argument else f"Required variable {name} is not set")
+        return current or ""
+
+    return INTERPOLATION_PATTERN.sub(substitute, value)
+
+
+def _split_port_range(text: str) -> Tuple[int, int]:
+    start, _, end = text.partition("-")
+    first = int(start)
+    last = int(end) if end else first
+    if not 0 < first <= last <= 65535:
+        raise ValueError(f"Invalid port range: {text}")
+    return first, last
+
+
+def _port_mappings(host_ip: Optional[str], published: str, target: str, protocol: str) -> List[PortMapping]:
+    """Expand one published:target declaration (either may be a range) into mappings"""
+    if not published:
+        # Ephemeral host port; nothing is reserved on the host ahead of time
+        return []
+    host_first, host_last = _split_port_range(published)
+    target_first, target_last = _split_port_range(target)
+    if host_last - host_first > MAX_PORT_RANGE or target_last - target_first > MAX_PORT_RANGE:
+        raise ValueError(f"Port range too wide to expand: {published}:{target}")
+
+    if target_first == target_last:
+        # A host range with one target: compose binds one port from the range
+        return [PortMapping(host_ip=host_ip, host_port=host_first, container_port=target_first, protocol=protocol)]
+    if host_last - host_first != target_last - target_first:
+        raise ValueError(f"Port ranges differ in size: {published}:{target}")
+    return [
+        PortMapping(host_ip=host_ip, host_port=host, container_port=target, protocol=protocol)
+        for host, target in zip(range(host_first, host_last + 1), range(target_first, target_last + 1))
+    ]
+
+
+def parse_ports(ports: Any, warnings: Optional[List[str]] = None) -> List[PortMapping]:
+    """
+    Normalise a service's `ports` in short syntax ("80", "8080:80",
+    "127.0.0.1:8080:80", "[::1]:8080:80", "8000-8001:80-81/udp") or long
+    syntax (target/published/host_ip/protocol) into host port mappings.
+    """
+    mappings: List[PortMapping] = []
+    for port in ports or []:
+        try:
+            if isinstance(port, dict):
+                if port.get("target") is None:
+                    raise ValueError("Port without a target")
+                mappings.extend(_port_mappings(
+                    port.get("host_ip") or None,
+                    str(port.get("published") or ""),
+                    str(port["target"]),
+                    str(port.get("protocol") or "tcp")
+                ))
+                continue
+
+            text = str(port)
+            text, _, protocol = text.partition("/")
+            host_ip = None
+            if text.startswith("["):
+                # Bracketed IPv6 host address
+                address, _, text = text[1:].partition("]")
+                host_ip = address
+                text = text.lstrip(":")
+                published, _, target = text.rpartition(":")
+            else:
+                parts = text.split(":")
+                if len(parts) > 3:
+                    raise ValueError("Unbracketed IPv6 address")
+                target = parts[-1]
+                published = parts[-2] if len(parts) >= 2 else ""
+                if len(parts) == 3:
+                    host_ip = parts[0] or None
+            mappings.extend(_port_mappings(host_ip, published, target, protocol or "tcp"))
+        except (TypeError, ValueError) as e:
+            if warnings is not None:
+                warnings.append(f"Ignored port {port!r}: {e}")
+
+    unique = {}
+    for mapping in mappings:
+        unique.setdefault((mapping.host_ip, mapping.host_port, mapping.container_port, mapping.protocol), mapping)
+    return list(unique.values())
+
+
+def _as_mapping(key: str, value: Any) -> Any:
+    """List forms of environment/labels/depends_on/... as mappings"""
+    if value is None or isinstance(value, dict):
+        return value
+    if isinstance(value, str):
+        # A single `KEY=value` entry, read as a one-item list
+        value = [value]
+    if not isinstance(value, list):
+        raise ComposeResolveError(f"{key} must be a mapping or a list, not {type(value).__name__}")
+    if key == "depends_on":
+        return {str(name): {"condition": "service_started"} for name in value}
+    mapping = {}
+    for item in value:
+        item = str(item)
+        if key == "extra_hosts" and "=" not in item:
+            name, _, address = item.partition(":")
+        else:
+            name, sep, address = item.partition("=")
+            if not sep:
+                address = None
+        mapping[name] = address
+    return mapping
+
+
+def _normalise_service(path: str, name: Any, config: Any) -> Dict[str, Any]:
+    if config is None:
+        return {}
+    if not isinstance(config, dict):
+        raise ComposeResolveError(f"{path}: service {name} must be a mapping")
+    try:
+        return {key: _as_mapping(key, value) if key in MAPPING_KEYS else value for key, value in config.items()}
+    except ComposeResolveError as e:
+        raise ComposeResolveError(f"{path}: service {name}: {e}")
+
+
+def normalise_project_name(name: str) -> str:
+    """A project name as compose normalises it: lowercase [a-z0-9_-], not starting with _ or -"""
+    return PROJECT_NAME_INVALID.sub("", name.lower()).lstrip("_-")
+
+
+def _freeze(value: Any) -> Any:
+    return repr(value) if isinstance(value, (dict, list)) else value
+
+
+def merge(base: Any, override: Any, key: Optional[str] = None) -> Any:
+    """
+    Merge per the compose spec: mappings merge recursively, most sequences
+    are combined without duplicates, and scalars (and command, entrypoint
+    and healthcheck test) are replaced.
+    """
+    if isinstance(base, dict) and isinstance(override, dict):
+        merged = dict(base)
+        for name, value in override.items():
+            merged[name] = merge(base[name], value, name) if name in base else value
+        return merged
+    if isinstance(base, list) and isinstance(override, list) and key not in REPLACED_SEQUENCES:
+        seen = {_freeze(item) for item in base}
+        return base + [item for item in override if _freeze(item) not in seen]
+    return override
+
+
+class ComposeResolver:
+    """
+    Resolves compose files the way `docker compose` reads them: the `.env`
+    file and the environment are interpolated, `include`d files and
+    `extends` are merged, and the default override file is applied. Ports
+    are parsed into PortMapping entries and list-form mappings normalised.
+    The project name follows compose's precedence (COMPOSE_PROJECT_NAME
+    from the environment or `.env`, then the top-level `name`, then the
+    directory name) and is normalised the same way, so it matches the
+    `com.docker.compose.project` label of the project's containers.
+
+    A resolved project is memoised by the combined hash of every file it
+    read (and every path it looked for, such as a missing override or
+    `.env`). Later calls re-check only those files, and only hash files
+    whose stat changed, so an unchanged project is returned without
+    reading or parsing any YAML.
+    """
+
+    def __init__(self):
+        self._projects: Dict[str, _CachedProject] = {}
+        self._files: Dict[str, _FileState] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def resolve(
+        self,
+        compose_path: str,
+        content_hash: Optional[str] = None,
+        data: Any = None
+    ) -> ResolvedProject:
+        """
+        Resolve a compose file. `content_hash` and `data`, when the caller
+        has already read and parsed the file, spare re-reading it.
+        """
+        path = os.path.abspath(compose_path)
+        with self._lock:
+            main_hash = content_hash or self._file_hash(path)
+            if main_hash is None:
+                raise ComposeResolveError(f"Compose file not found: {path}")
+
+            cached = self._projects.get(path)
+            if cached is not None and self._combined_hash(main_hash, cached.dependencies) == cached.project.hash:
+                self.hits += 1
+                return cached.project
+
+            self.misses += 1
+            project, dependencies = self._resolve(path, main_hash, data)
+            self._projects[path] = _CachedProject(project=project, main_hash=main_hash, dependencies=dependencies)
+            for warning in project.warnings:
+                logger.warning("compose_resolve_warning", path=path, warning=warning)
+            return project
+
+    def forget(self, compose_path: str) -> None:
+        """Drop a memoised project, e.g. when its compose file is removed"""
+        with self._lock:
+            self._projects.pop(os.path.abspath(compose_path), None)
+
+    def projects_using(self, path: str) -> List[str]:
+        """Compose files whose resolved project read (or looked for) a file"""
+        path = os.path.abspath(path)
+        with self._lock:
+            return [main for main, cached in self._projects.items() if path in cached.dependencies]
+
+    def changed_projects(self) -> List[str]:
+        """
+        Compose files whose `.env`, override or included files changed since
+        they were resolved. Only files whose stat changed are re-hashed.
+        """
+        with self._lock:
+            return [
+                main for main, cached in self._projects.items()
+                if self._combined_hash(cached.main_hash, cached.dependencies) != cached.project.hash
+            ]
+
+    def _file_hash(self, path: str) -> Optional[str]:
+        """Content hash of a file, re-read only when its stat changed; None if missing"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            self._files.pop(path, None)
+            return None
+        state = self._files.get(path)
+        if state is not None and (state.mtime_ns, state.size, state.inode) == (st.st_mtime_ns, st.st_size, st.st_ino):
+            return state.hash
+        try:
+            with open(path, "rb") as f:
+                content = f.read()
+        except OSError:
+            return None
+        content_hash = hashlib.sha256(content).hexdigest()
+        if state is not None and state.hash == content_hash:
+            state.mtime_ns, state.size, state.inode = st.st_mtime_ns, st.st_size, st.st_ino
+        else:
+            self._files[path] = _FileState(st.st_mtime_ns, st.st_size, st.st_ino, content_hash)
+        return content_hash
+
+    def _combined_hash(self, main_hash: str, dependencies: List[str]) -> str:
+        digest = hashlib.sha256(main_hash.encode())
+        for path in dependencies:
+            digest.update(f"\0{path}\0{self._file_hash(path) or '-'}".encode())
+        return digest.hexdigest()
+
+    def _load(self, path: str) -> Any:
+        """Parsed YAML of a file, cached until its content changes"""
+        if self._file_hash(path) is None:
+            raise ComposeResolveError(f"File not found: {path}")
+        state = self._files[path]
+        if not state.parsed:
+            try:
+                with open(path, "rb") as f:
+                    state.data = parse_compose_yaml(f.read())
+            except Exception as e:
+                raise ComposeResolveError(f"Cannot parse {path}: {e}")
+            state.parsed = True
+        return state.data
+
+    def _resolve(self, path: str, main_hash: str, data: Any) -> Tuple[ResolvedProject, List[str]]:
+        directory = os.path.dirname(path)
+        env_path = os.path.join(directory, ".env")
+        env = {}
+        if self._file_hash(env_path) is not None:
+            env = {key: value for key, value in dotenv_values(env_path).items() if value is not None}
+        # As with `docker compose`, the environment takes precedence over .env
+        context = _Context(variables={**env, **os.environ}, dependencies=[env_path])
+
+        model = self._load_model(path, context, [], data)
+        files = [path]
+        override_files = []
+        for name in OVERRIDE_FILENAMES.get(os.path.basename(path), ()):
+            override = os.path.join(directory, name)
+            context.dependencies.append(override)
+            if self._file_hash(override) is not None:
+                model = merge(model, self._load_model(override, context, []))
+                override_files.append(name)
+                files.append(override)
+                # compose only reads the first override file found
+                break
+
+        services = {}
+        for name, config in (model.get("services") or {}).items():
+            config = dict(config)
+            config["ports"] = parse_ports(config.get("ports"), context.warnings)
+            config["environment"] = {
+                key: "" if value is None else str(value)
+                for key, value in (config.get("environment") or {}).items()
+            }
+            services[str(name)] = config
+
+        # As with `docker compose`, COMPOSE_PROJECT_NAME overrides the top-level name
+        name = normalise_project_name(
+            context.variables.get("COMPOSE_PROJECT_NAME") or str(model.get("name") or "")
+            or os.path.basename(directory)
+        )
+        if not name:
+            raise ComposeResolveError(f"{path}: no valid project name")
+
+        dependencies = list(dict.fromkeys(p for p in context.dependencies if p != path))
+        files.extend(p for p in dependencies if p not in files and p in self._files)
+        project = ResolvedProject(
+            path=path,
+            hash=self._combined_hash(main_hash, dependencies),
+            name=name,
+            services=services,
+            networks=[str(n) for n in (model.get("networks") or {})],
+            volumes=[str(v) for v in (model.get("volumes") or {})],
+            extensions={key: value for key, value in model.items() if str(key).startswith("x-")},
+            files=files,
+            override_files=override_files,
+            warnings=context.warnings,
+        )
+        return project, dependencies
+
+    def _load_model(self, path: str, context: _Context, stack: List[str], data: Any = None) -> Dict[str, Any]:
+        """One file with its includes and extends resolved, values interpolated"""
+        if path in stack:
+            raise ComposeResolveError(f"Include cycle: {' -> '.join(stack + [path])}")
+        stack = stack + [path]
+        context.dependencies.append(path)
+
+        raw = data if data is not None else self._load(path)
+        if raw is None:
+            raw = {}
+        if not isinstance(raw, dict):
+            raise ComposeResolveError(f"{path} is not a compose mapping")
+        model = interpolate(copy.deepcopy(raw), context.variables, context.warnings)
+        directory = os.path.dirname(path)
+
+        services = model.get("services") or {}
+        if not isinstance(services, dict):
+            raise ComposeResolveError(f"{path}: services must be a mapping")
+        services = {name: _normalise_service(path, name, config) for name, config in services.items()}
+        resolved: Dict[str, Dict[str, Any]] = {}
+        for name in services:
+            resolved[name] = self._extend(name, services, resolved, path, context, stack, [])
+        model["services"] = resolved
+
+        includes = model.pop("include", None) or []
+        if not isinstance(includes, list):
+            raise ComposeResolveError(f"{path}: include must be a list")
+        for item in includes:
+            include_paths = item.get("path") if isinstance(item, dict) else item
+            if isinstance(include_paths, str):
+                include_paths = [include_paths]
+            if not isinstance(include_paths, (list, type(None))):
+                raise ComposeResolveError(f"{path}: include paths must be a string or a list")
+            for include_path in include_paths or []:
+                included = self._load_model(os.path.normpath(os.path.join(directory, str(include_path))), context, stack)
+                # Local definitions win over included ones
+                for section in ("services", "networks", "volumes", "configs", "secrets"):
+                    if included.get(section):
+                        model[section] = {**included[section], **(model.get(section) or {})}
+        return model
+
+    def _extend(
+        self,
+        name: str,
+        services: Dict[str, Dict[str, Any]],
+        resolved: Dict[str, Dict[str, Any]],
+        path: str,
+        context: _Context,
+        stack: List[str],
+        chain: List[str]
+    ) -> Dict[str, Any]:
+        if name in resolved:
+            return resolved[name]
+        if name in chain:
+            raise ComposeResolveError(f"extends cycle in {path}: {' -> '.join(chain + [name])}")
+        if name not in services:
+            raise ComposeResolveError(f"{path} has no service {name} to extend")
+
+        config = services[name]
+        extends = config.get("extends")
+        if not extends:
+            return config
+
+        if isinstance(extends, str):
+            base_name, base_file = extends, None
+        elif not isinstance(extends, dict):
+            raise ComposeResolveError(f"{path}: extends of service {name} must be a mapping or a name")
+        else:
+            base_name, base_file = extends.get("service"), extends.get("file")
+        if base_file:
+            other = os.path.normpath(os.path.join(os.path.dirname(path), str(base_file)))
+            base_services = self._load_model(other, context, stack)["services"]
+            if base_name not in base_services:
+                raise ComposeResolveError(f"{other} has no service {base_name} to extend")
+            base = base_services[base_name]
+        else:
+            base = self._extend(base_name, services, resolved, path, context, stack, chain + [name])
+
+        merged = merge(copy.deepcopy(base), {key: value for key, value in config.items() if key != "extends"})
+        resolved[name] = merged
+        return merged
+
+
+compose_resolver = ComposeResolver()
@@ -3,12 +3,24 @@ Docker Compose management service
 """
 import subprocess
 import os
+import shlex
+import signal
+import time
+from collections import deque
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 import structlog
 import asyncio
 
+from app.core.config import settings
+from app.core.metrics import observe_compose_command
 from app.models.compose import ComposeApp, AppState
+from app.services.async_docker import async_docker_service
+from app.services.concurrency import KeyedLocks
+from app.services.docker_service import docker_service
+
+# Called with (stream, line) for each line of output as it is produced
+OutputCallback = Callable[[str, str], None]
 
 logger = structlog.get_logger()
 
@@ -16,8 +28,18 @@ logger = structlog.get_logger()
 class ComposeService:
     """Service for managing Docker Compose applications"""
 
+    ACTIONS = ("start", "stop", "restart", "rebuild", "pull")
+    # Long-running actions, executed as background jobs with streamed output
+    JOB_ACTIONS = ("rebuild", "pull")
+    # Actions that can run straight against existing containers
+    FAST_ACTIONS = {"start": "Started", "stop": "Stopped", "restart": "Restarted"}
+
     def __init__(self):
         self.compose_cmd = self._find_compose_command()
+        # Mutating operations on the same app run one at a time
+        self._app_locks = KeyedLocks()
+        # Apps whose images were pulled since their containers were created
+        self._needs_reconcile: set = set()
         logger.info("compose_service_initialized", command=self.compose_cmd)
 
     def _find_compose_command(self) -> str:
@@ -54,13 +76,107 @@ class ComposeService:
         logger.info("defaulting_to_docker_compose_v2")
         return "docker compose"
 
+    async def run_action(self, app: ComposeApp, action: str, on_output: Optional[OutputCallback] = None) -> Dict[str, str]:
+        """
+        Run one of ACTIONS on an application; JOB_ACTIONS report output
+        through `on_output`. Waits for any other action on the same app.
+        """
+        handlers = {
+            "start": self.start_app,
+            "stop": self.stop_app,
+            "restart": self.restart_app,
+            "rebuild": self.rebuild_app,
+            "pull": self.pull_images,
+        }
+        if action not in handlers:
+            raise ValueError(f"Invalid action: {action}")
+        if self._app_locks.locked(app.id):
+            logger.info("waiting_for_app_action", name=app.name, action=action)
+        async with self._app_locks.lock(app.id):
+            if action in self.FAST_ACTIONS and settings.COMPOSE_FAST_PATH_ENABLED:
+                result = await self._run_fast_action(app, action)
+                if result is not None:
+                    return result
+
+            if action in self.JOB_ACTIONS:
+                result = await handlers[action](app, on_output=on_output)
+            else:
+                result = await handlers[action](app)
+
+            # A pull only takes effect once compose recreates the containers
+            if result.get("status") == "success":
+                if action == "pull":
+                    self._needs_reconcile.add(app.id)
+                elif action in ("start", "rebuild"):
+                    self._needs_reconcile.discard(app.id)
+            return result
+
+    async def _run_fast_action(self, app: ComposeApp, action: str) -> Optional[Dict[str, str]]:
+        """
+        Start, stop or restart an app's existing containers through the
+        Engine API, level by level in service dependency order with each
+        level in parallel. Returns None when the compose CLI is needed.
+        """
+        try:
+            plan = await async_docker_service.run(
+                docker_service.plan_container_action, app, action, app.id in self._needs_reconcile
+            )
+        except Exception as e:
+            logger.warning("fast_path_plan_failed", name=app.name, action=action, error=str(e))
+            return None
+        if plan is None:
+            logger.info("fast_path_unavailable", name=app.name, action=action)
+            return None
+
+        logger.info("fast_path_action", name=app.name, action=action,
+                    containers=sum(len(level) for level in plan))
+        errors = []
+        for level in plan:
+            results = await asyncio.gather(
+                *(self._container_action(container_id, action) for _, container_id in level),
+                return_exceptions=True
+            )
+            errors += [f"{service}: {result}" for (service, _), result in zip(level, results)
+                       if isinstance(result, Exception)]
+            if errors:
+                # Later levels depend on this one
+                break
+
+        if errors:
+            logger.error("fast_path_action_failed", name=app.name, action=action, errors=errors)
+            return {"status": "error", "message": "; ".join(errors)}
+        logger.info("fast_path_action_done", name=app.name, action=action)
+        return {"status": "success", "message": f"{self.FAST_ACTIONS[action]} {app.name}"}
+
+    async def _container_action(self, container_id: str, action: str) -> None:
+        """One container's part of a fast-path action, allowing for its stop grace period"""
+        stop_timeout = None
+        if action in ("stop", "restart"):
+            stop_timeout = await async_docker_service.run(docker_service.stop_timeout, container_id)
+        await async_docker_service.run(
+            docker_service.container_action,
+            container_id,
+            action,
+            stop_timeout,
+            timeout=settings.COMPOSE_FAST_PATH_TIMEOUT + (stop_timeout or 0)
+        )
+
+    @staticmethod
+    def _file_args(app: ComposeApp) -> str:
+        """-f options for the app's compose file and the override files merged into it"""
+        return " ".join(f"-f {shlex.quote(name)}" for name in [app.compose_file, *app.override_files])
+
+    def is_busy(self, app_id: str) -> bool:
+        """Whether an action is currently running on an app"""
+        return self._app_locks.locked(app_id)
+
     async def start_app(self, app: ComposeApp) -> Dict[str, str]:
         """Start a Docker Compose application"""
         try:
             logger.info("starting_app", name=app.name, path=app.path)
 
-            cmd = f"{self.compose_cmd} -f {app.compose_file} up -d"
-            result = await self._run_compose_command(cmd, app.path)
+            cmd = f"{self.compose_cmd} {self._file_args(app)} up -d"
+            result = await self._run_compose_command(cmd, app.path, action="start")
 
             if result["success"]:
                 logger.info("app_started", name=app.name)
@@ -78,8 +194,9 @@ class ComposeService:
         try:
             logger.info("stopping_app", name=app.name, path=app.path)
 
-            cmd = f"{self.compose_cmd} -f {app.compose_file} down"
-            result = await self._run_compose_command(cmd, app.path)
+            # Containers are kept so a later start can reuse them
+            cmd = f"{self.compose_cmd} {self._file_args(app)} stop"
+            result = await self._run_compose_command(cmd, app.path, action="stop")
 
             if result["success"]:
                 logger.info("app_stopped", name=app.name)
@@ -97,8 +214,8 @@ class ComposeService:
         try:
             logger.info("restarting_app", name=app.name, path=app.path)
 
-            cmd = f"{self.compose_cmd} -f {app.compose_file} restart"
-            result = await self._run_compose_command(cmd, app.path)
+            cmd = f"{self.compose_cmd} {self._file_args(app)} restart"
+            result = await self._run_compose_command(cmd, app.path, action="restart")
 
             if result["success"]:
                 logger.info("app_restarted", name=app.name)
@@ -111,13 +228,13 @@ class ComposeService:
             logger.error("restart_app_exception", name=app.name, error=str(e))
             return {"status": "error", "message": str(e)}
 
-    async def rebuild_app(self, app: ComposeApp) -> Dict[str, str]:
+    async def rebuild_app(self, app: ComposeApp, on_output: Optional[OutputCallback] = None) -> Dict[str, str]:
         """Rebuild and restart a Docker Compose application"""
         try:
             logger.info("rebuilding_app", name=app.name, path=app.path)
 
-            cmd = f"{self.compose_cmd} -f {app.compose_file} up -d --build --force-recreate"
-            result = await self._run_compose_command(cmd, app.path)
+            cmd = f"{self.compose_cmd} {self._file_args(app)} up -d --build --force-recreate"
+            result = await self.stream_compose_command(cmd, app.path, on_output, action="rebuild")
 
             if result["success"]:
                 logger.info("app_rebuilt", name=app.name)
@@ -130,13 +247,13 @@ class ComposeService:
             logger.error("rebuild_app_exception", name=app.name, error=str(e))
             return {"status": "error", "message": str(e)}
 
-    async def pull_images(self, app: ComposeApp) -> Dict[str, str]:
+    async def pull_images(self, app: ComposeApp, on_output: Optional[OutputCallback] = None) -> Dict[str, str]:
         """Pull latest images for an application"""
         try:
             logger.info("pulling_images", name=app.name, path=app.path)
 
-            cmd = f"{self.compose_cmd} -f {app.compose_file} pull"
-            result = await self._run_compose_command(cmd, app.path)
+            cmd = f"{self.compose_cmd} {self._file_args(app)} pull"
+            result = await self.stream_compose_command(cmd, app.path, on_output, action="pull")
 
             if result["success"]:
                 logger.info("images_pulled", name=app.name)
@@ -152,11 +269,11 @@ class ComposeService:
     async def get_app_logs(self, app: ComposeApp, tail: int = 100, follow: bool = False) -> Dict[str, str]:
         """Get logs for a Docker Compose application"""
         try:
-            cmd = f"{self.compose_cmd} -f {app.compose_file} logs --tail={tail}"
+            cmd = f"{self.compose_cmd} {self._file_args(app)} logs --tail={tail}"
             if follow:
                 cmd += " -f"
 
-            result = await self._run_compose_command(cmd, app.path)
+            result = await self._run_compose_command(cmd, app.path, action="logs")
 
             if result["success"]:
                 return {"status": "success", "logs": result["output"]}
@@ -167,8 +284,20 @@ class ComposeService:
             logger.error("get_logs_exception", name=app.name, error=str(e))
             return {"status": "error", "message": str(e)}
 
-    async def _run_compose_command(self, command: str, working_dir: str, timeout: int = 120) -> Dict:
-        """Run a docker compose command"""
+    async def _run_compose_command(
+        self,
+        command: str,
+        working_dir: str,
+        timeout: int = 120,
+        action: str = "other"
+    ) -> Dict:
+        """Run a docker compose command, recording its run time and exit code per action"""
+        started = time.perf_counter()
+        result = await self._execute_compose_command(command, working_dir, timeout)
+        observe_compose_command(action, result["return_code"], time.perf_counter() - started)
+        return result
+
+    async def _execute_compose_command(self, command: str, working_dir: str, timeout: int) -> Dict:
         try:
             process = await asyncio.create_subprocess_shell(
                 command,
@@ -214,4 +343,125 @@ class ComposeService:
             }
 
 
+    async def stream_compose_command(
+        self,
+        command: str,
+        working_dir: str,
+        on_output: Optional[OutputCallback] = None,
+        idle_timeout: Optional[float] = None,
+        action: str = "other"
+    ) -> Dict:
+        """
+        Run a docker compose command, reading stdout and stderr line by line
+        as they are produced instead of buffering until exit. Only the last
+        JOB_OUTPUT_LINES lines of each stream are kept for the result.
+
+        There is no overall timeout: the command is only stopped after
+        `idle_timeout` seconds without output (COMPOSE_IDLE_TIMEOUT by
+        default, 0 disables). Cancelling the caller terminates the command.
+        Run time and exit code are recorded per action.
+        """
+        started = time.perf_counter()
+        return_code = "cancelled"
+        try:
+            result = await self._stream_compose_command(command, working_dir, on_output, idle_timeout)
+            return_code = result["return_code"]
+            return result
+        finally:
+            observe_compose_command(action, return_code, time.perf_counter() - started)
+
+    async def _stream_compose_command(
+        self,
+        command: str,
+        working_dir: str,
+        on_output: Optional[OutputCallback],
+        idle_timeout: Optional[float]
+    ) -> Dict:
+        idle_timeout = settings.COMPOSE_IDLE_TIMEOUT if idle_timeout is None else idle_timeout
+        loop = asyncio.get_running_loop()
+        try:
+            process = await asyncio.create_subprocess_shell(
+                command,
+                cwd=working_dir,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                # Own process group, so the shell and compose are stopped together
+                start_new_session=True,
+                limit=1024 * 1024
+            )
+        except Exception as e:
+            logger.error("run_compose_command_failed", command=command, error=str(e))
+            return {"success": False, "output": "", "error": str(e), "return_code": -1}
+
+        kept = {
+            "stdout": deque(maxlen=settings.JOB_OUTPUT_LINES),
+            "stderr": deque(maxlen=settings.JOB_OUTPUT_LINES),
+        }
+        last_output = loop.time()
+
+        async def pump(reader: asyncio.StreamReader, stream: str) -> None:
+            nonlocal last_output
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                last_output = loop.time()
+                # Progress bars redraw with carriage returns; keep the final state
+                text = line.decode("utf-8", errors="replace").rstrip("\r\n").rsplit("\r", 1)[-1]
+                kept[stream].append(text)
+                if on_output is not None:
+                    on_output(stream, text)
+
+        pumps = asyncio.gather(pump(process.stdout, "stdout"), pump(process.stderr, "stderr"))
+        # Mark the outcome as retrieved when the pumps are abandoned on cancellation
+        pumps.add_done_callback(lambda f: f.cancelled() or f.exception())
+        timed_out = False
+        try:
+            while not pumps.done():
+                await asyncio.wait({pumps}, timeout=1.0)
+                if idle_timeout and not pumps.done() and loop.time() - last_output > idle_timeout:
+                    timed_out = True
+                    await self._stop_process(process)
+            await pumps
+            return_code = await process.wait()
+        except asyncio.CancelledError:
+            pumps.cancel()
+            await self._stop_process(process)
+            logger.info("compose_command_cancelled", command=command)
+            raise
+        except Exception as e:
+            pumps.cancel()
+            await self._stop_process(process)
+            logger.error("run_compose_command_failed", command=command, error=str(e))
+            return {"success": False, "output": "", "error": str(e), "return_code": -1}
+
+        success = return_code == 0 and not timed_out
+        error = ""
+        if timed_out:
+            error = f"Command produced no output for {idle_timeout:g} seconds and was stopped"
+        elif not success:
+            error = "\n".join(kept["stderr"])
+        return {
+            "success": success,
+            "output": "\n".join(kept["stdout"]),
+            "error": error,
+            "return_code": return_code
+        }
+
+    @staticmethod
+    async def _stop_process(process: asyncio.subprocess.Process, grace: float = 10.0) -> None:
+        """Terminate a command's process group, killing it if it does not exit in time"""
+        for sig in (signal.SIGTERM, signal.SIGKILL):
+            if process.returncode is not None:
+                return
+            try:
+                os.killpg(process.pid, sig)
+            except ProcessLookupError:
+                return
+            try:
+                await asyncio.wait_for(process.wait(), timeout=grace)
+            except asyncio.TimeoutError:
+                continue
+
+
 compose_service = ComposeService()
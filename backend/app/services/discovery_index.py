@@ -0,0 +1,376 @@
+"""
+Incremental index of Docker Compose files under the configured search paths
+"""
+import hashlib
+import os
+import stat
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import structlog
+import yaml
+
+from app.core.config import settings
+from app.core.metrics import COMPOSE_PARSE_DURATION
+
+logger = structlog.get_logger()
+
+COMPOSE_FILENAMES = ("docker-compose.yml", "docker-compose.yaml", "compose.yml", "compose.yaml")
+
+# libyaml's loader is several times faster than the pure-Python one
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def parse_compose_yaml(content: bytes) -> Any:
+    """Parse a compose document with the fastest safe loader available"""
+    return yaml.load(content, Loader=YAML_LOADER)
+
+
+def _timed_parse(content: bytes) -> Tuple[Any, Optional[str], float]:
+    """Parse on a pool worker; returns (data, error, milliseconds)"""
+    started = time.perf_counter()
+    try:
+        data, error = parse_compose_yaml(content), None
+    except Exception as e:
+        # Construction errors (e.g. an impossible date) are not YAMLErrors
+        data, error = None, str(e) or type(e).__name__
+    return data, error, (time.perf_counter() - started) * 1000
+
+
+@dataclass
+class ComposeFileEntry:
+    """A compose file known to the index"""
+    path: str
+    mtime_ns: int
+    size: int
+    inode: int
+    content_hash: str
+    data: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    parse_ms: Optional[float] = None
+
+
+@dataclass
+class _DirectoryEntry:
+    """Cached listing of a directory, valid while its mtime and inode are unchanged"""
+    mtime_ns: int
+    inode: int
+    subdirs: List[str]
+    compose_files: List[str]
+
+
+@dataclass
+class ScanResult:
+    """Outcome of a scan: every current compose file plus what changed since the last scan"""
+    files: List[ComposeFileEntry] = field(default_factory=list)
+    added: List[str] = field(default_factory=list)
+    modified: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    parse_ms: float = 0.0  # total time spent parsing changed files
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.added or self.modified or self.removed)
+
+
+class ComposeFileIndex:
+    """
+    Walks the search paths once for all compose filenames and remembers what it saw.
+
+    Directory listings are reused while a directory's mtime and inode are
+    unchanged (adding, removing or renaming an entry bumps the mtime), so a
+    rescan of an unchanged tree costs one stat per directory and compose file.
+    Compose files are only re-read when their stat changes, and only re-parsed
+    when their content hash changes.
+
+    Parsing runs on a pool of DISCOVERY_PARSE_WORKERS threads while the walk
+    goes on; only a directory's subdirectories wait for its compose files,
+    whose bind mounts decide what to prune. A file larger than
+    DISCOVERY_MAX_FILE_SIZE is not parsed, and one whose parse takes longer
+    than DISCOVERY_PARSE_TIMEOUT is abandoned and recorded as an error until
+    it changes, so neither can stall a scan. Parse times are kept per file.
+    """
+
+    def __init__(self, ignore_dirs: Optional[List[str]] = None):
+        self.ignore_dirs: Set[str] = set(ignore_dirs if ignore_dirs is not None else settings.DISCOVERY_IGNORE_DIRS)
+        self._dirs: Dict[str, _DirectoryEntry] = {}
+        self._files: Dict[str, ComposeFileEntry] = {}
+        self._lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def scan(self, search_paths: List[str]) -> ScanResult:
+        """Walk the search paths and return the current compose files"""
+        with self._lock:
+            result = ScanResult()
+            seen_dirs: Set[str] = set()
+            seen_files: Set[str] = set()
+            visited: Set[Tuple[int, int]] = set()
+            roots = [os.path.abspath(os.path.expanduser(p)) for p in search_paths]
+
+            for root in roots:
+                if not os.path.isdir(root):
+                    logger.debug("search_path_not_found", path=root)
+                    continue
+
+                logger.debug("scanning_directory", path=root)
+                self._walk(root, result, seen_dirs, seen_files, visited)
+
+            # Anything cached under the scanned roots but not reached this time has gone away
+            for path in [p for p in self._files if p not in seen_files and _is_under(p, roots)]:
+                del self._files[path]
+                result.removed.append(path)
+            for path in [p for p in self._dirs if p not in seen_dirs and _is_under(p, roots)]:
+                del self._dirs[path]
+
+            if result.changed:
+                logger.info(
+                    "compose_index_updated",
+                    files=len(result.files),
+                    added=len(result.added),
+                    modified=len(result.modified),
+                    removed=len(result.removed),
+                    parse_ms=round(result.parse_ms, 2)
+                )
+            return result
+
+    def get(self, path: str) -> Optional[ComposeFileEntry]:
+        """Return the cached entry for a compose file, if indexed"""
+        return self._files.get(os.path.abspath(path))
+
+    def refresh_file(self, path: str) -> Optional[ComposeFileEntry]:
+        """Re-index a single compose file, dropping it if it no longer exists"""
+        path = os.path.abspath(path)
+        with self._lock:
+            result = ScanResult()
+            indexed = self._index_file(path, result)
+            if indexed is None:
+                self._files.pop(path, None)
+                return None
+            entry, future = indexed
+            self._finish_parse(entry, future, result)
+            return entry
+
+    def _walk(
+        self,
+        root: str,
+        result: ScanResult,
+        seen_dirs: Set[str],
+        seen_files: Set[str],
+        visited: Set[Tuple[int, int]]
+    ) -> None:
+        stack = [root]
+        # Directories whose compose files are still being parsed
+        deferred: List[Tuple[str, _DirectoryEntry, List[Tuple[ComposeFileEntry, Optional[Future]]]]] = []
+        while stack or deferred:
+            if not stack:
+                for directory, listing, parsing in deferred:
+                    for entry, future in parsing:
+                        self._finish_parse(entry, future, result)
+                    self._descend(directory, listing, [entry for entry, _ in parsing], stack)
+                deferred = []
+                continue
+
+            directory = stack.pop()
+            try:
+                st = os.stat(directory)
+            except OSError:
+                continue
+
+            # Guard against symlink loops and overlapping search paths
+            key = (st.st_dev, st.st_ino)
+            if key in visited:
+                continue
+            visited.add(key)
+            seen_dirs.add(directory)
+
+            listing = self._dirs.get(directory)
+            if listing is None or listing.mtime_ns != st.st_mtime_ns or listing.inode != st.st_ino:
+                listing = self._list_directory(directory, st)
+                if listing is None:
+                    continue
+                self._dirs[directory] = listing
+
+            parsing = []
+            for name in listing.compose_files:
+                path = os.path.join(directory, name)
+                indexed = self._index_file(path, result)
+                if indexed is None:
+                    continue
+                seen_files.add(path)
+                result.files.append(indexed[0])
+                parsing.append(indexed)
+
+            if any(future is not None for _, future in parsing):
+                deferred.append((directory, listing, parsing))
+            else:
+                self._descend(directory, listing, [entry for entry, _ in parsing], stack)
+
+    def _descend(
+        self,
+        directory: str,
+        listing: _DirectoryEntry,
+        entries: List[ComposeFileEntry],
+        stack: List[str]
+    ) -> None:
+        pruned: Set[str] = set()
+        for entry in entries:
+            pruned.update(self._bind_mount_dirs(directory, entry.data))
+        for name in reversed(listing.subdirs):
+            if name not in pruned:
+                stack.append(os.path.join(directory, name))
+
+    def _list_directory(self, directory: str, st: os.stat_result) -> Optional[_DirectoryEntry]:
+        subdirs = []
+        compose_files = []
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir():
+                            if entry.name not in self.ignore_dirs:
+                                subdirs.append(entry.name)
+                        elif entry.name in COMPOSE_FILENAMES and entry.is_file():
+                            compose_files.append(entry.name)
+                    except OSError:
+                        continue
+        except OSError as e:
+            logger.debug("scan_directory_failed", path=directory, error=str(e))
+            return None
+
+        subdirs.sort()
+        compose_files.sort(key=COMPOSE_FILENAMES.index)
+        return _DirectoryEntry(
+            mtime_ns=st.st_mtime_ns,
+            inode=st.st_ino,
+            subdirs=subdirs,
+            compose_files=compose_files
+        )
+
+    def _index_file(
+        self,
+        path: str,
+        result: ScanResult
+    ) -> Optional[Tuple[ComposeFileEntry, Optional[Future]]]:
+        """
+        Index a compose file. Returns its entry and, when it needs parsing,
+        the pool future to hand to `_finish_parse`.
+        """
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if not stat.S_ISREG(st.st_mode):
+            return None
+
+        cached = self._files.get(path)
+        if (cached is not None and cached.mtime_ns == st.st_mtime_ns
+                and cached.size == st.st_size and cached.inode == st.st_ino):
+            return cached, None
+
+        entry = ComposeFileEntry(
+            path=path,
+            mtime_ns=st.st_mtime_ns,
+            size=st.st_size,
+            inode=st.st_ino,
+            content_hash=""
+        )
+        future = None
+        if st.st_size > settings.DISCOVERY_MAX_FILE_SIZE:
+            entry.error = f"File is larger than {settings.DISCOVERY_MAX_FILE_SIZE} bytes"
+            logger.warning("compose_file_too_large", path=path, size=st.st_size)
+        else:
+            try:
+                with open(path, 'rb') as f:
+                    content = f.read()
+            except OSError as e:
+                logger.error("compose_read_failed", path=path, error=str(e))
+                return None
+
+            entry.content_hash = hashlib.sha256(content).hexdigest()
+            if cached is not None and cached.content_hash == entry.content_hash:
+                # Touched but not edited: keep the parsed data
+                cached.mtime_ns = st.st_mtime_ns
+                cached.size = st.st_size
+                cached.inode = st.st_ino
+                return cached, None
+            future = self._parse_pool().submit(_timed_parse, content)
+
+        self._files[path] = entry
+        if cached is None:
+            result.added.append(path)
+        else:
+            result.modified.append(path)
+        return entry, future
+
+    def _finish_parse(self, entry: ComposeFileEntry, future: Optional[Future], result: ScanResult) -> None:
+        """Wait for a file's parse, up to DISCOVERY_PARSE_TIMEOUT"""
+        if future is None:
+            return
+        try:
+            entry.data, entry.error, entry.parse_ms = future.result(timeout=settings.DISCOVERY_PARSE_TIMEOUT)
+        except FutureTimeoutError:
+            # The worker cannot be interrupted; its result is discarded
+            entry.error = f"Parsing took longer than {settings.DISCOVERY_PARSE_TIMEOUT} seconds"
+            logger.warning("compose_parse_timed_out", path=entry.path, timeout=settings.DISCOVERY_PARSE_TIMEOUT)
+            return
+
+        COMPOSE_PARSE_DURATION.observe(entry.parse_ms / 1000)
+        entry.parse_ms = round(entry.parse_ms, 2)
+        result.parse_ms += entry.parse_ms
+        if entry.error:
+            logger.error("compose_parse_failed", path=entry.path, error=entry.error)
+        elif entry.parse_ms >= settings.DISCOVERY_SLOW_PARSE_MS:
+            logger.warning("compose_parse_slow", path=entry.path, parse_ms=entry.parse_ms, size=entry.size)
+        else:
+            logger.debug("compose_parsed", path=entry.path, parse_ms=entry.parse_ms)
+
+    def _parse_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=settings.DISCOVERY_PARSE_WORKERS,
+                thread_name_prefix="compose-parse"
+            )
+        return self._pool
+
+    def slowest(self, limit: int = 10) -> List[ComposeFileEntry]:
+        """Indexed files by parse time, slowest first"""
+        timed = [entry for entry in self._files.values() if entry.parse_ms is not None]
+        return sorted(timed, key=lambda entry: entry.parse_ms, reverse=True)[:limit]
+
+    @staticmethod
+    def _bind_mount_dirs(directory: str, compose_data: Optional[Dict[str, Any]]) -> Set[str]:
+        """
+        Names of direct subdirectories bind-mounted into containers by this
+        compose file (e.g. ./data:/var/lib/postgresql/data). These hold volume
+        data, not compose projects, and can be huge, so the walk skips them.
+        """
+        names: Set[str] = set()
+        if not isinstance(compose_data, dict) or not isinstance(compose_data.get('services'), dict):
+            return names
+
+        for service in compose_data['services'].values():
+            if not isinstance(service, dict):
+                continue
+            for volume in service.get('volumes') or []:
+                if isinstance(volume, str):
+                    source = volume.split(':', 1)[0] if ':' in volume else ''
+                elif isinstance(volume, dict) and volume.get('type') == 'bind':
+                    source = str(volume.get('source', ''))
+                else:
+                    continue
+                if not source.startswith('.'):
+                    continue
+                resolved = os.path.normpath(os.path.join(directory, source))
+                if os.path.dirname(resolved) == directory:
+                    names.add(os.path.basename(resolved))
+        return names
+
+
+def _is_under(path: str, roots: List[str]) -> bool:
+    return any(path == root or path.startswith(root.rstrip(os.sep) + os.sep) for root in roots)
+
+
+compose_index = ComposeFileIndex()
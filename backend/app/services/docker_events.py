@@ -0,0 +1,159 @@
+"""
+Docker events subscriber that patches container state in the app registry
+"""
+import asyncio
+import threading
+from typing import Any, Dict, Optional
+
+import structlog
+
+from app.core.config import settings
+from app.models.compose import ContainerState
+from app.services.app_registry import app_registry
+from app.services.async_docker import async_docker_service
+from app.services.docker_service import compute_app_state, docker_service
+
+logger = structlog.get_logger()
+
+# Container lifecycle events that change what the dashboard shows
+WATCHED_EVENTS = ["create", "start", "die", "pause", "unpause", "destroy", "health_status"]
+
+EVENT_STATES = {
+    "create": ContainerState.CREATED,
+    "start": ContainerState.RUNNING,
+    "unpause": ContainerState.RUNNING,
+    "die": ContainerState.EXITED,
+    "pause": ContainerState.PAUSED,
+}
+
+
+class DockerEventSubscriber:
+    """
+    Long-lived consumer of the Docker /events stream.
+
+    docker-py's event stream is blocking, so it is read on a dedicated thread
+    and each event is handed to the event loop, where the matching
+    ServiceInfo and its owning ComposeApp are updated in place.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stream = None
+        self._stopping = threading.Event()
+        self.connected = False
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    async def start(self) -> None:
+        """Start consuming events in the background"""
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._consume, name="docker-events", daemon=True)
+        self._thread.start()
+        logger.info("docker_events_subscriber_started")
+
+    async def stop(self) -> None:
+        """Stop consuming events"""
+        if not self.running:
+            return
+        self._stopping.set()
+        if self._stream is not None:
+            self._stream.close()
+        await self._loop.run_in_executor(None, self._thread.join, 5)
+        self._thread = None
+        self.connected = False
+        logger.info("docker_events_subscriber_stopped")
+
+    def _consume(self) -> None:
+        backoff = 1.0
+        while not self._stopping.is_set():
+            try:
+                self._stream = docker_service.client.events(
+                    decode=True,
+                    filters={
+                        "type": "container",
+                        "event": WATCHED_EVENTS,
+                        "label": ["com.docker.compose.project"],
+                    }
+                )
+                self.connected = True
+                backoff = 1.0
+                # Events may have been missed while disconnected
+                asyncio.run_coroutine_threadsafe(self._resync(), self._loop)
+
+                for event in self._stream:
+                    self._loop.call_soon_threadsafe(self.handle_event, event)
+            except Exception as e:
+                if self._stopping.is_set():
+                    break
+                logger.warning("docker_events_stream_failed", error=str(e), retry_in=backoff)
+            finally:
+                self.connected = False
+
+            if not self._stopping.wait(backoff):
+                backoff = min(backoff * 2, settings.DOCKER_EVENTS_MAX_BACKOFF)
+
+    async def _resync(self) -> None:
+        """Reconcile every registered app with a single container listing"""
+        apps = app_registry.list()
+        if not apps:
+            return
+        try:
+            refreshed = await async_docker_service.refresh_app_states(apps)
+            for app in refreshed:
+                app_registry.upsert(app)
+            logger.info("docker_events_resynced", count=len(refreshed))
+        except Exception as e:
+            logger.error("docker_events_resync_failed", error=str(e))
+
+    def handle_event(self, event: Dict[str, Any]) -> None:
+        """Apply a single container event to the registry"""
+        action = event.get("Action") or event.get("status") or ""
+        actor = event.get("Actor", {})
+        container_id = actor.get("ID") or event.get("id")
+        attributes = actor.get("Attributes", {})
+        project = attributes.get("com.docker.compose.project")
+        service_name = attributes.get("com.docker.compose.service")
+        if not project or not service_name:
+            return
+
+        working_dir = attributes.get("com.docker.compose.project.working_dir")
+        for app in app_registry.find_by_project(project, working_dir):
+            service = next((s for s in app.services if s.name == service_name), None)
+            if service is None:
+                continue
+
+            if action.startswith("health_status"):
+                service.health_status = action.split(":", 1)[1].strip() if ":" in action else None
+            elif action == "destroy":
+                # Ignore the removal of a container that was already replaced
+                if service.container_id not in (None, container_id):
+                    continue
+                service.container_id = None
+                service.state = ContainerState.CREATED
+                service.health_status = None
+            elif action in EVENT_STATES:
+                service.container_id = container_id
+                service.state = EVENT_STATES[action]
+                if action in ("create", "die"):
+                    service.health_status = None
+            else:
+                continue
+
+            app.state = compute_app_state(app.services)
+            app_registry.upsert(app)
+            logger.debug(
+                "container_event_applied",
+                app=app.name,
+                service=service_name,
+                action=action,
+                state=service.state.value
+            )
+
+
+docker_event_subscriber = DockerEventSubscriber()
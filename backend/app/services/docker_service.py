@@ -3,21 +3,122 @@ Docker service for managing Docker Engine and Compose
 """
 import docker
 from docker.errors import DockerException, NotFound, APIError
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple
 import structlog
 import os
-import yaml
+import time
 from pathlib import Path
 
 from app.models.compose import (
     ComposeApp, ServiceInfo, AppState, ContainerState,
-    PortMapping, VolumeInfo, ResourceUsage, LogEntry
+    VolumeInfo, ResourceUsage, LogEntry
 )
 from app.core.config import settings
+from app.core.metrics import DISCOVERY_PHASE_DURATION, instrument_docker_client
+from app.services.compose_resolver import ComposeResolveError, ResolvedProject, compose_resolver
+from app.services.discovery_index import ComposeFileEntry, compose_index
+from app.services.log_parser import LogEntryStream
 
 logger = structlog.get_logger()
 
 
+def compute_app_state(services: List[ServiceInfo]) -> AppState:
+    """Derive an app's state from the state of its services"""
+    if not any(s.state == ContainerState.RUNNING for s in services):
+        return AppState.STOPPED
+    if all(s.state == ContainerState.RUNNING for s in services if s.container_id):
+        return AppState.RUNNING
+    return AppState.PARTIALLY_HEALTHY
+
+
+def calculate_resource_usage(stats: Dict[str, Any]) -> ResourceUsage:
+    """Convert a raw Engine API stats sample into ResourceUsage"""
+    cpu_stats = stats.get('cpu_stats') or {}
+    precpu_stats = stats.get('precpu_stats') or {}
+
+    # Calculate CPU percentage
+    cpu_delta = cpu_stats.get('cpu_usage', {}).get('total_usage', 0) - \
+        precpu_stats.get('cpu_usage', {}).get('total_usage', 0)
+    system_delta = cpu_stats.get('system_cpu_usage', 0) - precpu_stats.get('system_cpu_usage', 0)
+    # percpu_usage is absent on cgroup v2 hosts; online_cpus is the reliable count
+    cpu_count = cpu_stats.get('online_cpus') or len(cpu_stats.get('cpu_usage', {}).get('percpu_usage') or []) or 1
+    cpu_percent = (cpu_delta / system_delta) * cpu_count * 100.0 if system_delta > 0 and cpu_delta > 0 else 0.0
+
+    # Calculate memory
+    memory_stats = stats.get('memory_stats') or {}
+    memory_mb = memory_stats.get('usage', 0) / (1024 * 1024)
+    memory_limit = memory_stats.get('limit', 0) / (1024 * 1024)
+    memory_percent = (memory_mb / memory_limit) * 100.0 if memory_limit else 0.0
+
+    # Network stats
+    networks = stats.get('networks') or {}
+    network_rx_mb = sum(net.get('rx_bytes', 0) for net in networks.values()) / (1024 * 1024)
+    network_tx_mb = sum(net.get('tx_bytes', 0) for net in networks.values()) / (1024 * 1024)
+
+    # Block I/O stats (cgroup v1 reports "Read"/"Write", v2 "read"/"write")
+    disk_read = disk_write = 0
+    for entry in (stats.get('blkio_stats') or {}).get('io_service_bytes_recursive') or []:
+        op = str(entry.get('op', '')).lower()
+        if op == 'read':
+            disk_read += entry.get('value', 0)
+        elif op == 'write':
+            disk_write += entry.get('value', 0)
+
+    return ResourceUsage(
+        cpu_percent=round(cpu_percent, 2),
+        memory_mb=round(memory_mb, 2),
+        memory_percent=round(memory_percent, 2),
+        disk_read_mb=round(disk_read / (1024 * 1024), 2),
+        disk_write_mb=round(disk_write / (1024 * 1024), 2),
+        network_rx_mb=round(network_rx_mb, 2),
+        network_tx_mb=round(network_tx_mb, 2),
+        memory_limit_mb=round(memory_limit, 2)
+    )
+
+
+def sum_resource_usage(usages: List[ResourceUsage]) -> ResourceUsage:
+    """
+    Add up per-container usage into an app-level total. memory_percent is the
+    sum of each container's share of its own limit, which equals the share of
+    host memory for containers without a memory limit; memory_limit_mb adds
+    up the limits the same way.
+    """
+    return ResourceUsage(
+        cpu_percent=round(sum(u.cpu_percent for u in usages), 2),
+        memory_mb=round(sum(u.memory_mb for u in usages), 2),
+        memory_percent=round(sum(u.memory_percent for u in usages), 2),
+        disk_read_mb=round(sum(u.disk_read_mb for u in usages), 2),
+        disk_write_mb=round(sum(u.disk_write_mb for u in usages), 2),
+        network_rx_mb=round(sum(u.network_rx_mb for u in usages), 2),
+        network_tx_mb=round(sum(u.network_tx_mb for u in usages), 2),
+        memory_limit_mb=round(sum(u.memory_limit_mb for u in usages), 2)
+    )
+
+
+def dependency_levels(services: Dict[str, Any]) -> Optional[List[List[str]]]:
+    """
+    Group compose services into levels by `depends_on`: every service comes
+    after the services it depends on. Returns None on a dependency cycle.
+    """
+    remaining = {}
+    for name, config in services.items():
+        depends_on = (config or {}).get('depends_on') or []
+        # Short form is a list of names, long form a mapping of name -> options
+        remaining[name] = {dep for dep in depends_on if dep in services and dep != name}
+
+    levels = []
+    while remaining:
+        level = sorted(name for name, deps in remaining.items() if not deps)
+        if not level:
+            return None
+        levels.append(level)
+        for name in level:
+            del remaining[name]
+        for deps in remaining.values():
+            deps.difference_update(level)
+    return levels
+
+
 class DockerService:
     """Service for interacting with Docker Engine"""
 
@@ -59,17 +160,24 @@ class DockerService:
                 base_url = "unix:///var/run/docker.sock"
 
             logger.info("using_docker_host", base_url=base_url)
+            self.base_url = base_url
             self.client = docker.DockerClient(base_url=base_url)
             self.api_client = docker.APIClient(base_url=base_url)
+            instrument_docker_client(self.client.api)
+            instrument_docker_client(self.api_client)
             logger.info("docker_client_initialized_successfully", base_url=base_url)
         except DockerException as e:
             logger.error("docker_client_init_failed", error=str(e), base_url=base_url if 'base_url' in locals() else 'unknown')
             raise
 
+    def ping(self) -> None:
+        """Ping the Docker engine, raising if it cannot be reached"""
+        self.client.ping()
+
     def is_docker_available(self) -> bool:
         """Check if Docker engine is available"""
         try:
-            self.client.ping()
+            self.ping()
             return True
         except Exception as e:
             logger.error("docker_ping_failed", error=str(e))
@@ -104,115 +212,263 @@ class DockerService:
 
         discovered_apps = []
 
-        for search_path in search_paths:
-            path = Path(search_path).expanduser()
-            if not path.exists():
-                logger.debug("search_path_not_found", path=str(path))
+        # Only compose files that changed since the last scan are re-parsed
+        started = time.perf_counter()
+        scan = compose_index.scan(search_paths)
+        DISCOVERY_PHASE_DURATION.labels("walk").observe(time.perf_counter() - started)
+        DISCOVERY_PHASE_DURATION.labels("parse").observe(scan.parse_ms / 1000)
+
+        # Resolve every compose container with a single daemon round trip
+        started = time.perf_counter()
+        containers = self._list_compose_containers()
+        DISCOVERY_PHASE_DURATION.labels("containers").observe(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        for entry in scan.files:
+            project = self._resolve(entry)
+            if project is None:
                 continue
+            try:
+                app = self._build_compose_app(project, containers)
+                if app:
+                    discovered_apps.append(app)
+                    logger.info("compose_app_discovered", name=app.name, path=entry.path)
+            except Exception as e:
+                logger.error("compose_parse_failed", path=entry.path, error=str(e))
+        DISCOVERY_PHASE_DURATION.labels("resolve").observe(time.perf_counter() - started)
 
-            logger.info("scanning_directory", path=str(path))
+        return discovered_apps
 
-            # Look for docker-compose files
-            for compose_file in ["docker-compose.yml", "docker-compose.yaml", "compose.yml", "compose.yaml"]:
-                for compose_path in path.rglob(compose_file):
-                    try:
-                        app = self._parse_compose_file(compose_path)
-                        if app:
-                            discovered_apps.append(app)
-                            logger.info("compose_app_discovered", name=app.name, path=str(compose_path))
-                    except Exception as e:
-                        logger.error("compose_parse_failed", path=str(compose_path), error=str(e))
+    def refresh_compose_file(self, compose_path: str) -> Optional[ComposeApp]:
+        """
+        Re-index a single compose file and rebuild its app, resolving only
+        that project's containers. Returns None if the file is gone or invalid.
+        """
+        entry = compose_index.refresh_file(compose_path)
+        if entry is None:
+            compose_resolver.forget(compose_path)
+            return None
+        project = self._resolve(entry)
+        return self._build_compose_app(project) if project else None
 
-        return discovered_apps
+    def refresh_app_states(self, apps: List[ComposeApp]) -> List[ComposeApp]:
+        """
+        Rebuild apps from their indexed compose data against a fresh container
+        listing (one daemon call), e.g. to resync after missed Docker events
+        """
+        containers = self._list_compose_containers()
+        refreshed = []
+        for app in apps:
+            compose_path = Path(app.path) / app.compose_file
+            # Apps loaded from the registry database are not indexed yet
+            entry = compose_index.get(str(compose_path)) or compose_index.refresh_file(str(compose_path))
+            project = self._resolve(entry) if entry else None
+            if project is None:
+                continue
+            rebuilt = self._build_compose_app(project, containers)
+            if rebuilt:
+                refreshed.append(rebuilt)
+        return refreshed
+
+    def plan_container_action(
+        self,
+        app: ComposeApp,
+        action: str,
+        reconcile: bool = False
+    ) -> Optional[List[List[Tuple[str, str]]]]:
+        """
+        Plan a start, stop or restart of an app's existing containers without
+        the compose CLI. Returns (service, container_id) pairs grouped into
+        levels by service `depends_on`; each level can be acted on in
+        parallel, in order (reversed for stop). Containers already in the
+        target state are left out.
+
+        Returns None when compose has to reconcile the project instead: on
+        start, if `reconcile` is set, a service has no container, or any file
+        of the resolved project (compose files, includes, .env) changed after
+        the containers were created; and whenever service dependencies form
+        a cycle.
+        """
+        compose_path = Path(app.path) / app.compose_file
+        entry = compose_index.get(str(compose_path)) or compose_index.refresh_file(str(compose_path))
+        project = self._resolve(entry) if entry else None
+        if project is None or not project.services:
+            return None
+        services = project.services
+
+        containers = self._list_compose_containers(project_name=app.name)
+        found = {name: containers.get((app.name, name)) for name in services}
+
+        if action == 'start':
+            if reconcile or any(container is None for container in found.values()):
+                return None
+            if any(container.attrs.get('State') == 'paused' for container in found.values()):
+                return None
+            created = min(container.attrs.get('Created', 0) for container in found.values())
+            for path in project.files:
+                try:
+                    if os.stat(path).st_mtime > created:
+                        return None
+                except OSError:
+                    continue
+
+        levels = dependency_levels(services)
+        if levels is None:
+            return None
+
+        plan = []
+        for level in levels:
+            targets = []
+            for name in level:
+                container = found.get(name)
+                if container is None:
+                    continue
+                state = container.attrs.get('State')
+                if action == 'start' and state == 'running':
+                    continue
+                if action == 'stop' and state not in ('running', 'restarting', 'paused'):
+                    continue
+                targets.append((name, container.id))
+            if targets:
+                plan.append(targets)
+        return plan[::-1] if action == 'stop' else plan
+
+    def stop_timeout(self, container_id: str) -> Optional[int]:
+        """The container's StopTimeout (compose's stop_grace_period), if it sets one"""
+        return (self.client.api.inspect_container(container_id).get('Config') or {}).get('StopTimeout')
+
+    def container_action(self, container_id: str, action: str, stop_timeout: Optional[int] = None) -> None:
+        """
+        Start, stop or restart one container through the Engine API. Pass
+        the container's `stop_timeout` for stop and restart: docker-py only
+        waits the client timeout plus the timeout it sends for the response,
+        and assumes 10 seconds when none is sent.
+        """
+        api = self.client.api
+        # docker-py's restart() always sends its own timeout, so restart is stop + start
+        if action == 'start':
+            api.start(container_id)
+        elif action == 'stop':
+            api.stop(container_id, timeout=stop_timeout)
+        elif action == 'restart':
+            api.stop(container_id, timeout=stop_timeout)
+            api.start(container_id)
+        else:
+            raise ValueError(f"Unsupported container action: {action}")
 
-    def _parse_compose_file(self, compose_path: Path) -> Optional[ComposeApp]:
-        """Parse a docker-compose.yml file"""
+    def list_published_ports(self) -> List[Dict[str, Any]]:
+        """
+        Host ports published by running containers, from a single sparse
+        listing. Each binding carries the container's compose labels, if any.
+        """
+        bindings = []
+        for container in self.client.containers.list(sparse=True):
+            labels = container.attrs.get('Labels') or {}
+            names = container.attrs.get('Names') or []
+            for port in container.attrs.get('Ports') or []:
+                if not port.get('PublicPort'):
+                    continue
+                bindings.append({
+                    "host_ip": port.get('IP') or "0.0.0.0",
+                    "host_port": port['PublicPort'],
+                    "container_port": port.get('PrivatePort'),
+                    "protocol": port.get('Type', 'tcp'),
+                    "container_id": container.id,
+                    "container_name": names[0].lstrip('/') if names else container.id[:12],
+                    "project": labels.get('com.docker.compose.project'),
+                    "working_dir": labels.get('com.docker.compose.project.working_dir'),
+                    "service": labels.get('com.docker.compose.service'),
+                })
+        return bindings
+
+    def _resolve(self, entry: ComposeFileEntry) -> Optional[ResolvedProject]:
+        """Resolve an indexed compose file; the model is reused while no file it read changed"""
+        if entry.error:
+            return None
         try:
-            with open(compose_path, 'r') as f:
-                compose_data = yaml.safe_load(f)
+            return compose_resolver.resolve(entry.path, entry.content_hash, entry.data)
+        except ComposeResolveError as e:
+            logger.error("compose_resolve_failed", path=entry.path, error=str(e))
+            return None
+        except Exception as e:
+            # Valid YAML can still be a malformed compose file; skip it, not the scan
+            logger.error("compose_resolve_failed", path=entry.path, error=str(e) or type(e).__name__)
+            return None
 
-            if not compose_data or 'services' not in compose_data:
+    def _build_compose_app(
+        self,
+        project: ResolvedProject,
+        containers: Optional[Dict[tuple, Any]] = None
+    ) -> Optional[ComposeApp]:
+        """Build a ComposeApp from a resolved compose project and the current containers"""
+        try:
+            if not project.services:
                 return None
 
+            compose_path = Path(project.path)
             app_dir = compose_path.parent
-            app_name = app_dir.name
+            app_name = project.name
             app_id = str(app_dir).replace("/", "_").replace("\\", "_")
 
+            if containers is None:
+                containers = self._list_compose_containers(project_name=app_name)
+
             # Get current state by checking containers
             services = []
-            app_state = AppState.STOPPED
             total_cpu = 0.0
             total_memory = 0.0
 
-            for service_name, service_config in compose_data.get('services', {}).items():
-                service_info = self._get_service_info(app_name, service_name, service_config)
+            for service_name, service_config in project.services.items():
+                container = containers.get((app_name, service_name))
+                service_info = self._get_service_info(service_name, service_config, container)
                 services.append(service_info)
 
                 if service_info.state == ContainerState.RUNNING:
-                    if app_state == AppState.STOPPED:
-                        app_state = AppState.PARTIALLY_HEALTHY
-                    elif app_state == AppState.PARTIALLY_HEALTHY:
-                        pass
                     total_cpu += service_info.cpu_percent
                     total_memory += service_info.memory_mb
 
-            if all(s.state == ContainerState.RUNNING for s in services if s.container_id):
-                app_state = AppState.RUNNING
-            elif all(s.state != ContainerState.RUNNING for s in services):
-                app_state = AppState.STOPPED
+            app_state = compute_app_state(services)
 
-            # Extract networks and volumes
-            networks = list(compose_data.get('networks', {}).keys())
-            volumes = list(compose_data.get('volumes', {}).keys())
+            # Cross-app ordering is declared with a top-level extension field:
+            #   x-dockpilot:
+            #     depends_on: [database]
+            depends_on = (project.extensions.get('x-dockpilot') or {}).get('depends_on') or []
+            if isinstance(depends_on, str):
+                depends_on = [depends_on]
 
             return ComposeApp(
                 id=app_id,
                 name=app_name,
                 path=str(app_dir),
                 compose_file=compose_path.name,
+                override_files=project.override_files,
                 state=app_state,
                 services=services,
-                networks=networks,
-                volumes=volumes,
+                networks=project.networks,
+                volumes=project.volumes,
+                depends_on=[str(name) for name in depends_on],
                 cpu_percent=total_cpu,
                 memory_mb=total_memory
             )
 
         except Exception as e:
-            logger.error("parse_compose_file_failed", path=str(compose_path), error=str(e))
+            logger.error("build_compose_app_failed", path=project.path, error=str(e))
             return None
 
-    def _get_service_info(self, project_name: str, service_name: str, service_config: Dict) -> ServiceInfo:
-        """Get information about a service"""
-        # Try to find running container
-        container = self._find_container(project_name, service_name)
-
+    def _get_service_info(
+        self,
+        service_name: str,
+        service_config: Dict,
+        container: Optional[Any] = None
+    ) -> ServiceInfo:
+        """
+        Get information about a service from its resolved compose config
+        (ports already parsed into PortMapping, environment a mapping) and container
+        """
         image = service_config.get('image', 'unknown')
-        ports = []
+        ports = service_config.get('ports') or []
         volumes = []
-        environment = {}
-
-        # Parse port mappings
-        port_config = service_config.get('ports', [])
-        for port in port_config:
-            if isinstance(port, str) and ':' in port:
-                parts = port.split(':')
-                if len(parts) >= 2:
-                    ports.append(PortMapping(
-                        host_port=int(parts[0]),
-                        container_port=int(parts[-1].split('/')[0]),
-                        protocol=parts[-1].split('/')[1] if '/' in parts[-1] else 'tcp'
-                    ))
-
-        # Parse environment variables
-        env_config = service_config.get('environment', {})
-        if isinstance(env_config, dict):
-            environment = env_config
-        elif isinstance(env_config, list):
-            for env in env_config:
-                if '=' in env:
-                    key, value = env.split('=', 1)
-                    environment[key] = value
+        environment = service_config.get('environment') or {}
 
         if container:
             return ServiceInfo(
@@ -223,9 +479,9 @@ class DockerService:
                 ports=ports,
                 volumes=volumes,
                 environment=environment,
-                cpu_percent=0.0,  # Will be updated by stats
+                cpu_percent=0.0,  # Filled from the resource sampler's cache
                 memory_mb=0.0,
-                health_status=container.attrs.get('State', {}).get('Health', {}).get('Status')
+                health_status=self._get_health_status(container)
             )
         else:
             return ServiceInfo(
@@ -236,93 +492,116 @@ class DockerService:
                 environment=environment
             )
 
-    def _find_container(self, project_name: str, service_name: str) -> Optional[Any]:
-        """Find a container by project and service name"""
+    def _list_compose_containers(self, project_name: Optional[str] = None) -> Dict[tuple, Any]:
+        """
+        List compose-managed containers in a single Engine API call and index
+        them by (com.docker.compose.project, com.docker.compose.service)
+        """
+        labels = [f'com.docker.compose.project={project_name}'] if project_name else ['com.docker.compose.project']
         try:
+            # sparse=True skips the per-container inspect docker-py does by default
             containers = self.client.containers.list(
                 all=True,
-                filters={
-                    'label': [
-                        f'com.docker.compose.project={project_name}',
-                        f'com.docker.compose.service={service_name}'
-                    ]
-                }
+                sparse=True,
+                filters={'label': labels}
             )
-            return containers[0] if containers else None
         except Exception as e:
-            logger.error("find_container_failed", project=project_name, service=service_name, error=str(e))
-            return None
+            logger.error("list_compose_containers_failed", project=project_name, error=str(e))
+            return {}
+
+        index: Dict[tuple, Any] = {}
+        for container in containers:
+            container_labels = container.attrs.get('Labels') or {}
+            key = (
+                container_labels.get('com.docker.compose.project'),
+                container_labels.get('com.docker.compose.service')
+            )
+            # Keep the first match per service, as the old per-service lookup did
+            index.setdefault(key, container)
+
+        logger.debug("compose_containers_indexed", count=len(index))
+        return index
+
+    @staticmethod
+    def _get_health_status(container: Any) -> Optional[str]:
+        """Extract the health status from full or sparse container attributes"""
+        state = container.attrs.get('State')
+        if isinstance(state, dict):
+            return state.get('Health', {}).get('Status')
+
+        # Sparse listings only expose health inside the human-readable status,
+        # e.g. "Up 5 minutes (healthy)" or "Up 3 seconds (health: starting)"
+        status = container.attrs.get('Status') or ''
+        if '(health: starting)' in status:
+            return 'starting'
+        if '(unhealthy)' in status:
+            return 'unhealthy'
+        if '(healthy)' in status:
+            return 'healthy'
+        return None
 
     def get_container_stats(self, container_id: str) -> Optional[ResourceUsage]:
         """Get resource usage statistics for a container"""
         try:
-            container = self.client.containers.get(container_id)
-            stats = container.stats(stream=False)
-
-            # Calculate CPU percentage
-            cpu_delta = stats['cpu_stats']['cpu_usage']['total_usage'] - \
-                       stats['precpu_stats']['cpu_usage']['total_usage']
-            system_delta = stats['cpu_stats']['system_cpu_usage'] - \
-                          stats['precpu_stats']['system_cpu_usage']
-            cpu_percent = (cpu_delta / system_delta) * len(stats['cpu_stats']['cpu_usage']['percpu_usage']) * 100.0
-
-            # Calculate memory
-            memory_mb = stats['memory_stats']['usage'] / (1024 * 1024)
-            memory_limit = stats['memory_stats']['limit'] / (1024 * 1024)
-            memory_percent = (memory_mb / memory_limit) * 100.0
-
-            # Network stats
-            networks = stats.get('networks', {})
-            network_rx_mb = sum(net['rx_bytes'] for net in networks.values()) / (1024 * 1024)
-            network_tx_mb = sum(net['tx_bytes'] for net in networks.values()) / (1024 * 1024)
-
-            return ResourceUsage(
-                cpu_percent=round(cpu_percent, 2),
-                memory_mb=round(memory_mb, 2),
-                memory_percent=round(memory_percent, 2),
-                disk_read_mb=0.0,  # Requires additional calculation
-                disk_write_mb=0.0,
-                network_rx_mb=round(network_rx_mb, 2),
-                network_tx_mb=round(network_tx_mb, 2)
-            )
+            # The low-level call skips the inspect that containers.get() performs
+            stats = self.client.api.stats(container_id, stream=False)
+            return calculate_resource_usage(stats)
         except Exception as e:
             logger.error("get_container_stats_failed", container_id=container_id, error=str(e))
             return None
 
-    def get_container_logs(self, container_id: str, tail: int = 100, follow: bool = False) -> List[LogEntry]:
-        """Get logs from a container"""
+    def create_api_client(self, max_pool_size: int = 10) -> docker.APIClient:
+        """Create a separate low-level client, e.g. for long-lived streams"""
+        return instrument_docker_client(docker.APIClient(base_url=self.base_url, max_pool_size=max_pool_size))
+
+    def get_container_logs(
+        self,
+        container_id: str,
+        tail: int = 100,
+        stream: Optional[str] = None
+    ) -> List[LogEntry]:
+        """Get logs from a container, optionally only its stdout or stderr"""
         try:
-            container = self.client.containers.get(container_id)
-            logs = container.logs(
-                tail=tail,
-                stream=follow,
-                timestamps=True,
-                stdout=True,
-                stderr=True
-            )
-
-            entries = []
-            if follow:
-                # For streaming, return generator
-                return logs
-            else:
-                # For non-streaming, parse logs
-                for line in logs.decode('utf-8').split('\n'):
-                    if line.strip():
-                        # Parse timestamp and message
-                        parts = line.split(' ', 1)
-                        if len(parts) == 2:
-                            entries.append(LogEntry(
-                                timestamp=parts[0],
-                                service=container.name,
-                                message=parts[1],
-                                stream='stdout'
-                            ))
-
-            return entries
+            return list(self.open_container_logs(container_id, tail=tail, stream=stream))
         except Exception as e:
             logger.error("get_container_logs_failed", container_id=container_id, error=str(e))
             return []
 
+    def open_container_logs(
+        self,
+        container_id: str,
+        tail: Any = 100,
+        follow: bool = False,
+        stream: Optional[str] = None,
+        since: Optional[int] = None,
+        api_client: Optional[docker.APIClient] = None
+    ) -> LogEntryStream:
+        """
+        Open a container's raw log stream and return a lazy LogEntry iterator
+        over it that keeps stdout and stderr apart. Close it to stop following.
+        """
+        api = api_client or self.client.api
+        info = api.inspect_container(container_id)
+        params = {
+            'stdout': 1 if stream in (None, 'stdout') else 0,
+            'stderr': 1 if stream in (None, 'stderr') else 0,
+            'timestamps': 1,
+            'follow': 1 if follow else 0,
+            'tail': tail,
+        }
+        if since is not None:
+            params['since'] = since
+
+        # docker-py's logs() merges stdout and stderr, so read the raw
+        # response and demultiplex the frames ourselves
+        response = api._get(api._url("/containers/{0}/logs", container_id), params=params, stream=True)
+        api._raise_for_status(response)
+        return LogEntryStream(
+            response,
+            service=info.get('Name', container_id).lstrip('/'),
+            multiplexed=not info.get('Config', {}).get('Tty', False),
+            stream=stream
+        )
+
 
 docker_service = DockerService()
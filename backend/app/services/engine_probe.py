@@ -0,0 +1,180 @@
+"""
+Background Docker engine prober: cached reachability, latency, version and info
+"""
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+import structlog
+
+from app.core.config import settings
+from app.core.metrics import DOCKER_ENGINE_UP
+from app.services.async_docker import async_docker_service
+from app.services.concurrency import SingleFlight
+from app.services.docker_events import docker_event_subscriber
+
+logger = structlog.get_logger()
+
+
+class EngineProbe:
+    """
+    Pings the Docker engine every ENGINE_PROBE_INTERVAL seconds and keeps
+    the outcome, so health and engine status requests are answered from
+    memory. Version and info are refetched at most every
+    ENGINE_PROBE_INFO_TTL seconds, and after the engine comes back.
+
+    A circuit breaker opens after ENGINE_PROBE_FAILURE_THRESHOLD failed
+    pings in a row: the engine is reported unavailable and probed with
+    exponential backoff, up to ENGINE_PROBE_MAX_BACKOFF, until a ping
+    succeeds. Until then a failed ping, a ping slower than
+    ENGINE_PROBE_SLOW_MS or a disconnected events stream reports the engine
+    as degraded. Results older than ENGINE_PROBE_TTL are refreshed when
+    asked for, unless the circuit is open.
+    """
+
+    def __init__(self, interval: Optional[float] = None):
+        self.interval = interval or settings.ENGINE_PROBE_INTERVAL
+        self.latency_ms: Optional[float] = None
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.checked_at: Optional[float] = None
+        self.last_success_at: Optional[float] = None
+        self._version: Optional[Dict[str, Any]] = None
+        self._info: Optional[Dict[str, Any]] = None
+        self._info_fetched: Optional[float] = None
+        self._flights = SingleFlight()
+        self._task: Optional[asyncio.Task] = None
+        # Bumped on every probe, so callers can tell when the figures changed
+        self.generation = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def circuit_open(self) -> bool:
+        return self.failures >= settings.ENGINE_PROBE_FAILURE_THRESHOLD
+
+    @property
+    def available(self) -> bool:
+        return self.last_success_at is not None and not self.circuit_open
+
+    async def start(self) -> None:
+        """Start probing in the background"""
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._probe_loop())
+        logger.info("engine_probe_started", interval=self.interval)
+
+    async def stop(self) -> None:
+        """Stop probing"""
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("engine_probe_stopped")
+
+    async def refresh(self) -> None:
+        """Probe now; concurrent calls share one probe"""
+        await self._flights.do("probe", self._probe)
+
+    async def status(self) -> Dict[str, Any]:
+        """The cached engine status, probing first if it is missing or stale"""
+        stale = self.checked_at is None or time.time() - self.checked_at > settings.ENGINE_PROBE_TTL
+        if stale and not self.circuit_open:
+            await self.refresh()
+        return self.latest()
+
+    def latest(self) -> Dict[str, Any]:
+        """The cached engine status, without probing"""
+        return {
+            "available": self.available,
+            "status": self._status(),
+            "circuit": "open" if self.circuit_open else "closed",
+            "latency_ms": self.latency_ms,
+            "consecutive_failures": self.failures,
+            "last_error": self.last_error,
+            "checked_at": self.checked_at,
+            "last_success_at": self.last_success_at,
+            "events_connected": docker_event_subscriber.connected,
+            "version": self._version,
+            "info": self._info,
+        }
+
+    def _status(self) -> str:
+        if self.checked_at is None:
+            return "unknown"
+        if not self.available:
+            return "unavailable"
+        events_down = docker_event_subscriber.running and not docker_event_subscriber.connected
+        if self.failures or events_down or (self.latency_ms or 0) >= settings.ENGINE_PROBE_SLOW_MS:
+            return "degraded"
+        return "healthy"
+
+    async def _probe_loop(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error("engine_probe_loop_failed", error=str(e))
+            await asyncio.sleep(self._next_delay())
+
+    def _next_delay(self) -> float:
+        if not self.circuit_open:
+            return self.interval
+        # Back off while the engine stays down
+        doublings = self.failures - settings.ENGINE_PROBE_FAILURE_THRESHOLD
+        return min(self.interval * 2 ** min(doublings, 16), settings.ENGINE_PROBE_MAX_BACKOFF)
+
+    async def _probe(self) -> None:
+        was_available = self.available
+        started = time.perf_counter()
+        try:
+            await async_docker_service.ping(timeout=settings.ENGINE_PROBE_TIMEOUT)
+        except Exception as e:
+            self._record_failure(str(e) or type(e).__name__)
+            return
+        self.latency_ms = round((time.perf_counter() - started) * 1000, 2)
+
+        if self.failures >= settings.ENGINE_PROBE_FAILURE_THRESHOLD:
+            logger.info("docker_engine_recovered", failures=self.failures, latency_ms=self.latency_ms)
+        self.failures = 0
+        self.last_error = None
+        self.checked_at = self.last_success_at = time.time()
+
+        # The daemon may have been upgraded while it was away
+        expired = self._info_fetched is None or time.monotonic() - self._info_fetched >= settings.ENGINE_PROBE_INFO_TTL
+        if expired or not was_available:
+            try:
+                details = await async_docker_service.get_docker_info(timeout=settings.ENGINE_PROBE_TIMEOUT)
+                self._version, self._info = details["version"], details["info"]
+                self._info_fetched = time.monotonic()
+            except Exception as e:
+                # Keep the last known details; reachability is what the ping decides
+                logger.warning("engine_probe_info_failed", error=str(e))
+
+        if self.latency_ms >= settings.ENGINE_PROBE_SLOW_MS:
+            logger.warning("docker_engine_slow", latency_ms=self.latency_ms)
+        self._updated()
+
+    def _record_failure(self, error: str) -> None:
+        self.failures += 1
+        self.last_error = error
+        self.latency_ms = None
+        self.checked_at = time.time()
+        if self.failures == settings.ENGINE_PROBE_FAILURE_THRESHOLD:
+            logger.error("docker_engine_unavailable", failures=self.failures, error=error)
+        elif self.failures < settings.ENGINE_PROBE_FAILURE_THRESHOLD:
+            logger.warning("engine_probe_failed", failures=self.failures, error=error)
+        self._updated()
+
+    def _updated(self) -> None:
+        DOCKER_ENGINE_UP.set(1 if self.available else 0)
+        self.generation += 1
+
+
+engine_probe = EngineProbe()
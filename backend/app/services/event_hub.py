@@ -0,0 +1,198 @@
+"""
+Push channel for dashboard updates: one producer, fanned out to every connected client
+"""
+import asyncio
+import json
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import structlog
+
+from app.core.config import settings
+from app.models.compose import APP_SUMMARY_EXCLUDE, ComposeApp
+from app.services.app_registry import app_registry
+from app.services.engine_probe import engine_probe
+from app.services.log_streamer import LogSubscriber
+from app.services.stats_sampler import resource_sampler
+from app.services.system_metrics import system_metrics
+
+logger = structlog.get_logger()
+
+# App deltas carry the summary view; CPU/memory travel separately as `usage`
+APP_DELTA_EXCLUDE = {
+    **APP_SUMMARY_EXCLUDE,
+    "cpu_percent": True,
+    "memory_mb": True,
+    "services": {"__all__": {"environment", "volumes", "cpu_percent", "memory_mb", "memory_limit_mb"}},
+}
+
+
+class EventHub:
+    """
+    Publishes dashboard updates to every subscriber from the server's caches.
+
+    One loop checks the registry and sampler generations every
+    EVENT_HUB_INTERVAL and turns what changed into delta messages:
+
+    - `apps`: changed apps (summary view) and the ids of removed ones
+    - `usage`: CPU/memory per app and service, for apps whose figures moved
+    - `system`: host metrics, whenever the collector takes a sample
+    - `engine`: Docker availability, status and info, when the engine probe's
+      view changes
+
+    Each message is serialised once and queued for every subscriber, so the
+    work done does not grow with the number of open dashboards, and nothing
+    is done while nobody is subscribed. New subscribers start from a
+    `snapshot` of the hub's current view; deltas replace whole entries, so
+    they apply cleanly on top of it.
+    """
+
+    def __init__(self, interval: Optional[float] = None, queue_size: Optional[int] = None):
+        self.interval = interval or settings.EVENT_HUB_INTERVAL
+        self.queue_size = queue_size or settings.EVENT_HUB_QUEUE_SIZE
+        self._subscribers: Set[LogSubscriber] = set()
+        self._tasks: List[asyncio.Task] = []
+
+        # The view last published, which snapshots are built from
+        self._generations: Tuple[int, int] = (-1, -1)
+        self._apps: Dict[str, str] = {}
+        self._usage: Dict[str, Dict[str, Any]] = {}
+        self._system: Optional[Dict[str, Any]] = None
+        self._system_generation = -1
+        self._engine: Optional[Dict[str, Any]] = None
+        self._snapshot: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    async def start(self) -> None:
+        """Start publishing in the background"""
+        if self.running:
+            return
+        self._tasks = [asyncio.create_task(self._change_loop())]
+        logger.info("event_hub_started", interval=self.interval)
+
+    async def stop(self) -> None:
+        """Stop publishing; connected clients see their streams end"""
+        if not self.running:
+            return
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for subscriber in self._subscribers:
+            subscriber.offer(None)
+        self._subscribers.clear()
+        logger.info("event_hub_stopped")
+
+    def subscribe(self) -> Tuple[LogSubscriber, str]:
+        """Register a subscriber; returns it with the snapshot to send first"""
+        if not self._subscribers:
+            # The view went stale while nobody was listening
+            self._check_changes()
+        subscriber = LogSubscriber(self.queue_size)
+        self._subscribers.add(subscriber)
+        return subscriber, self.snapshot()
+
+    def unsubscribe(self, subscriber: LogSubscriber) -> None:
+        self._subscribers.discard(subscriber)
+
+    def snapshot(self) -> str:
+        """The current view as a single `snapshot` message"""
+        if self._snapshot is None:
+            self._snapshot = (
+                '{"type":"snapshot","apps":[' + ",".join(self._apps.values()) + "],"
+                + '"usage":' + json.dumps(self._usage) + ","
+                + '"system":' + json.dumps(self._system) + ","
+                + '"engine":' + json.dumps(self._engine) + "}"
+            )
+        return self._snapshot
+
+    def _publish(self, message: Dict[str, Any]) -> None:
+        self._broadcast(json.dumps(message))
+
+    def _broadcast(self, text: str) -> None:
+        self._snapshot = None
+        for subscriber in self._subscribers:
+            subscriber.offer(text)
+
+    async def _change_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            if not self._subscribers:
+                continue
+            try:
+                self._check_changes()
+            except Exception as e:
+                logger.error("event_hub_check_failed", error=str(e))
+
+    def _check_changes(self) -> None:
+        generations = (app_registry.generation, resource_sampler.usage_generation)
+        if generations != self._generations:
+            registry_changed = generations[0] != self._generations[0]
+            self._generations = generations
+            apps = app_registry.list()
+            if registry_changed:
+                self._diff_apps(apps)
+            # A stopped container leaves usage stale without a new sample, so
+            # registry changes are rechecked too
+            self._diff_usage(apps)
+
+        if system_metrics.generation != self._system_generation:
+            self._system_generation = system_metrics.generation
+            self._system = system_metrics.latest()
+            if self._system is not None:
+                self._publish({"type": "system", **self._system})
+
+        # Only changes of state are pushed, not every probe's latency
+        probe = engine_probe.latest()
+        engine = {
+            "available": probe["available"],
+            "status": probe["status"],
+            "events_connected": probe["events_connected"],
+            "docker": {"version": probe["version"], "info": probe["info"]} if probe["info"] else None,
+        }
+        if engine != self._engine:
+            self._engine = engine
+            self._publish({"type": "engine", **engine})
+
+    def _diff_apps(self, apps: List[ComposeApp]) -> None:
+        current = {app.id: app.model_dump_json(exclude=APP_DELTA_EXCLUDE) for app in apps}
+        changed = [data for app_id, data in current.items() if self._apps.get(app_id) != data]
+        removed = [app_id for app_id in self._apps if app_id not in current]
+        self._apps = current
+        if changed or removed:
+            # The apps are already serialised; splice them in rather than re-encode
+            self._broadcast(
+                '{"type":"apps","changed":[' + ",".join(changed) + "],"
+                + '"removed":' + json.dumps(removed) + "}"
+            )
+
+    def _diff_usage(self, apps: List[ComposeApp]) -> None:
+        resource_sampler.apply_usage(apps)
+        current = {
+            app.id: {
+                "cpu_percent": app.cpu_percent,
+                "memory_mb": app.memory_mb,
+                "services": {
+                    service.name: {
+                        "cpu_percent": service.cpu_percent,
+                        "memory_mb": service.memory_mb,
+                        "memory_limit_mb": service.memory_limit_mb,
+                    }
+                    for service in app.services
+                },
+            }
+            for app in apps
+        }
+        changed = {app_id: usage for app_id, usage in current.items() if self._usage.get(app_id) != usage}
+        self._usage = current
+        if changed:
+            self._publish({"type": "usage", "apps": changed})
+
+
+event_hub = EventHub()
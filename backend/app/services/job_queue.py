@@ -0,0 +1,239 @@
+"""
+Background job queue for long-running compose operations
+"""
+import asyncio
+import re
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+import structlog
+
+from app.core.config import settings
+from app.models.compose import ComposeApp, Job, JobStatus
+from app.services.compose_service import compose_service
+from app.services.log_streamer import LogSubscriber
+
+logger = structlog.get_logger()
+
+FINISHED_STATES = {JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED}
+
+# "#7 [web 2/5] RUN ..." (BuildKit) and "Step 2/5 : RUN ..." (classic builder)
+BUILD_STEP_PATTERN = re.compile(r"\[(?:[\w.-]+ )?(\d+)/(\d+)\]|^Step (\d+)/(\d+)")
+# " ✔ web Pulled" / "web Pulled"
+PULLED_PATTERN = re.compile(r"^\W*(\S+) Pulled\s*$")
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class _ProgressTracker:
+    """Derives a completion percentage from compose output lines"""
+
+    def __init__(self, services: int):
+        self.services = max(services, 1)
+        self.pulled: Set[str] = set()
+
+    def update(self, line: str) -> Optional[float]:
+        match = BUILD_STEP_PATTERN.search(line)
+        if match:
+            step, total = (int(g) for g in (match.group(1, 2) if match.group(1) else match.group(3, 4)))
+            return round(100.0 * step / total, 1) if total else None
+        match = PULLED_PATTERN.match(line)
+        if match:
+            self.pulled.add(match.group(1))
+            return round(100.0 * min(len(self.pulled), self.services) / self.services, 1)
+        return None
+
+
+@dataclass
+class _JobRecord:
+    job: Job
+    app: ComposeApp
+    after: Optional[Callable[[ComposeApp], Awaitable[None]]] = None
+    output: Deque[Dict[str, Any]] = field(default_factory=lambda: deque(maxlen=settings.JOB_OUTPUT_LINES))
+    subscribers: Set[LogSubscriber] = field(default_factory=set)
+    task: Optional[asyncio.Task] = None
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+class JobQueue:
+    """
+    Runs submitted compose operations on a fixed pool of workers.
+
+    Jobs can be polled, subscribed to (output, progress and status updates
+    are pushed to bounded subscriber queues) and cancelled. Output is kept
+    per job up to JOB_OUTPUT_LINES lines; the most recent JOB_HISTORY_SIZE
+    finished jobs remain available.
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers or settings.JOB_WORKERS
+        self._jobs: "OrderedDict[str, _JobRecord]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self) -> None:
+        """Start the worker pool"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info("job_queue_started", workers=self.workers)
+
+    async def stop(self) -> None:
+        """Cancel running jobs and stop the workers"""
+        if not self.running:
+            return
+        tasks = [r.task for r in self._jobs.values() if r.task is not None and not r.task.done()]
+        for task in tasks + self._workers:
+            task.cancel()
+        # Cancelled jobs stop their compose commands before finishing
+        await asyncio.gather(*tasks, *self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info("job_queue_stopped")
+
+    def submit(
+        self,
+        app: ComposeApp,
+        action: str,
+        after: Optional[Callable[[ComposeApp], Awaitable[None]]] = None
+    ) -> Job:
+        """Queue an action on an app; `after` is awaited once it finishes"""
+        if not self.running:
+            raise RuntimeError("Job queue is not running")
+        job = Job(id=uuid.uuid4().hex, app_id=app.id, app_name=app.name, action=action, created_at=_now())
+        self._jobs[job.id] = _JobRecord(job=job, app=app, after=after)
+        self._queue.put_nowait(job.id)
+        logger.info("job_submitted", job_id=job.id, app_id=app.id, action=action)
+        return job
+
+    async def run(
+        self,
+        app: ComposeApp,
+        action: str,
+        after: Optional[Callable[[ComposeApp], Awaitable[None]]] = None
+    ) -> Job:
+        """Submit a job and wait for it to finish"""
+        job = self.submit(app, action, after)
+        await self._jobs[job.id].done.wait()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        record = self._jobs.get(job_id)
+        return record.job if record else None
+
+    def list(self, app_id: Optional[str] = None) -> List[Job]:
+        """Jobs, newest first"""
+        return [r.job for r in reversed(self._jobs.values()) if app_id is None or r.job.app_id == app_id]
+
+    def output(self, job_id: str, since: int = 0) -> List[Dict[str, Any]]:
+        """Kept output lines numbered `since` and later"""
+        record = self._jobs.get(job_id)
+        if record is None:
+            return []
+        return [line for line in record.output if line["line"] >= since]
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a queued or running job; returns None if it already finished"""
+        record = self._jobs.get(job_id)
+        if record is None or record.job.status in FINISHED_STATES:
+            return None
+        if record.job.status == JobStatus.QUEUED:
+            self._finish(record, JobStatus.CANCELLED, "Cancelled before it started")
+        elif record.task is not None:
+            record.task.cancel()
+        logger.info("job_cancel_requested", job_id=job_id)
+        return record.job
+
+    def subscribe(self, job_id: str) -> Optional[LogSubscriber]:
+        """Subscribe to a job's `output`, `progress` and `status` updates"""
+        record = self._jobs.get(job_id)
+        if record is None:
+            return None
+        subscriber = LogSubscriber(settings.LOG_STREAM_QUEUE_SIZE)
+        record.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, job_id: str, subscriber: LogSubscriber) -> None:
+        record = self._jobs.get(job_id)
+        if record is not None:
+            record.subscribers.discard(subscriber)
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            record = self._jobs.get(job_id)
+            if record is None or record.job.status != JobStatus.QUEUED:
+                continue
+            record.task = asyncio.create_task(self._execute(record))
+            # wait() rather than awaiting the task: cancelling a job must not stop the worker
+            await asyncio.wait({record.task})
+
+    async def _execute(self, record: _JobRecord) -> None:
+        job = record.job
+        if job.status != JobStatus.QUEUED:
+            # Cancelled between being picked up and starting
+            return
+        job.status = JobStatus.RUNNING
+        job.started_at = _now()
+        self._publish(record, ("status", job.model_copy()))
+        tracker = _ProgressTracker(len(record.app.services))
+
+        def on_output(stream: str, text: str) -> None:
+            line = {"line": job.output_lines, "stream": stream, "text": text}
+            job.output_lines += 1
+            record.output.append(line)
+            self._publish(record, ("output", line))
+            percent = tracker.update(text)
+            if percent is not None and percent != job.progress:
+                job.progress = percent
+                self._publish(record, ("progress", {"percent": percent, "message": text.strip()}))
+
+        try:
+            result = await compose_service.run_action(record.app, job.action, on_output=on_output)
+            succeeded = result.get("status") == "success"
+            if succeeded:
+                job.progress = 100.0
+            self._finish(record, JobStatus.SUCCEEDED if succeeded else JobStatus.FAILED, result.get("message"))
+        except asyncio.CancelledError:
+            self._finish(record, JobStatus.CANCELLED, "Cancelled")
+        except Exception as e:
+            logger.error("job_failed", job_id=job.id, error=str(e))
+            self._finish(record, JobStatus.FAILED, str(e))
+
+        if record.after is not None:
+            try:
+                await record.after(record.app)
+            except Exception as e:
+                logger.warning("job_after_hook_failed", job_id=job.id, error=str(e))
+
+    def _finish(self, record: _JobRecord, status: JobStatus, message: Optional[str]) -> None:
+        job = record.job
+        job.status = status
+        job.message = message
+        job.finished_at = _now()
+        self._publish(record, ("status", job.model_copy()))
+        record.subscribers.clear()
+        record.done.set()
+        logger.info("job_finished", job_id=job.id, app_id=job.app_id, action=job.action, status=status.value)
+        self._prune()
+
+    def _publish(self, record: _JobRecord, item: Any) -> None:
+        for subscriber in record.subscribers:
+            subscriber.offer(item)
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, r in self._jobs.items() if r.job.status in FINISHED_STATES]
+        for job_id in finished[:max(len(finished) - settings.JOB_HISTORY_SIZE, 0)]:
+            del self._jobs[job_id]
+
+
+job_queue = JobQueue()
@@ -0,0 +1,135 @@
+"""
+Incremental parser for Docker's raw log stream format
+"""
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from app.models.compose import LogEntry
+
+# Stream type byte of each multiplexed frame header
+STREAM_TYPES = {0: "stdin", 1: "stdout", 2: "stderr"}
+HEADER_SIZE = 8
+
+
+class LogStreamParser:
+    """
+    Turns raw log bytes from the Engine API into (stream, line) pairs.
+
+    Non-TTY containers send multiplexed frames: an 8-byte header (stream
+    type, 3 padding bytes, big-endian payload length) followed by the
+    payload. Frames are sliced out of each received chunk with memoryview,
+    so complete frames are never copied; only an incomplete trailing frame
+    is kept until the next chunk. Lines are decoded individually with
+    invalid UTF-8 replaced, and a line split across frames is reassembled
+    per stream. TTY containers send plain bytes, all reported as stdout.
+    """
+
+    def __init__(self, multiplexed: bool = True):
+        self.multiplexed = multiplexed
+        self._pending = b""
+        self._partial: Dict[str, bytes] = {}
+
+    def feed(self, data: bytes) -> Iterator[Tuple[str, str]]:
+        """Consume a chunk and yield every line it completes"""
+        if self._pending:
+            data = self._pending + data
+            self._pending = b""
+        view = memoryview(data)
+        end = len(data)
+
+        if not self.multiplexed:
+            yield from self._lines("stdout", data, view, 0, end)
+            return
+
+        offset = 0
+        while end - offset >= HEADER_SIZE:
+            stream = STREAM_TYPES.get(view[offset], "stdout")
+            size = int.from_bytes(view[offset + 4:offset + HEADER_SIZE], "big")
+            start = offset + HEADER_SIZE
+            if end - start < size:
+                break
+            yield from self._lines(stream, data, view, start, start + size)
+            offset = start + size
+
+        if offset < end:
+            self._pending = bytes(view[offset:])
+
+    def flush(self) -> Iterator[Tuple[str, str]]:
+        """Yield lines left without a trailing newline at end of stream"""
+        for stream, partial in self._partial.items():
+            if partial:
+                yield stream, partial.decode("utf-8", errors="replace").rstrip("\r")
+        self._partial = {}
+        self._pending = b""
+
+    def _lines(self, stream: str, data: bytes, view: memoryview, start: int, stop: int) -> Iterator[Tuple[str, str]]:
+        while start < stop:
+            newline = data.find(b"\n", start, stop)
+            if newline < 0:
+                self._partial[stream] = self._partial.get(stream, b"") + view[start:stop]
+                return
+
+            partial = self._partial.pop(stream, None)
+            if partial:
+                text = (partial + view[start:newline]).decode("utf-8", errors="replace")
+            else:
+                text = str(view[start:newline], "utf-8", "replace")
+            yield stream, text.rstrip("\r")
+            start = newline + 1
+
+
+def parse_log_line(line: str, service: str, stream: str = "stdout") -> Optional[LogEntry]:
+    """Split a timestamped Docker log line into a LogEntry"""
+    if not line.strip():
+        return None
+    parts = line.split(' ', 1)
+    if len(parts) != 2:
+        return None
+    return LogEntry(timestamp=parts[0], service=service, message=parts[1], stream=stream)
+
+
+def iter_log_entries(
+    chunks: Iterable[bytes],
+    service: str,
+    multiplexed: bool = True,
+    stream: Optional[str] = None
+) -> Iterator[LogEntry]:
+    """Lazily parse raw log chunks into LogEntry objects, optionally for one stream only"""
+    parser = LogStreamParser(multiplexed)
+    for chunk in chunks:
+        for line_stream, line in parser.feed(chunk):
+            if stream is None or line_stream == stream:
+                entry = parse_log_line(line, service, line_stream)
+                if entry:
+                    yield entry
+    for line_stream, line in parser.flush():
+        if stream is None or line_stream == stream:
+            entry = parse_log_line(line, service, line_stream)
+            if entry:
+                yield entry
+
+
+class LogEntryStream:
+    """Lazy LogEntry iterator over an open Engine API log response"""
+
+    def __init__(self, response: Any, service: str, multiplexed: bool, stream: Optional[str] = None,
+                 chunk_size: int = 64 * 1024):
+        self.response = response
+        self.service = service
+        self.multiplexed = multiplexed
+        self.stream = stream
+        self.chunk_size = chunk_size
+
+    def __iter__(self) -> Iterator[LogEntry]:
+        try:
+            yield from iter_log_entries(
+                self.response.iter_content(chunk_size=self.chunk_size),
+                self.service,
+                self.multiplexed,
+                self.stream
+            )
+        finally:
+            self.response.close()
+
+    def close(self) -> None:
+        """Close the underlying response, unblocking any reader"""
+        self.response.close()
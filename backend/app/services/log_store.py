@@ -0,0 +1,529 @@
+"""
+Local log store: compressed, hourly segment files with a token/time index
+"""
+import asyncio
+import gzip
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Pattern, Set
+
+import structlog
+
+from app.core.config import settings
+from app.models.compose import ContainerState, LogEntry
+from app.services.app_registry import app_registry
+from app.services.docker_service import docker_service
+
+logger = structlog.get_logger()
+
+TOKEN_PATTERN = re.compile(r"[A-Za-z0-9_]{3,}")
+WORD_PATTERN = re.compile(r"[A-Za-z0-9_]+")
+SEGMENT_FORMAT = "%Y%m%d%H"
+
+
+def _parse_timestamp(timestamp: str) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(timestamp)
+    except ValueError:
+        return None
+
+
+def _tokens(text: str) -> Set[str]:
+    return {token.lower() for token in TOKEN_PATTERN.findall(text)}
+
+
+def _may_contain(term: str, tokens: Set[str]) -> bool:
+    """
+    Whether a (lowercase) term can occur as a substring of some line whose
+    tokens are all in `tokens`. A word inside the term must be a whole
+    token, but one at either end may be part of a longer token.
+    """
+    for match in WORD_PATTERN.finditer(term):
+        word = match.group()
+        if len(word) < 3:
+            continue
+        open_start, open_end = match.start() == 0, match.end() == len(term)
+        if open_start and open_end:
+            found = any(word in token for token in tokens)
+        elif open_start:
+            found = any(token.endswith(word) for token in tokens)
+        elif open_end:
+            found = any(token.startswith(word) for token in tokens)
+        else:
+            found = word in tokens
+        if not found:
+            return False
+    return True
+
+
+class _Segment:
+    """In-memory index of one hourly segment file"""
+
+    def __init__(self, start: float = 0.0, end: float = 0.0, lines: int = 0, stderr_lines: int = 0,
+                 tokens: Optional[List[str]] = None, tokens_complete: bool = True, size: int = 0):
+        self.start = start
+        self.end = end
+        self.lines = lines
+        self.stderr_lines = stderr_lines
+        self.tokens: Set[str] = set(tokens or [])
+        self.tokens_complete = tokens_complete
+        # Bytes of the segment file this index covers
+        self.size = size
+        self.dirty = False
+
+    def add(self, entry: LogEntry) -> None:
+        moment = _parse_timestamp(entry.timestamp)
+        epoch = moment.timestamp() if moment else time.time()
+        self.start = min(self.start, epoch) if self.lines else epoch
+        self.end = max(self.end, epoch)
+        self.lines += 1
+        if entry.stream == "stderr":
+            self.stderr_lines += 1
+        if self.tokens_complete:
+            self.tokens |= _tokens(entry.message)
+            if len(self.tokens) > settings.LOG_STORE_MAX_TOKENS:
+                # Too diverse to index usefully; queries must scan this segment
+                self.tokens = set()
+                self.tokens_complete = False
+        self.dirty = True
+
+    def to_dict(self) -> Dict:
+        return {
+            "start": self.start,
+            "end": self.end,
+            "lines": self.lines,
+            "stderr_lines": self.stderr_lines,
+            "tokens": sorted(self.tokens),
+            "tokens_complete": self.tokens_complete,
+            "size": self.size,
+        }
+
+
+class LogStore:
+    """
+    Stores container log lines under `<root>/<container_id>/<YYYYMMDDHH>.log.gz`.
+
+    Each flush appends a gzip member of JSON lines to the segment for the
+    hour the lines belong to and updates the segment's in-memory index (time
+    range, line counts and the set of tokens seen). The index is written to
+    the `.idx.json` sidecar once the hour is over, or on shutdown; a sidecar
+    that does not cover the whole segment file, e.g. after a crash, is
+    rebuilt from the segment. Queries skip whole segments by time range and
+    terms before decompressing anything.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or settings.LOG_STORE_PATH
+        self._lock = threading.Lock()
+        self._buffers: Dict[str, List[LogEntry]] = {}
+        self._meta: Dict[str, Dict] = {}
+        # Guards segment files and their indexes, which flushes and searches share
+        self._index_lock = threading.Lock()
+        self._segments: Dict[str, _Segment] = {}
+
+    def load(self) -> None:
+        """Load container metadata from disk"""
+        os.makedirs(self.root, exist_ok=True)
+        with self._lock:
+            for container_id in os.listdir(self.root):
+                meta_path = os.path.join(self.root, container_id, "meta.json")
+                try:
+                    with open(meta_path) as f:
+                        self._meta[container_id] = json.load(f)
+                except (OSError, ValueError):
+                    continue
+        logger.info("log_store_loaded", root=self.root, containers=len(self._meta))
+
+    def last_timestamp(self, container_id: str) -> Optional[str]:
+        """Timestamp of the newest stored line for a container"""
+        with self._lock:
+            return self._meta.get(container_id, {}).get("last_timestamp")
+
+    def append(self, container_id: str, service: str, app_id: str, entry: LogEntry) -> None:
+        """Buffer a line; it is written on the next flush"""
+        with self._lock:
+            meta = self._meta.setdefault(container_id, {"container_id": container_id})
+            meta.update(service=service, app_id=app_id)
+            last = meta.get("last_timestamp")
+            # Timestamps use a fixed-width format, so they compare as strings
+            if last and entry.timestamp <= last:
+                return
+            meta["last_timestamp"] = entry.timestamp
+            self._buffers.setdefault(container_id, []).append(entry)
+
+    def flush(self, final: bool = False) -> int:
+        """
+        Write buffered lines to their segments; returns lines written.
+        `final` also writes the index of the current hour, e.g. on shutdown.
+        """
+        with self._lock:
+            buffers, self._buffers = self._buffers, {}
+            meta = {cid: dict(self._meta[cid]) for cid in buffers}
+
+        written = 0
+        for container_id, entries in buffers.items():
+            directory = os.path.join(self.root, container_id)
+            os.makedirs(directory, exist_ok=True)
+
+            by_hour: Dict[str, List[LogEntry]] = {}
+            for entry in entries:
+                moment = _parse_timestamp(entry.timestamp) or datetime.now(timezone.utc)
+                by_hour.setdefault(moment.astimezone(timezone.utc).strftime(SEGMENT_FORMAT), []).append(entry)
+
+            for hour, hour_entries in by_hour.items():
+                self._write_segment(directory, hour, hour_entries)
+                written += len(hour_entries)
+
+            self._write_json(os.path.join(directory, "meta.json"), meta[container_id])
+
+        self._write_indexes(final)
+        return written
+
+    def _write_segment(self, directory: str, hour: str, entries: List[LogEntry]) -> None:
+        payload = "".join(
+            json.dumps({"t": e.timestamp, "s": e.stream, "svc": e.service, "m": e.message}) + "\n"
+            for e in entries
+        ).encode("utf-8")
+        compressed = gzip.compress(payload, compresslevel=6)
+        with self._index_lock:
+            segment = self._segment(directory, hour)
+            # Concatenated gzip members form a valid gzip file
+            with open(os.path.join(directory, f"{hour}.log.gz"), "ab") as f:
+                f.write(compressed)
+                segment.size = f.tell()
+            for entry in entries:
+                segment.add(entry)
+
+    def _write_indexes(self, final: bool) -> None:
+        """Write the sidecars of changed segments whose hour is over (or all of them if final)"""
+        current = datetime.now(timezone.utc).strftime(SEGMENT_FORMAT)
+        with self._index_lock:
+            pending = [
+                (key, segment.to_dict()) for key, segment in self._segments.items()
+                if segment.dirty and (final or os.path.basename(key) < current)
+            ]
+            for key, _ in pending:
+                self._segments[key].dirty = False
+        for key, data in pending:
+            try:
+                self._write_json(f"{key}.idx.json", data)
+            except OSError as e:
+                # The segment is re-indexed from its file on the next load
+                logger.warning("log_index_write_failed", path=key, error=str(e))
+
+    def _segment(self, directory: str, hour: str) -> _Segment:
+        """The index of a segment; callers hold the index lock"""
+        key = os.path.join(directory, hour)
+        segment = self._segments.get(key)
+        if segment is None:
+            try:
+                with open(f"{key}.idx.json") as f:
+                    segment = _Segment(**json.load(f))
+            except (OSError, ValueError, TypeError):
+                segment = None
+            try:
+                size = os.path.getsize(f"{key}.log.gz")
+            except OSError:
+                size = 0
+            if segment is None or segment.size != size:
+                segment = self._rebuild_segment(key, size)
+            self._segments[key] = segment
+        return segment
+
+    def _rebuild_segment(self, key: str, size: int) -> _Segment:
+        """Index a segment from its file, for one without an up-to-date sidecar"""
+        segment = _Segment(size=size)
+        if size:
+            for entry in self._read_segment(f"{key}.log.gz"):
+                segment.add(entry)
+            logger.info("log_segment_reindexed", path=key, lines=segment.lines)
+        return segment
+
+    @staticmethod
+    def _write_json(path: str, data: Dict) -> None:
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    def search(
+        self,
+        app_id: Optional[str] = None,
+        container_id: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        terms: Optional[List[str]] = None,
+        pattern: Optional[Pattern] = None,
+        stream: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> Dict:
+        """
+        Find stored lines, oldest first. All `terms` must appear in a line
+        (case-insensitive, anywhere in it) and `pattern`, if given, must
+        match it.
+        """
+        limit = min(limit or settings.MAX_LOG_LINES, settings.MAX_LOG_LINES)
+        start_epoch = start.timestamp() if start else None
+        end_epoch = end.timestamp() if end else None
+        terms = [t.lower() for t in terms or []]
+
+        with self._lock:
+            containers = [
+                cid for cid, meta in self._meta.items()
+                if (container_id is None or cid == container_id)
+                and (app_id is None or meta.get("app_id") == app_id)
+            ]
+
+        entries: List[LogEntry] = []
+        scanned = skipped = 0
+        truncated = False
+        for cid in containers:
+            directory = os.path.join(self.root, cid)
+            try:
+                hours = sorted(name[:-len(".log.gz")] for name in os.listdir(directory) if name.endswith(".log.gz"))
+            except OSError:
+                continue
+
+            for hour in hours:
+                hour_start = datetime.strptime(hour, SEGMENT_FORMAT).replace(tzinfo=timezone.utc).timestamp()
+                if (end_epoch is not None and hour_start > end_epoch) or \
+                        (start_epoch is not None and hour_start + 3600 <= start_epoch):
+                    skipped += 1
+                    continue
+
+                with self._index_lock:
+                    segment = self._segment(directory, hour)
+                    prune = (stream == "stderr" and segment.lines and not segment.stderr_lines) or (
+                        segment.tokens_complete and segment.lines
+                        and not all(_may_contain(term, segment.tokens) for term in terms)
+                    )
+                if prune:
+                    skipped += 1
+                    continue
+
+                scanned += 1
+                for entry in self._read_segment(os.path.join(directory, f"{hour}.log.gz")):
+                    if stream and entry.stream != stream:
+                        continue
+                    if start_epoch is not None or end_epoch is not None:
+                        moment = _parse_timestamp(entry.timestamp)
+                        epoch = moment.timestamp() if moment else None
+                        if epoch is None or (start_epoch is not None and epoch < start_epoch) or \
+                                (end_epoch is not None and epoch > end_epoch):
+                            continue
+                    if terms:
+                        message = entry.message.lower()
+                        if not all(term in message for term in terms):
+                            continue
+                    if pattern and not pattern.search(entry.message):
+                        continue
+                    entries.append(entry)
+
+        entries.sort(key=lambda e: e.timestamp)
+        if len(entries) > limit:
+            entries = entries[:limit]
+            truncated = True
+
+        return {
+            "entries": entries,
+            "count": len(entries),
+            "truncated": truncated,
+            "segments_scanned": scanned,
+            "segments_skipped": skipped,
+        }
+
+    @staticmethod
+    def _read_segment(path: str):
+        try:
+            with gzip.open(path, "rt", encoding="utf-8", errors="replace") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    yield LogEntry(timestamp=record["t"], service=record["svc"], message=record["m"], stream=record["s"])
+        except (OSError, EOFError) as e:
+            # A partially written trailing member is expected after a crash
+            logger.warning("log_segment_read_failed", path=path, error=str(e))
+
+    def enforce_retention(self) -> int:
+        """Delete segments older than LOG_RETENTION_DAYS; returns segments removed"""
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=settings.LOG_RETENTION_DAYS)).strftime(SEGMENT_FORMAT)
+        removed = 0
+        with self._lock:
+            live = set(self._buffers)
+        for container_id in os.listdir(self.root):
+            directory = os.path.join(self.root, container_id)
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                hour = name.split(".", 1)[0]
+                if name.endswith(".log.gz") and hour < cutoff:
+                    with self._index_lock:
+                        for suffix in (".log.gz", ".idx.json"):
+                            try:
+                                os.remove(os.path.join(directory, hour + suffix))
+                            except OSError:
+                                pass
+                        self._segments.pop(os.path.join(directory, hour), None)
+                    removed += 1
+            if container_id not in live and not any(n.endswith(".log.gz") for n in os.listdir(directory)):
+                shutil.rmtree(directory, ignore_errors=True)
+                with self._lock:
+                    self._meta.pop(container_id, None)
+        if removed:
+            logger.info("log_retention_enforced", removed=removed, cutoff=cutoff)
+        return removed
+
+
+class _IngestFollower:
+    """A followed log stream of one container, read on its own thread"""
+
+    def __init__(self, container_id: str, service: str, app_id: str):
+        self.container_id = container_id
+        self.service = service
+        self.app_id = app_id
+        self.stream = None
+        self.thread: Optional[threading.Thread] = None
+        self.closed = threading.Event()
+
+    @property
+    def alive(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def close(self) -> None:
+        self.closed.set()
+        if self.stream is not None:
+            # Closing the response unblocks the reading thread
+            self.stream.close()
+
+
+class LogIngester:
+    """Follows every running compose container and feeds its output into a LogStore"""
+
+    def __init__(self, store: LogStore):
+        self.store = store
+        self._followers: Dict[str, _IngestFollower] = {}
+        self._api = None
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        """Load the store and start following containers in the background"""
+        if self.running:
+            return
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.store.load)
+        if self._api is None:
+            self._api = docker_service.create_api_client(max_pool_size=settings.LOG_STREAM_MAX_FOLLOWERS)
+        self._tasks = [
+            asyncio.create_task(self._reconcile_loop()),
+            asyncio.create_task(self._flush_loop()),
+            asyncio.create_task(self._retention_loop()),
+        ]
+        logger.info("log_ingester_started", root=self.store.root)
+
+    async def stop(self) -> None:
+        """Stop every follow and flush what is buffered"""
+        if not self.running:
+            return
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for follower in self._followers.values():
+            follower.close()
+        self._followers.clear()
+        await asyncio.get_running_loop().run_in_executor(None, lambda: self.store.flush(final=True))
+        logger.info("log_ingester_stopped")
+
+    async def _reconcile_loop(self) -> None:
+        while True:
+            try:
+                self._reconcile()
+            except Exception as e:
+                logger.error("log_ingester_reconcile_failed", error=str(e))
+            await asyncio.sleep(settings.LOG_STORE_FLUSH_INTERVAL)
+
+    async def _flush_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(settings.LOG_STORE_FLUSH_INTERVAL)
+            try:
+                await loop.run_in_executor(None, self.store.flush)
+            except Exception as e:
+                logger.error("log_store_flush_failed", error=str(e))
+
+    async def _retention_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, self.store.enforce_retention)
+            except Exception as e:
+                logger.error("log_retention_failed", error=str(e))
+            await asyncio.sleep(3600)
+
+    def _reconcile(self) -> None:
+        """Follow running containers, drop the rest"""
+        wanted = {}
+        for app in app_registry.list():
+            for service in app.services:
+                if service.container_id and service.state == ContainerState.RUNNING:
+                    wanted[service.container_id] = (service.name, app.id)
+
+        for container_id, follower in list(self._followers.items()):
+            if container_id not in wanted or not follower.alive:
+                follower.close()
+                del self._followers[container_id]
+
+        for container_id, (service, app_id) in wanted.items():
+            if container_id in self._followers:
+                continue
+            if len(self._followers) >= settings.LOG_STREAM_MAX_FOLLOWERS:
+                logger.warning("log_ingester_follower_limit_reached", limit=settings.LOG_STREAM_MAX_FOLLOWERS)
+                break
+            follower = _IngestFollower(container_id, service, app_id)
+            follower.thread = threading.Thread(
+                target=self._follow,
+                args=(follower,),
+                name=f"ingest-{container_id[:12]}",
+                daemon=True
+            )
+            self._followers[container_id] = follower
+            follower.thread.start()
+
+    def _follow(self, follower: _IngestFollower) -> None:
+        # Resume where the store left off, backfilling at most the retention window
+        last = self.store.last_timestamp(follower.container_id)
+        moment = _parse_timestamp(last) if last else None
+        since = int(moment.timestamp()) if moment else int(time.time() - settings.LOG_RETENTION_DAYS * 86400)
+        try:
+            follower.stream = docker_service.open_container_logs(
+                follower.container_id,
+                tail="all",
+                follow=True,
+                since=since,
+                api_client=self._api
+            )
+            if follower.closed.is_set():
+                follower.stream.close()
+                return
+
+            for entry in follower.stream:
+                entry.service = follower.service
+                self.store.append(follower.container_id, follower.service, follower.app_id, entry)
+        except Exception as e:
+            if not follower.closed.is_set():
+                logger.warning("log_ingest_failed", container_id=follower.container_id, error=str(e))
+
+
+log_store = LogStore()
+log_ingester = LogIngester(log_store)
@@ -0,0 +1,143 @@
+"""
+Live log streaming: one upstream follow per container, fanned out to every viewer
+"""
+import asyncio
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import structlog
+
+from app.core.config import settings
+from app.services.docker_service import docker_service
+
+logger = structlog.get_logger()
+
+
+class LogSubscriber:
+    """
+    A connected viewer. Each has its own bounded queue: when a viewer falls
+    behind, its oldest entries are dropped and counted, so a slow client
+    never blocks the upstream follow or other viewers.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.container_ids: List[str] = []
+        self.dropped = 0
+
+    def offer(self, item: Tuple[str, Any]) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(item)
+
+    def take_dropped(self) -> int:
+        dropped, self.dropped = self.dropped, 0
+        return dropped
+
+
+class _ContainerFollower:
+    """Reads a container's followed log stream on a dedicated thread"""
+
+    def __init__(self, container_id: str, service: str):
+        self.container_id = container_id
+        self.service = service
+        self.subscribers: Set[LogSubscriber] = set()
+        self.stream = None
+        self.thread: Optional[threading.Thread] = None
+        self.closed = threading.Event()
+
+    def close(self) -> None:
+        self.closed.set()
+        if self.stream is not None:
+            # Closing the response unblocks the reading thread
+            self.stream.close()
+
+
+class LogBroadcaster:
+    """Shares one Docker log follow per container between all subscribers"""
+
+    def __init__(self, queue_size: Optional[int] = None):
+        self.queue_size = queue_size or settings.LOG_STREAM_QUEUE_SIZE
+        self._followers: Dict[str, _ContainerFollower] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._api = None
+
+    def subscribe(self, containers: List[Tuple[str, str]]) -> LogSubscriber:
+        """Subscribe to new log output of (container_id, service) pairs"""
+        self._loop = asyncio.get_running_loop()
+        if self._api is None:
+            self._api = docker_service.create_api_client(max_pool_size=settings.LOG_STREAM_MAX_FOLLOWERS)
+
+        subscriber = LogSubscriber(self.queue_size)
+        for container_id, service in containers:
+            follower = self._followers.get(container_id)
+            if follower is None:
+                if len(self._followers) >= settings.LOG_STREAM_MAX_FOLLOWERS:
+                    logger.warning("log_stream_follower_limit_reached", limit=settings.LOG_STREAM_MAX_FOLLOWERS)
+                    continue
+                follower = self._start_follower(container_id, service)
+            follower.subscribers.add(subscriber)
+            subscriber.container_ids.append(container_id)
+        return subscriber
+
+    def unsubscribe(self, subscriber: LogSubscriber) -> None:
+        """Detach a subscriber, stopping follows nobody is watching any more"""
+        for container_id in subscriber.container_ids:
+            follower = self._followers.get(container_id)
+            if follower is None:
+                continue
+            follower.subscribers.discard(subscriber)
+            if not follower.subscribers:
+                del self._followers[container_id]
+                follower.close()
+                logger.info("log_follow_stopped", container_id=container_id)
+        subscriber.container_ids = []
+
+    def _start_follower(self, container_id: str, service: str) -> _ContainerFollower:
+        follower = _ContainerFollower(container_id, service)
+        follower.thread = threading.Thread(
+            target=self._follow,
+            args=(follower,),
+            name=f"logs-{container_id[:12]}",
+            daemon=True
+        )
+        self._followers[container_id] = follower
+        follower.thread.start()
+        logger.info("log_follow_started", container_id=container_id, service=service)
+        return follower
+
+    def _follow(self, follower: _ContainerFollower) -> None:
+        try:
+            follower.stream = docker_service.open_container_logs(
+                follower.container_id,
+                tail=0,
+                follow=True,
+                api_client=self._api
+            )
+            if follower.closed.is_set():
+                follower.stream.close()
+                return
+
+            for entry in follower.stream:
+                entry.service = follower.service
+                self._loop.call_soon_threadsafe(self._publish, follower, ("log", entry))
+        except Exception as e:
+            if not follower.closed.is_set():
+                logger.warning("log_follow_failed", container_id=follower.container_id, error=str(e))
+        finally:
+            if not follower.closed.is_set():
+                # The container stopped or the daemon went away
+                self._loop.call_soon_threadsafe(self._finish, follower)
+
+    def _publish(self, follower: _ContainerFollower, item: Tuple[str, Any]) -> None:
+        for subscriber in follower.subscribers:
+            subscriber.offer(item)
+
+    def _finish(self, follower: _ContainerFollower) -> None:
+        self._publish(follower, ("end", {"service": follower.service, "container_id": follower.container_id}))
+        if self._followers.get(follower.container_id) is follower:
+            del self._followers[follower.container_id]
+
+
+log_broadcaster = LogBroadcaster()
@@ -0,0 +1,301 @@
+"""
+Cached inventory of host ports in use, joined with the ports compose apps declare
+"""
+import asyncio
+import socket
+import sys
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import psutil
+import structlog
+
+from app.core.config import settings
+from app.models.compose import ComposeApp
+from app.services.app_registry import app_registry
+from app.services.async_docker import async_docker_service
+from app.services.concurrency import SingleFlight
+
+logger = structlog.get_logger()
+
+# Socket tables and the state column value of a bound, listening socket
+PROC_NET_TABLES = {
+    "tcp": (("/proc/net/tcp", "/proc/net/tcp6"), "0A"),  # TCP_LISTEN
+    "udp": (("/proc/net/udp", "/proc/net/udp6"), "07"),  # unconnected
+}
+
+PortKey = Tuple[int, str]
+
+# Addresses that bind every interface
+WILDCARD_ADDRESSES = {None, "", "0.0.0.0", "::"}
+
+
+def _overlaps(a: Optional[str], b: Optional[str]) -> bool:
+    """Whether binds to two host addresses clash"""
+    return a in WILDCARD_ADDRESSES or b in WILDCARD_ADDRESSES or a == b
+
+
+def _decode_address(address: str) -> Tuple[str, int]:
+    """Decode a /proc/net local address such as 0100007F:0050"""
+    ip_hex, port_hex = address.split(":")
+    raw = bytes.fromhex(ip_hex)
+    if sys.byteorder == "little":
+        # The kernel prints the address as 32-bit words in host byte order
+        raw = b"".join(raw[i:i + 4][::-1] for i in range(0, len(raw), 4))
+    family = socket.AF_INET if len(raw) == 4 else socket.AF_INET6
+    return socket.inet_ntop(family, raw), int(port_hex, 16)
+
+
+def _scan_proc_net() -> Optional[Dict[PortKey, Set[str]]]:
+    """
+    Listening sockets straight from the kernel tables. Unlike
+    psutil.net_connections this does not map sockets to processes, which
+    means walking every process's file descriptors. Returns None where
+    the tables are not available.
+    """
+    sockets: Dict[PortKey, Set[str]] = {}
+    found = False
+    for protocol, (paths, listening) in PROC_NET_TABLES.items():
+        for path in paths:
+            try:
+                with open(path) as table:
+                    next(table, None)  # header
+                    for line in table:
+                        fields = line.split(None, 4)
+                        if len(fields) < 4 or fields[3] != listening:
+                            continue
+                        address, port = _decode_address(fields[1])
+                        sockets.setdefault((port, protocol), set()).add(address)
+                found = True
+            except FileNotFoundError:
+                continue
+    return sockets if found else None
+
+
+def _scan_psutil() -> Dict[PortKey, Set[str]]:
+    sockets: Dict[PortKey, Set[str]] = {}
+    for conn in psutil.net_connections(kind='inet'):
+        if not conn.laddr:
+            continue
+        if conn.type == socket.SOCK_STREAM and conn.status == psutil.CONN_LISTEN:
+            protocol = "tcp"
+        elif conn.type == socket.SOCK_DGRAM and not conn.raddr:
+            protocol = "udp"
+        else:
+            continue
+        sockets.setdefault((conn.laddr.port, protocol), set()).add(conn.laddr.ip)
+    return sockets
+
+
+def scan_listening_sockets() -> Dict[PortKey, Set[str]]:
+    """Bound listening sockets by (port, protocol), with their addresses"""
+    sockets = _scan_proc_net()
+    return sockets if sockets is not None else _scan_psutil()
+
+
+class PortInventory:
+    """
+    Host ports in use, refreshed in the background every
+    PORT_INVENTORY_INTERVAL seconds, so requests never scan the socket table.
+
+    Each port combines the listening sockets seen on the host, the
+    containers publishing it and the compose services declaring it. A port
+    is a conflict when more than one app declares it, or when an app
+    declares it and something other than that app holds it, on overlapping
+    addresses (0.0.0.0 and :: overlap every address). The joined view is
+    rebuilt only when a scan finds different sockets or bindings, or the
+    registry changed.
+    """
+
+    def __init__(self, interval: Optional[float] = None):
+        self.interval = interval or settings.PORT_INVENTORY_INTERVAL
+        self._sockets: Dict[PortKey, Set[str]] = {}
+        self._bindings: List[Dict[str, Any]] = []
+        self._entries: Dict[PortKey, Dict[str, Any]] = {}
+        self._version = 0
+        self._built_for: Optional[Tuple[int, int]] = None
+        self._scanned_at: Optional[float] = None
+        self._flights = SingleFlight()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def scanned_at(self) -> Optional[float]:
+        return self._scanned_at
+
+    async def start(self) -> None:
+        """Start refreshing in the background"""
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._refresh_loop())
+        logger.info("port_inventory_started", interval=self.interval)
+
+    async def stop(self) -> None:
+        """Stop refreshing"""
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("port_inventory_stopped")
+
+    async def refresh(self) -> None:
+        """Rescan sockets and container bindings; concurrent calls share one scan"""
+        await self._flights.do("refresh", self._refresh)
+
+    async def entries(self) -> List[Dict[str, Any]]:
+        """Every port in use or declared, ordered by port"""
+        await self._ensure_current()
+        return [self._entries[key] for key in sorted(self._entries)]
+
+    async def conflicts_for(self, app: ComposeApp) -> List[Dict[str, Any]]:
+        """
+        Ports an app declares that something else currently holds. Conflicts
+        found in the cached view are confirmed by a rescan, since the port
+        may have been freed since, e.g. by an app that was just stopped.
+        """
+        await self._ensure_current()
+        if self._conflicts(app):
+            await self.refresh()
+        return self._conflicts(app)
+
+    def _conflicts(self, app: ComposeApp) -> List[Dict[str, Any]]:
+        conflicts = []
+        for service in app.services:
+            for mapping in service.ports:
+                entry = self._entries.get((mapping.host_port, mapping.protocol))
+                if entry is None:
+                    continue
+                held_by = self._holders(entry, exclude_app=app.id, address=mapping.host_ip)
+                if held_by:
+                    conflicts.append({
+                        "port": mapping.host_port,
+                        "protocol": mapping.protocol,
+                        "service": service.name,
+                        "held_by": held_by,
+                    })
+        return conflicts
+
+    async def _ensure_current(self) -> None:
+        if self._scanned_at is None:
+            await self.refresh()
+        elif self._built_for != self._inputs():
+            # The registry changed; rejoining needs no rescan
+            self._build()
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error("port_inventory_refresh_failed", error=str(e))
+            await asyncio.sleep(self.interval)
+
+    async def _refresh(self) -> None:
+        loop = asyncio.get_running_loop()
+        sockets = await loop.run_in_executor(None, scan_listening_sockets)
+        try:
+            bindings = await async_docker_service.list_published_ports()
+        except Exception as e:
+            # Keep the last known bindings rather than report ports as free
+            logger.warning("port_inventory_bindings_failed", error=str(e))
+            bindings = self._bindings
+
+        if sockets != self._sockets or bindings != self._bindings:
+            self._sockets = sockets
+            self._bindings = bindings
+            self._version += 1
+        self._scanned_at = time.time()
+        if self._built_for != self._inputs():
+            self._build()
+
+    def _inputs(self) -> Tuple[int, int]:
+        return (self._version, app_registry.generation)
+
+    def _build(self) -> None:
+        entries: Dict[PortKey, Dict[str, Any]] = {}
+
+        def entry(key: PortKey) -> Dict[str, Any]:
+            if key not in entries:
+                entries[key] = {
+                    "port": key[0],
+                    "protocol": key[1],
+                    "addresses": [],
+                    "listening": False,
+                    "containers": [],
+                    "declared_by": [],
+                    "conflict": False,
+                }
+            return entries[key]
+
+        for key, addresses in self._sockets.items():
+            item = entry(key)
+            item["listening"] = True
+            item["addresses"] = sorted(addresses)
+
+        for binding in self._bindings:
+            owner = None
+            if binding["project"]:
+                owner = next(iter(app_registry.find_by_project(binding["project"], binding["working_dir"])), None)
+            entry((binding["host_port"], binding["protocol"]))["containers"].append({
+                "id": binding["container_id"],
+                "name": binding["container_name"],
+                "host_ip": binding["host_ip"],
+                "container_port": binding["container_port"],
+                "app_id": owner.id if owner else None,
+                "app_name": owner.name if owner else None,
+                "service": binding["service"],
+            })
+
+        for app in app_registry.list():
+            for service in app.services:
+                for mapping in service.ports:
+                    entry((mapping.host_port, mapping.protocol))["declared_by"].append({
+                        "app_id": app.id,
+                        "app_name": app.name,
+                        "service": service.name,
+                        "host_ip": mapping.host_ip,
+                        "container_port": mapping.container_port,
+                    })
+
+        for item in entries.values():
+            declared = item["declared_by"]
+            item["conflict"] = any(
+                other["app_id"] != first["app_id"] and _overlaps(first["host_ip"], other["host_ip"])
+                for index, first in enumerate(declared) for other in declared[index + 1:]
+            ) or any(
+                bool(self._holders(item, exclude_app=first["app_id"], address=first["host_ip"])) for first in declared
+            )
+
+        self._entries = entries
+        self._built_for = self._inputs()
+        logger.debug("port_inventory_built", ports=len(entries))
+
+    @staticmethod
+    def _holders(entry: Dict[str, Any], exclude_app: str, address: Optional[str] = None) -> List[str]:
+        """What holds a port on addresses overlapping `address`, other than the given app's containers"""
+        holders = []
+        for container in entry["containers"]:
+            if container["app_id"] == exclude_app or not _overlaps(container["host_ip"], address):
+                continue
+            if container["app_name"]:
+                holders.append(f"{container['app_name']}/{container['service']}")
+            else:
+                holders.append(f"container {container['name']}")
+        # Published ports show up as sockets too; only the rest are host processes
+        if any(
+            _overlaps(listening, address)
+            and not any(_overlaps(container["host_ip"], listening) for container in entry["containers"])
+            for listening in entry["addresses"]
+        ):
+            holders.append("a host process")
+        return holders
+
+
+port_inventory = PortInventory()
@@ -0,0 +1,221 @@
+"""
+Background resource sampler for running compose containers
+"""
+import asyncio
+import threading
+import time
+from typing import Dict, List, Optional, Set
+
+import structlog
+
+from app.core.config import settings
+from app.models.compose import ComposeApp, ContainerState, ResourceUsage
+from app.services.app_registry import app_registry
+from app.services.docker_service import calculate_resource_usage, docker_service
+from app.services.timeseries import TimeSeries
+
+logger = structlog.get_logger()
+
+RESOURCE_FIELDS = tuple(ResourceUsage.model_fields)
+# The figures apply_usage copies onto services
+RENDERED_FIELDS = ("cpu_percent", "memory_mb", "memory_limit_mb")
+
+
+class _StatsStream:
+    """A streaming stats subscription for one container, read on its own thread"""
+
+    def __init__(self, container_id: str):
+        self.container_id = container_id
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def alive(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+
+class ResourceSampler:
+    """
+    Streams `stats(stream=True)` for every running compose container and keeps
+    a fixed-size history per container, so stats requests are served from
+    memory no matter how many dashboards are polling.
+    """
+
+    def __init__(self, interval: Optional[float] = None, history_size: Optional[int] = None):
+        self.interval = interval or settings.RESOURCE_POLL_INTERVAL
+        self.history_size = history_size or settings.STATS_HISTORY_SIZE
+        self._series: Dict[str, TimeSeries] = {}
+        self._streams: Dict[str, _StatsStream] = {}
+        self._lock = threading.Lock()
+        self._api = None
+        self._task: Optional[asyncio.Task] = None
+        # Bumped on every recorded sample, so callers can tell when usage changed
+        self.generation = 0
+        # Bumped only when a figure apply_usage renders changes, or a sample
+        # goes stale, so listings can be revalidated across unchanged samples
+        self.usage_generation = 0
+        self._rendered: Dict[str, tuple] = {}
+        self._fresh: Set[str] = set()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        """Start sampling in the background"""
+        if self.running:
+            return
+        if self._api is None:
+            # Each stream holds a connection; keep them out of the shared pool
+            self._api = docker_service.create_api_client(max_pool_size=settings.STATS_SAMPLER_MAX_STREAMS)
+        self._task = asyncio.create_task(self._reconcile_loop())
+        logger.info("resource_sampler_started", interval=self.interval, history_size=self.history_size)
+
+    async def stop(self) -> None:
+        """Stop sampling and close every stream"""
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        for stream in list(self._streams.values()):
+            stream.stop_event.set()
+        self._streams.clear()
+        logger.info("resource_sampler_stopped")
+
+    def latest(self, container_id: str, max_age: Optional[float] = None) -> Optional[ResourceUsage]:
+        """Most recent usage for a container, if sampled within `max_age` seconds"""
+        max_age = max_age if max_age is not None else settings.STATS_CACHE_MAX_AGE
+        with self._lock:
+            series = self._series.get(container_id)
+            sample = series.latest() if series else None
+        if sample is None or time.time() - sample["timestamp"] > max_age:
+            return None
+        return ResourceUsage(**{name: sample[name] for name in RESOURCE_FIELDS})
+
+    def apply_usage(self, apps: List[ComposeApp], max_age: Optional[float] = None) -> None:
+        """
+        Fill in service and app CPU/memory figures from the latest samples.
+        Services without a fresh sample report zero usage.
+        """
+        for app in apps:
+            total_cpu = 0.0
+            total_memory = 0.0
+            for service in app.services:
+                usage = None
+                if service.container_id and service.state == ContainerState.RUNNING:
+                    usage = self.latest(service.container_id, max_age)
+
+                if usage:
+                    service.cpu_percent = usage.cpu_percent
+                    service.memory_mb = usage.memory_mb
+                    if usage.memory_limit_mb:
+                        service.memory_limit_mb = usage.memory_limit_mb
+                    total_cpu += usage.cpu_percent
+                    total_memory += usage.memory_mb
+                else:
+                    service.cpu_percent = 0.0
+                    service.memory_mb = 0.0
+
+            app.cpu_percent = round(total_cpu, 2)
+            app.memory_mb = round(total_memory, 2)
+
+    def history(self, container_id: str, limit: Optional[int] = None) -> Optional[Dict[str, List[float]]]:
+        """Columnar sample history for a container, oldest first"""
+        with self._lock:
+            series = self._series.get(container_id)
+            return series.to_dict(limit) if series else None
+
+    def record(self, container_id: str, usage: ResourceUsage, timestamp: Optional[float] = None) -> None:
+        """Store a sample for a container"""
+        with self._lock:
+            series = self._series.get(container_id)
+            if series is None:
+                series = self._series[container_id] = TimeSeries(RESOURCE_FIELDS, self.history_size)
+            series.append(timestamp or time.time(), usage.model_dump())
+            self.generation += 1
+            rendered = tuple(getattr(usage, name) for name in RENDERED_FIELDS)
+            if self._rendered.get(container_id) != rendered:
+                self._rendered[container_id] = rendered
+                self.usage_generation += 1
+
+    async def _reconcile_loop(self) -> None:
+        while True:
+            try:
+                self._reconcile()
+            except Exception as e:
+                logger.error("resource_sampler_reconcile_failed", error=str(e))
+            await asyncio.sleep(self.interval)
+
+    def _reconcile(self) -> None:
+        """Follow running containers, drop the rest"""
+        known = set()
+        wanted = set()
+        for app in app_registry.list():
+            for service in app.services:
+                if service.container_id:
+                    known.add(service.container_id)
+                    if service.state == ContainerState.RUNNING:
+                        wanted.add(service.container_id)
+
+        for container_id, stream in list(self._streams.items()):
+            if container_id not in wanted or not stream.alive:
+                stream.stop_event.set()
+                del self._streams[container_id]
+
+        for container_id in wanted - set(self._streams):
+            if len(self._streams) >= settings.STATS_SAMPLER_MAX_STREAMS:
+                logger.warning("resource_sampler_stream_limit_reached", limit=settings.STATS_SAMPLER_MAX_STREAMS)
+                break
+            stream = _StatsStream(container_id)
+            stream.thread = threading.Thread(
+                target=self._follow,
+                args=(stream,),
+                name=f"stats-{container_id[:12]}",
+                daemon=True
+            )
+            self._streams[container_id] = stream
+            stream.thread.start()
+
+        # History is kept while the container is known, even if stopped
+        with self._lock:
+            for container_id in [cid for cid in self._series if cid not in known]:
+                del self._series[container_id]
+                self._rendered.pop(container_id, None)
+
+            # Samples that aged out render as zero usage
+            now = time.time()
+            fresh = {
+                container_id for container_id, series in self._series.items()
+                if now - series.latest()["timestamp"] <= settings.STATS_CACHE_MAX_AGE
+            }
+            if fresh != self._fresh:
+                self._fresh = fresh
+                self.usage_generation += 1
+
+    def _follow(self, stream: _StatsStream) -> None:
+        """Read a container's stats stream, recording one sample per interval"""
+        last_recorded = 0.0
+        try:
+            # The daemon emits a sample about once per second, which bounds
+            # how long a stop request waits to be noticed
+            for stats in self._api.stats(stream.container_id, stream=True, decode=True):
+                if stream.stop_event.is_set():
+                    break
+                # The first sample has no previous CPU reading to diff against
+                if not (stats.get('precpu_stats') or {}).get('system_cpu_usage'):
+                    continue
+                now = time.monotonic()
+                if now - last_recorded < self.interval:
+                    continue
+                last_recorded = now
+                self.record(stream.container_id, calculate_resource_usage(stats))
+        except Exception as e:
+            if not stream.stop_event.is_set():
+                logger.warning("resource_stream_failed", container_id=stream.container_id, error=str(e))
+
+
+resource_sampler = ResourceSampler()
@@ -0,0 +1,173 @@
+"""
+Background host metrics collector
+"""
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import psutil
+import structlog
+
+from app.core.config import settings
+from app.services.timeseries import TimeSeries
+
+logger = structlog.get_logger()
+
+MB = 1024 * 1024
+GB = 1024 * 1024 * 1024
+
+
+class SystemMetricsCollector:
+    """
+    Samples host CPU (overall and per core), memory, disk, network and load
+    average every SYSTEM_METRICS_INTERVAL seconds into a ring-buffered
+    history, so system info requests are answered from memory.
+
+    CPU figures are psutil's non-blocking readings, i.e. utilisation since
+    the previous sample, and network figures are rates over the same span.
+    Samples are taken on a worker thread because a disk usage call can stall
+    on a slow mount.
+    """
+
+    def __init__(self, interval: Optional[float] = None, history_size: Optional[int] = None):
+        self.interval = interval or settings.SYSTEM_METRICS_INTERVAL
+        self.history_size = history_size or settings.SYSTEM_METRICS_HISTORY_SIZE
+        self.cores = psutil.cpu_count() or 1
+        self.fields = (
+            "cpu_percent",
+            *(f"cpu_core_{core}" for core in range(self.cores)),
+            "memory_percent", "memory_used_mb", "memory_available_mb",
+            "disk_percent", "disk_used_gb", "disk_free_gb",
+            "network_rx_mb_s", "network_tx_mb_s",
+            "load_1", "load_5", "load_15",
+        )
+        self._series = TimeSeries(self.fields, self.history_size)
+        self._lock = threading.Lock()
+        self._info: Optional[Dict[str, Any]] = None
+        self._network: Optional[tuple] = None
+        self._task: Optional[asyncio.Task] = None
+        # Bumped on every sample, so callers can tell when the figures changed
+        self.generation = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        """Start sampling in the background"""
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._sample_loop())
+        logger.info("system_metrics_started", interval=self.interval, history_size=self.history_size)
+
+    async def stop(self) -> None:
+        """Stop sampling"""
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("system_metrics_stopped")
+
+    async def info(self) -> Dict[str, Any]:
+        """Latest host figures, taking a first sample if there is none yet"""
+        if self._info is None:
+            await asyncio.get_running_loop().run_in_executor(None, self.sample)
+        return self._info
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """Latest host figures, if any were sampled"""
+        return self._info
+
+    def history(self, limit: Optional[int] = None) -> Dict[str, List[float]]:
+        """Columnar sample history, oldest first"""
+        with self._lock:
+            return self._series.to_dict(limit)
+
+    async def _sample_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, self.sample)
+            except Exception as e:
+                logger.error("system_metrics_sample_failed", error=str(e))
+            await asyncio.sleep(self.interval)
+
+    def sample(self) -> None:
+        """Take one sample of the host"""
+        now = time.time()
+        cpu_percent = psutil.cpu_percent(interval=None)
+        per_core = psutil.cpu_percent(interval=None, percpu=True)
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage(settings.SYSTEM_METRICS_DISK_PATH)
+        load = psutil.getloadavg()
+
+        network = psutil.net_io_counters()
+        rx_rate = tx_rate = 0.0
+        if self._network is not None:
+            last_time, last_rx, last_tx = self._network
+            elapsed = now - last_time
+            if elapsed > 0:
+                # Counters can reset (interface restart); treat that as no traffic
+                rx_rate = max(network.bytes_recv - last_rx, 0) / MB / elapsed
+                tx_rate = max(network.bytes_sent - last_tx, 0) / MB / elapsed
+        self._network = (now, network.bytes_recv, network.bytes_sent)
+
+        values = {
+            "cpu_percent": cpu_percent,
+            "memory_percent": memory.percent,
+            "memory_used_mb": memory.used / MB,
+            "memory_available_mb": memory.available / MB,
+            "disk_percent": disk.percent,
+            "disk_used_gb": disk.used / GB,
+            "disk_free_gb": disk.free / GB,
+            "network_rx_mb_s": rx_rate,
+            "network_tx_mb_s": tx_rate,
+            "load_1": load[0],
+            "load_5": load[1],
+            "load_15": load[2],
+        }
+        for core, percent in enumerate(per_core[:self.cores]):
+            values[f"cpu_core_{core}"] = percent
+
+        info = {
+            "cpu": {
+                "count": self.cores,
+                "percent": cpu_percent,
+                "per_core": per_core,
+                "load_average": list(load),
+            },
+            "memory": {
+                "total_mb": memory.total / MB,
+                "available_mb": memory.available / MB,
+                "used_mb": memory.used / MB,
+                "percent": memory.percent,
+            },
+            "disk": {
+                "total_gb": disk.total / GB,
+                "used_gb": disk.used / GB,
+                "free_gb": disk.free / GB,
+                "percent": disk.percent,
+            },
+            "network": {
+                "rx_mb_s": round(rx_rate, 3),
+                "tx_mb_s": round(tx_rate, 3),
+                "rx_total_mb": network.bytes_recv / MB,
+                "tx_total_mb": network.bytes_sent / MB,
+            },
+            "platform": os.name,
+            "timestamp": now,
+        }
+
+        with self._lock:
+            self._series.append(now, values)
+            self._info = info
+            self.generation += 1
+
+
+system_metrics = SystemMetricsCollector()
@@ -0,0 +1,80 @@
+"""
+Fixed-size in-memory time series backed by ring buffers
+"""
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+
+class RingBuffer:
+    """Fixed-capacity circular buffer of floats stored in a contiguous array"""
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._data = array('d', bytes(8 * capacity))
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, value: float) -> None:
+        """Append a value, overwriting the oldest one when full"""
+        end = (self._start + self._size) % self.capacity
+        self._data[end] = value
+        if self._size < self.capacity:
+            self._size += 1
+        else:
+            self._start = (self._start + 1) % self.capacity
+
+    def latest(self) -> Optional[float]:
+        """Most recently appended value"""
+        if not self._size:
+            return None
+        return self._data[(self._start + self._size - 1) % self.capacity]
+
+    def values(self, limit: Optional[int] = None) -> List[float]:
+        """Values from oldest to newest, optionally only the newest `limit`"""
+        count = self._size if limit is None else max(0, min(limit, self._size))
+        first = (self._start + self._size - count) % self.capacity
+        if first + count <= self.capacity:
+            return self._data[first:first + count].tolist()
+        return self._data[first:].tolist() + self._data[:first + count - self.capacity].tolist()
+
+
+class TimeSeries:
+    """Aligned ring buffers: one for timestamps and one per metric field"""
+
+    def __init__(self, fields: Iterable[str], capacity: int):
+        self.fields = tuple(fields)
+        self._timestamps = RingBuffer(capacity)
+        self._columns = {name: RingBuffer(capacity) for name in self.fields}
+
+    def __len__(self) -> int:
+        return len(self._timestamps)
+
+    def append(self, timestamp: float, values: Dict[str, float]) -> None:
+        """Record one sample; missing fields are stored as 0.0"""
+        self._timestamps.append(timestamp)
+        for name, column in self._columns.items():
+            column.append(float(values.get(name, 0.0)))
+
+    @property
+    def last_timestamp(self) -> Optional[float]:
+        return self._timestamps.latest()
+
+    def latest(self) -> Optional[Dict[str, float]]:
+        """Most recent sample, including its timestamp"""
+        if not len(self):
+            return None
+        sample = {name: column.latest() for name, column in self._columns.items()}
+        sample["timestamp"] = self._timestamps.latest()
+        return sample
+
+    def to_dict(self, limit: Optional[int] = None) -> Dict[str, List[float]]:
+        """Columnar history from oldest to newest"""
+        history = {"timestamp": self._timestamps.values(limit)}
+        for name, column in self._columns.items():
+            history[name] = column.values(limit)
+        return history
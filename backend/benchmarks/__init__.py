@@ -0,0 +1,7 @@
+"""
+DockPilot backend benchmarks
+
+generate     synthesises a tree of compose projects on disk
+fake_daemon  stands in for the Docker Engine API on a Unix socket
+run          times discovery and the API's hot paths at increasing scale
+"""
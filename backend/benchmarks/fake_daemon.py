@@ -0,0 +1,396 @@
+"""
+A stand-in for the Docker Engine API, served over a Unix socket.
+
+Containers come from a generator manifest: one per service, labelled the way
+compose labels them, running or exited as the manifest says. The endpoints
+DockPilot uses are served with a configurable latency per request:
+
+    GET  /_ping, /version, /info
+    GET  /containers/json               label filters and `all`
+    GET  /containers/{id}/json
+    GET  /containers/{id}/stats         one-shot or streamed every second
+    GET  /containers/{id}/logs          multiplexed frames, `tail` and `follow`
+    GET  /events                        container events caused by actions
+    POST /containers/{id}/start|stop|restart
+
+A benchmark run can load another manifest without restarting the daemon:
+
+    POST /_bench/load  {"manifest": "/path/manifest.json", "latency_ms": 2}
+
+    python -m benchmarks.fake_daemon --socket /tmp/docker.sock --latency-ms 1
+"""
+import argparse
+import hashlib
+import json
+import os
+import queue
+import re
+import socketserver
+import struct
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.generate import IMAGES
+
+API_VERSION = "1.43"
+LOG_LINES = 1000
+STATS_INTERVAL = 1.0
+
+ROUTE = re.compile(r"^(?:/v[\d.]+)?(/.*)$")
+CONTAINER_ROUTE = re.compile(r"^/containers/([0-9a-f]+)/(json|stats|logs|start|stop|restart)$")
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f000Z")
+
+
+class FakeContainer:
+    def __init__(self, project: Dict[str, Any], service: Dict[str, Any], created: float):
+        self.id = hashlib.sha256(f"{project['path']}/{service['name']}".encode()).hexdigest()
+        self.name = f"{project['name']}-{service['name']}-1"
+        self.image = service["image"]
+        self.created = created
+        self.running = project["running"]
+        self.ports = service["ports"]
+        self.labels = {
+            "com.docker.compose.project": project["name"],
+            "com.docker.compose.service": service["name"],
+            "com.docker.compose.project.working_dir": project["path"],
+            "com.docker.compose.project.config_files": os.path.join(project["path"], project["compose_file"]),
+            "com.docker.compose.container-number": "1",
+            "com.docker.compose.oneoff": "False",
+        }
+        self.cpu_total = 0
+
+    @property
+    def state(self) -> str:
+        return "running" if self.running else "exited"
+
+    def summary(self) -> Dict[str, Any]:
+        """The sparse form /containers/json returns"""
+        return {
+            "Id": self.id,
+            "Names": [f"/{self.name}"],
+            "Image": self.image,
+            "Created": int(self.created),
+            "State": self.state,
+            "Status": "Up 2 hours (healthy)" if self.running else "Exited (0) 2 hours ago",
+            "Labels": self.labels,
+            "Ports": [
+                {"IP": "0.0.0.0", "PrivatePort": port["container"], "PublicPort": port["host"], "Type": port["protocol"]}
+                for port in self.ports
+            ] if self.running else [],
+        }
+
+    def inspect(self) -> Dict[str, Any]:
+        return {
+            "Id": self.id,
+            "Name": f"/{self.name}",
+            "Created": _iso(self.created),
+            "Image": self.image,
+            "State": {
+                "Status": self.state,
+                "Running": self.running,
+                "Paused": False,
+                "Health": {"Status": "healthy"} if self.running else {},
+            },
+            "Config": {"Image": self.image, "Tty": False, "Labels": self.labels},
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        previous = self.cpu_total
+        self.cpu_total += 25_000_000
+        system = int(time.time() * 1e9)
+        return {
+            "read": _iso(time.time()),
+            "cpu_stats": {
+                "cpu_usage": {"total_usage": self.cpu_total},
+                "system_cpu_usage": system,
+                "online_cpus": 2,
+            },
+            "precpu_stats": {
+                "cpu_usage": {"total_usage": previous},
+                "system_cpu_usage": system - 2_000_000_000,
+                "online_cpus": 2,
+            },
+            "memory_stats": {"usage": 64 * 1024 * 1024, "limit": 2048 * 1024 * 1024, "stats": {"inactive_file": 0}},
+            "networks": {"eth0": {"rx_bytes": self.cpu_total // 1000, "tx_bytes": self.cpu_total // 2000}},
+            "blkio_stats": {"io_service_bytes_recursive": [
+                {"op": "read", "value": 4 * 1024 * 1024},
+                {"op": "write", "value": 1024 * 1024},
+            ]},
+        }
+
+    def event(self, action: str) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "Type": "container",
+            "Action": action,
+            "status": action,
+            "id": self.id,
+            "from": self.image,
+            "Actor": {"ID": self.id, "Attributes": {**self.labels, "name": self.name, "image": self.image}},
+            "scope": "local",
+            "time": int(now),
+            "timeNano": int(now * 1e9),
+        }
+
+
+class FakeDaemon:
+    """Container state shared by every connection"""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000
+        self.containers: Dict[str, FakeContainer] = {}
+        self.requests = 0
+        self._subscribers: List[queue.Queue] = []
+        self._lock = threading.Lock()
+
+    def load(self, manifest_path: Optional[str], latency_ms: Optional[float] = None) -> int:
+        containers = {}
+        if manifest_path:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            created = time.time()
+            for project in manifest["projects"]:
+                for service in project["services"]:
+                    container = FakeContainer(project, service, created)
+                    containers[container.id] = container
+        with self._lock:
+            self.containers = containers
+            if latency_ms is not None:
+                self.latency = latency_ms / 1000
+        return len(containers)
+
+    def list(self, all_containers: bool, filters: Dict[str, List[str]]) -> List[Dict[str, Any]]:
+        matched = []
+        for container in list(self.containers.values()):
+            if not all_containers and not container.running:
+                continue
+            if not all(self._label_matches(container, label) for label in filters.get("label", [])):
+                continue
+            matched.append(container.summary())
+        return matched
+
+    @staticmethod
+    def _label_matches(container: FakeContainer, label: str) -> bool:
+        key, _, value = label.partition("=")
+        if key not in container.labels:
+            return False
+        return not value or container.labels[key] == value
+
+    def act(self, container: FakeContainer, action: str) -> None:
+        if action in ("stop", "restart") and container.running:
+            container.running = False
+            self.publish(container.event("die"))
+            self.publish(container.event("stop"))
+        if action in ("start", "restart") and not container.running:
+            container.running = True
+            self.publish(container.event("start"))
+
+    def subscribe(self) -> queue.Queue:
+        events: queue.Queue = queue.Queue()
+        with self._lock:
+            self._subscribers.append(events)
+        return events
+
+    def unsubscribe(self, events: queue.Queue) -> None:
+        with self._lock:
+            self._subscribers.remove(events)
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        with self._lock:
+            for events in self._subscribers:
+                events.put(event)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    daemon: FakeDaemon
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        self._dispatch("GET")
+
+    def do_POST(self) -> None:
+        self._dispatch("POST")
+
+    def _dispatch(self, method: str) -> None:
+        url = urlparse(self.path)
+        path = ROUTE.match(url.path).group(1)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.daemon.requests += 1
+        if self.daemon.latency and path != "/_bench/load":
+            time.sleep(self.daemon.latency)
+
+        if method == "POST" and path == "/_bench/load":
+            options = json.loads(body or b"{}")
+            count = self.daemon.load(options.get("manifest"), options.get("latency_ms"))
+            return self._json({"containers": count})
+        if path == "/_bench/stats":
+            return self._json({"requests": self.daemon.requests, "containers": len(self.daemon.containers)})
+        if path == "/_ping":
+            return self._send(200, b"OK", "text/plain")
+        if path == "/version":
+            return self._json({"Version": "24.0.7", "ApiVersion": API_VERSION, "MinAPIVersion": "1.12",
+                               "Os": "linux", "Arch": "amd64", "KernelVersion": os.uname().release})
+        if path == "/info":
+            running = sum(1 for container in self.daemon.containers.values() if container.running)
+            return self._json({"ID": "fake-daemon", "Name": "fake-daemon", "ServerVersion": "24.0.7",
+                               "Containers": len(self.daemon.containers), "ContainersRunning": running,
+                               "ContainersStopped": len(self.daemon.containers) - running,
+                               "Images": len(IMAGES), "NCPU": os.cpu_count(), "MemTotal": 8 * 1024 ** 3})
+        if path == "/containers/json":
+            filters = json.loads(query.get("filters") or "{}")
+            if isinstance(filters.get("label"), dict):
+                filters["label"] = [key for key, enabled in filters["label"].items() if enabled]
+            return self._json(self.daemon.list(query.get("all") in ("1", "true", "True"), filters))
+        if path == "/events":
+            return self._events()
+
+        match = CONTAINER_ROUTE.match(path)
+        container = self.daemon.containers.get(match.group(1)) if match else None
+        if match and container is None:
+            return self._json({"message": f"No such container: {match.group(1)}"}, 404)
+        if container is not None:
+            endpoint = match.group(2)
+            if method == "GET" and endpoint == "json":
+                return self._json(container.inspect())
+            if method == "GET" and endpoint == "stats":
+                return self._stats(container, query.get("stream") not in ("0", "false", "False"))
+            if method == "GET" and endpoint == "logs":
+                return self._logs(container, query)
+            if method == "POST" and endpoint in ("start", "stop", "restart"):
+                self.daemon.act(container, endpoint)
+                return self._send(204, b"")
+        return self._json({"message": f"page not found: {method} {path}"}, 404)
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json") -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Api-Version", API_VERSION)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json(self, payload: Any, status: int = 200) -> None:
+        self._send(status, json.dumps(payload).encode(), "application/json")
+
+    def _start_stream(self, content_type: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("Api-Version", API_VERSION)
+        self.end_headers()
+        # Streams end when the client disconnects
+        self.close_connection = True
+
+    def _chunk(self, data: bytes) -> None:
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def _end_stream(self) -> None:
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _stats(self, container: FakeContainer, stream: bool) -> None:
+        if not stream:
+            return self._json(container.stats())
+        self._start_stream("application/json")
+        try:
+            while container.running and container.id in self.daemon.containers:
+                self._chunk(json.dumps(container.stats()).encode() + b"\n")
+                time.sleep(STATS_INTERVAL)
+            self._end_stream()
+        except OSError:
+            pass
+
+    def _logs(self, container: FakeContainer, query: Dict[str, str]) -> None:
+        tail = query.get("tail", "all")
+        count = LOG_LINES if tail == "all" else min(int(tail), LOG_LINES)
+        streams = [kind for kind, flag in ((1, "stdout"), (2, "stderr")) if query.get(flag, "0") in ("1", "true")]
+        timestamps = query.get("timestamps") in ("1", "true")
+        started = time.time() - count
+
+        def frame(number: int, when: float) -> bytes:
+            kind = streams[number % len(streams)] if streams else 1
+            line = f"{container.name} request {number} handled in {number % 97} ms status=200\n"
+            if timestamps:
+                line = f"{_iso(when)} {line}"
+            payload = line.encode()
+            return struct.pack(">BxxxL", kind, len(payload)) + payload
+
+        self._start_stream("application/vnd.docker.raw-stream")
+        try:
+            self._chunk(b"".join(frame(number, started + number) for number in range(count)))
+            number = count
+            while query.get("follow") in ("1", "true") and container.id in self.daemon.containers:
+                time.sleep(1.0)
+                if container.running:
+                    self._chunk(frame(number, time.time()))
+                    number += 1
+            self._end_stream()
+        except OSError:
+            pass
+
+    def _events(self) -> None:
+        events = self.daemon.subscribe()
+        self._start_stream("application/json")
+        try:
+            while True:
+                try:
+                    event = events.get(timeout=5.0)
+                except queue.Empty:
+                    # Writing nothing would never notice a client that went away
+                    self._chunk(b"\n")
+                    continue
+                self._chunk(json.dumps(event).encode() + b"\n")
+        except OSError:
+            pass
+        finally:
+            self.daemon.unsubscribe(events)
+
+
+class FakeDaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, daemon: FakeDaemon):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        handler = type("BoundHandler", (Handler,), {"daemon": daemon})
+        super().__init__(socket_path, handler)
+
+    def get_request(self):
+        request, _ = super().get_request()
+        # BaseHTTPRequestHandler expects an address tuple
+        return request, ("fake-daemon", 0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--socket", required=True, help="Unix socket path to listen on")
+    parser.add_argument("--manifest", help="generator manifest describing the containers")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="added to every request")
+    args = parser.parse_args()
+
+    daemon = FakeDaemon(args.latency_ms)
+    daemon.load(args.manifest)
+    server = FakeDaemonServer(args.socket, daemon)
+    print(f"listening on {args.socket} with {len(daemon.containers)} containers", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
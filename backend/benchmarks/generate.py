@@ -0,0 +1,137 @@
+"""
+Synthesise a tree of compose projects for benchmarking discovery.
+
+Each project gets a compose file with M services exercising the parts of the
+format DockPilot resolves (interpolation from .env, ports, bind mounts,
+depends_on, healthchecks), plus directories discovery has to walk past. The
+tree is described by a manifest.json at its root, which the fake daemon
+reads to create matching containers.
+
+    python -m benchmarks.generate /tmp/bench-tree --projects 100 --services 5
+"""
+import argparse
+import json
+import os
+import random
+from typing import Any, Dict
+
+MANIFEST_NAME = "manifest.json"
+
+IMAGES = ["nginx:1.25", "redis:7", "postgres:16", "node:20-alpine", "python:3.11-slim", "grafana/grafana:10.2.0"]
+
+
+def _compose_file(project: Dict[str, Any]) -> str:
+    lines = ["services:"]
+    previous = None
+    for service in project["services"]:
+        name = service["name"]
+        port = service["ports"][0]
+        lines += [
+            f"  {name}:",
+            f"    image: ${{{name.upper()}_IMAGE:-{service['image']}}}",
+            "    restart: unless-stopped",
+            "    ports:",
+            f"      - \"${{{name.upper()}_PORT:-{port['host']}}}:{port['container']}\"",
+            "    environment:",
+            f"      SERVICE_NAME: {name}",
+            "      LOG_LEVEL: ${LOG_LEVEL:-info}",
+            "      DATABASE_URL: postgres://app:${DB_PASSWORD}@db:5432/app",
+            "    volumes:",
+            f"      - ./data/{name}:/data",
+            "      - cache:/cache",
+            "    healthcheck:",
+            f"      test: [\"CMD\", \"wget\", \"-qO-\", \"http://localhost:{port['container']}/health\"]",
+            "      interval: 30s",
+            "      retries: 3",
+            "    labels:",
+            f"      com.example.tier: \"{service['tier']}\"",
+        ]
+        if previous:
+            lines += ["    depends_on:", f"      - {previous}"]
+        previous = name
+    lines += ["", "volumes:", "  cache:", ""]
+    return "\n".join(lines)
+
+
+def generate_tree(
+    root: str,
+    projects: int,
+    services: int,
+    running: float = 0.8,
+    noise: int = 3,
+    port_base: int = 40000,
+    seed: int = 0
+) -> Dict[str, Any]:
+    """
+    Write `projects` compose projects of `services` services each under
+    `root` and return the manifest. About `running` of the projects are
+    marked running; each project also gets `noise` directories of files
+    that are not compose files.
+    """
+    rng = random.Random(seed)
+    os.makedirs(root, exist_ok=True)
+    manifest: Dict[str, Any] = {"root": root, "projects": []}
+    port = port_base
+
+    for index in range(projects):
+        # Spread projects over a few levels, as real search paths are
+        group = os.path.join(root, f"group-{index % 10:02d}")
+        name = f"bench-{index:04d}"
+        path = os.path.join(group, name)
+        project = {
+            "name": name,
+            "path": path,
+            "compose_file": "docker-compose.yml",
+            "running": rng.random() < running,
+            "services": [],
+        }
+        for number in range(services):
+            port += 1
+            project["services"].append({
+                "name": f"svc{number:02d}",
+                "image": rng.choice(IMAGES),
+                "tier": rng.choice(["web", "worker", "data"]),
+                "ports": [{"host": port, "container": 8000 + number, "protocol": "tcp"}],
+            })
+
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, project["compose_file"]), "w") as f:
+            f.write(_compose_file(project))
+        with open(os.path.join(path, ".env"), "w") as f:
+            f.write(f"DB_PASSWORD=secret-{index}\nLOG_LEVEL=debug\n")
+        for service in project["services"]:
+            os.makedirs(os.path.join(path, "data", service["name"]), exist_ok=True)
+        for number in range(noise):
+            noise_dir = os.path.join(path, "src", f"module{number}")
+            os.makedirs(noise_dir, exist_ok=True)
+            for file_number in range(5):
+                with open(os.path.join(noise_dir, f"file{file_number}.py"), "w") as f:
+                    f.write("# generated\n")
+
+        manifest["projects"].append(project)
+
+    with open(os.path.join(root, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("root", help="directory to generate the projects in")
+    parser.add_argument("--projects", type=int, default=50)
+    parser.add_argument("--services", type=int, default=4, help="services per project")
+    parser.add_argument("--running", type=float, default=0.8, help="fraction of projects running")
+    parser.add_argument("--noise", type=int, default=3, help="non-compose directories per project")
+    parser.add_argument("--port-base", type=int, default=40000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    manifest = generate_tree(
+        args.root, args.projects, args.services,
+        running=args.running, noise=args.noise, port_base=args.port_base, seed=args.seed
+    )
+    print(os.path.join(args.root, MANIFEST_NAME), len(manifest["projects"]))
+
+
+if __name__ == "__main__":
+    main()
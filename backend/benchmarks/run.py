@@ -0,0 +1,320 @@
+"""
+Time discovery and the API's hot paths against the fake Docker daemon.
+
+For each scale (PROJECTSxSERVICES) a tree is generated, the daemon is loaded
+with matching containers, and each scenario is timed through the app's own
+lifespan, so the background services run as they would in production.
+Results are written as JSON, one record per scale and scenario, including
+how many Engine API requests the daemon served while the scenario ran.
+
+    python -m benchmarks.run --scales 10x3,50x4,200x5 --output results.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.generate import MANIFEST_NAME, generate_tree
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Daemon:
+    """The fake daemon, run in its own process so it does not share our GIL"""
+
+    def __init__(self, socket_path: str, latency_ms: float):
+        self.socket_path = socket_path
+        self.latency_ms = latency_ms
+        self.process: Optional[subprocess.Popen] = None
+        self.client = httpx.Client(transport=httpx.HTTPTransport(uds=socket_path), base_url="http://docker")
+
+    def start(self, timeout: float = 10.0) -> None:
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.fake_daemon",
+             "--socket", self.socket_path, "--latency-ms", str(self.latency_ms)],
+            cwd=BACKEND_DIR,
+            stdout=subprocess.DEVNULL
+        )
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                self.client.get("/_ping").raise_for_status()
+                return
+            except httpx.TransportError:
+                time.sleep(0.05)
+        raise RuntimeError(f"Fake daemon did not come up on {self.socket_path}")
+
+    def load(self, manifest_path: str) -> int:
+        response = self.client.post("/_bench/load", json={"manifest": manifest_path, "latency_ms": self.latency_ms})
+        response.raise_for_status()
+        return response.json()["containers"]
+
+    def requests(self) -> int:
+        # Minus this request itself
+        return self.client.get("/_bench/stats").json()["requests"] - 1
+
+    def stop(self) -> None:
+        self.client.close()
+        if self.process is not None:
+            self.process.terminate()
+            self.process.wait(timeout=10)
+
+
+def summarise(latencies: List[float], wall: float) -> Dict[str, Any]:
+    ordered = sorted(latencies)
+
+    def percentile(fraction: float) -> float:
+        # Nearest rank, so small sample counts report observed values
+        return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+    return {
+        "samples": len(ordered),
+        "min_ms": round(ordered[0], 3),
+        "mean_ms": round(sum(ordered) / len(ordered), 3),
+        "p50_ms": round(percentile(0.5), 3),
+        "p95_ms": round(percentile(0.95), 3),
+        "max_ms": round(ordered[-1], 3),
+        "throughput_rps": round(len(ordered) / wall, 2) if wall > 0 else None,
+    }
+
+
+async def measure(
+    call: Callable[[int], Awaitable[bool]],
+    iterations: int,
+    concurrency: int
+) -> Tuple[Dict[str, Any], int]:
+    """Run `call(i)` `iterations` times, at most `concurrency` at once"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(index: int) -> None:
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                ok = await call(index)
+            except Exception:
+                ok = False
+            latencies.append((time.perf_counter() - started) * 1000)
+            errors += not ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(iterations)))
+    return summarise(latencies, time.perf_counter() - started), errors
+
+
+async def wait_for_sampler(container_ids: List[str], timeout: float) -> float:
+    """Fraction of the containers the stats sampler has figures for"""
+    from app.services.stats_sampler import resource_sampler
+
+    deadline = time.monotonic() + timeout
+    while True:
+        covered = sum(1 for container_id in container_ids if resource_sampler.latest(container_id) is not None)
+        if covered == len(container_ids) or time.monotonic() >= deadline:
+            return covered / len(container_ids) if container_ids else 1.0
+        await asyncio.sleep(0.1)
+
+
+async def run_scale(
+    client: httpx.AsyncClient,
+    daemon: Daemon,
+    root: str,
+    projects: int,
+    services: int,
+    args: argparse.Namespace
+) -> List[Dict[str, Any]]:
+    from app.services.app_registry import app_registry
+    from app.services.async_docker import async_docker_service
+
+    generate_tree(root, projects, services, seed=args.seed)
+    containers = daemon.load(os.path.join(root, MANIFEST_NAME))
+    scale = {"projects": projects, "services": services, "containers": containers}
+    results = []
+
+    async def record(name: str, call: Callable[[int], Awaitable[bool]], iterations: int, **extra: Any) -> None:
+        if iterations <= 0:
+            return
+        concurrency = 1 if name.startswith("discover") else args.concurrency
+        before = daemon.requests()
+        summary, errors = await measure(call, iterations, concurrency)
+        result = {
+            "scenario": name,
+            **scale,
+            "concurrency": concurrency,
+            "errors": errors,
+            **summary,
+            "engine_requests": daemon.requests() - before,
+            **extra,
+        }
+        results.append(result)
+        print(
+            f"{projects:>5}x{services:<3} {name:<20} p50 {result['p50_ms']:>9.2f} ms  "
+            f"p95 {result['p95_ms']:>9.2f} ms  {result['throughput_rps'] or 0:>8.1f}/s  "
+            f"errors {errors}  engine {result['engine_requests']}",
+            file=sys.stderr
+        )
+
+    async def discover(_: int) -> bool:
+        apps = await async_docker_service.discover_compose_apps([root])
+        return len(apps) == projects
+
+    async def ok(response: Awaitable[httpx.Response]) -> bool:
+        return (await response).status_code < 400
+
+    # The first scan of a tree parses every file; later scans hit the caches
+    await record("discover_cold", discover, 1)
+    await record("discover_warm", discover, args.iterations)
+    await record("api_discover", lambda _: ok(client.post("/api/apps/discover", json={"search_paths": [root]})),
+                 args.iterations)
+
+    apps = app_registry.list()
+    running = [app for app in apps if any(service.state == "running" for service in app.services)]
+    container_ids = [service.container_id for app in apps for service in app.services if service.container_id]
+    running_ids = [service.container_id for app in running for service in app.services if service.container_id]
+
+    await record("api_list_apps", lambda _: ok(client.get("/api/apps/")), args.iterations)
+    await record("api_list_summary", lambda _: ok(client.get("/api/apps/", params={"fields": "summary", "limit": 50})),
+                 args.iterations)
+
+    if running:
+        coverage = await wait_for_sampler(running_ids, args.sampler_wait)
+        await record(
+            "api_app_stats",
+            lambda i: ok(client.get(f"/api/apps/{running[i % len(running)].id}/stats")),
+            args.iterations,
+            sampler_coverage=round(coverage, 3)
+        )
+    if container_ids:
+        await record(
+            "api_log_tail",
+            lambda i: ok(client.get(f"/api/logs/container/{container_ids[i % len(container_ids)]}",
+                                    params={"tail": args.log_tail})),
+            args.iterations,
+            tail=args.log_tail
+        )
+    if running:
+        # Restart goes through the Engine API fast path, not the compose CLI
+        await record(
+            "api_action_restart",
+            lambda i: ok(client.post(f"/api/apps/{running[i % len(running)].id}/action", json={"action": "restart"})),
+            min(args.iterations, len(running) * 2)
+        )
+    return results
+
+
+async def run_all(args: argparse.Namespace, workdir: str, daemon: Daemon) -> List[Dict[str, Any]]:
+    from app.main import app
+
+    results = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://dockpilot", timeout=120) as client:
+            for index, (projects, services) in enumerate(args.scales):
+                root = os.path.join(workdir, f"tree-{index}-{projects}x{services}")
+                results += await run_scale(client, daemon, root, projects, services, args)
+    return results
+
+
+def parse_scales(value: str) -> List[Tuple[int, int]]:
+    scales = []
+    for item in value.split(","):
+        projects, _, services = item.strip().partition("x")
+        scales.append((int(projects), int(services or 1)))
+    return scales
+
+
+def environment_info() -> Dict[str, Any]:
+    import yaml
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "libyaml": hasattr(yaml, "CSafeLoader"),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", type=parse_scales, default=parse_scales("10x3,50x4,200x5"),
+                        help="comma-separated PROJECTSxSERVICES, e.g. 10x3,50x4")
+    parser.add_argument("--iterations", type=int, default=50, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=4, help="requests in flight for API scenarios")
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="added by the fake daemon to every request")
+    parser.add_argument("--log-tail", type=int, default=100)
+    parser.add_argument("--sampler-wait", type=float, default=5.0,
+                        help="seconds to let the stats sampler cover running containers")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="where to generate trees (default: a temporary directory)")
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="dockpilot-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    socket_path = os.path.join(workdir, "docker.sock")
+
+    # Settings are read when the app is imported, so point them at the fake daemon first
+    os.environ["DOCKER_HOST"] = f"unix://{socket_path}"
+    os.environ["DATABASE_PATH"] = os.path.join(workdir, "dockpilot.db")
+    os.environ["LOG_STORE_PATH"] = os.path.join(workdir, "logs")
+    os.environ["DISCOVERY_WATCH_ENABLED"] = "false"
+    sys.path.insert(0, BACKEND_DIR)
+
+    daemon = Daemon(socket_path, args.latency_ms)
+    daemon.start()
+    try:
+        import structlog
+
+        # Keep stdout for the results; the app only sets the processors
+        structlog.configure(
+            wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING),
+            logger_factory=structlog.PrintLoggerFactory(sys.stderr)
+        )
+        results = asyncio.run(run_all(args, workdir, daemon))
+    finally:
+        daemon.stop()
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "environment": environment_info(),
+        "config": {
+            "scales": [f"{projects}x{services}" for projects, services in args.scales],
+            "iterations": args.iterations,
+            "concurrency": args.concurrency,
+            "latency_ms": args.latency_ms,
+            "log_tail": args.log_tail,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,10 @@
 'use client'
 
-import { useEffect, useState } from 'react'
+import { useEffect, useRef, useState } from 'react'
 import { AppDashboard } from '@/components/AppDashboard'
 import { SystemStats } from '@/components/SystemStats'
 import { Header } from '@/components/Header'
-import { ComposeApp, SystemInfo, DockerInfo } from '@/types'
+import { AppUsage, ComposeApp, DashboardUpdate, SystemInfo, DockerInfo } from '@/types'
 import { apiClient } from '@/lib/api'
 
 export default function Home() {
@@ -14,12 +14,88 @@ export default function Home() {
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState<string | null>(null)
 
+  // Latest CPU/memory per app; app deltas arrive without them
+  const usageRef = useRef<Record<string, AppUsage>>({})
+
   useEffect(() => {
     loadData()
-    const interval = setInterval(loadData, 5000) // Refresh every 5 seconds
-    return () => clearInterval(interval)
+    let socket: WebSocket | null = null
+    let retry: ReturnType<typeof setTimeout> | undefined
+    let closed = false
+
+    // Updates are pushed over the WebSocket; poll only while it is down
+    const interval = setInterval(() => {
+      if (socket?.readyState !== WebSocket.OPEN) {
+        loadData()
+      }
+    }, 30000)
+
+    function connect() {
+      socket = new WebSocket(apiClient.getUpdatesSocketUrl())
+      socket.onmessage = (event) => applyUpdate(JSON.parse(event.data))
+      socket.onclose = () => {
+        if (!closed) {
+          retry = setTimeout(connect, 5000)
+        }
+      }
+    }
+    connect()
+
+    return () => {
+      closed = true
+      clearInterval(interval)
+      clearTimeout(retry)
+      socket?.close()
+    }
   }, [])
 
+  function withUsage(app: ComposeApp): ComposeApp {
+    const usage = usageRef.current[app.id]
+    if (!usage) {
+      return app
+    }
+    return {
+      ...app,
+      cpu_percent: usage.cpu_percent,
+      memory_mb: usage.memory_mb,
+      services: app.services.map((service) => ({ ...service, ...usage.services[service.name] })),
+    }
+  }
+
+  function applyUpdate(update: DashboardUpdate) {
+    switch (update.type) {
+      case 'snapshot':
+        usageRef.current = update.usage
+        setApps(update.apps.map(withUsage))
+        if (update.system) setSystemInfo(update.system)
+        if (update.engine) setDockerInfo(update.engine.docker)
+        setError(null)
+        setLoading(false)
+        break
+      case 'apps': {
+        const changed = new Map(update.changed.map((app) => [app.id, withUsage(app)]))
+        setApps((current) => {
+          const next = current
+            .filter((app) => !update.removed.includes(app.id))
+            .map((app) => changed.get(app.id) ?? app)
+          const known = new Set(next.map((app) => app.id))
+          return next.concat(Array.from(changed.values()).filter((app) => !known.has(app.id)))
+        })
+        break
+      }
+      case 'usage':
+        usageRef.current = { ...usageRef.current, ...update.apps }
+        setApps((current) => current.map((app) => (update.apps[app.id] ? withUsage(app) : app)))
+        break
+      case 'system':
+        setSystemInfo({ cpu: update.cpu, memory: update.memory, disk: update.disk, platform: update.platform })
+        break
+      case 'engine':
+        setDockerInfo(update.docker)
+        break
+    }
+  }
+
   async function loadData() {
     try {
       const [appsData, sysInfo, dockInfo] = await Promise.all([
@@ -53,7 +129,13 @@ export default function Home() {
 
   async function handleAppAction(appId: string, action: string) {
     try {
-      await apiClient.performAction(appId, action)
+      const result = await apiClient.performAction(appId, action)
+      if (result.job_id) {
+        const job = await apiClient.waitForJob(result.job_id)
+        if (job.status === 'failed') {
+          setError(job.message || `Failed to ${action} app`)
+        }
+      }
       await loadData()
     } catch (err) {
       setError(err instanceof Error ? err.message : `Failed to ${action} app`)
@@ -1,5 +1,5 @@
 import axios from 'axios'
-import { ComposeApp, SystemInfo, DockerInfo, ResourceUsage, LogEntry } from '@/types'
+import { ComposeApp, SystemInfo, DockerInfo, EngineHealth, ResourceUsage, LogEntry, Job, PortConflict } from '@/types'
 
 // Use relative URL if in browser, otherwise use env variable or default
 const getApiBaseUrl = () => {
@@ -26,7 +26,8 @@ const api = axios.create({
 export const apiClient = {
   // Apps
   async getApps(): Promise<ComposeApp[]> {
-    const response = await api.get('/api/apps/')
+    // The dashboard never shows service environment or volumes
+    const response = await api.get('/api/apps/', { params: { fields: 'summary' } })
     return response.data
   },
 
@@ -40,12 +41,49 @@ export const apiClient = {
     return response.data
   },
 
-  async performAction(appId: string, action: string): Promise<{ status: string; message: string }> {
-    const response = await api.post(`/api/apps/${appId}/action`, { action })
+  // Rebuild and pull are accepted as background jobs and return a job_id
+  // Start answers 409 when a declared host port is taken; force skips that check
+  async performAction(appId: string, action: string, force: boolean = false): Promise<{ status: string; message: string; job_id?: string }> {
+    const response = await api.post(`/api/apps/${appId}/action`, { action, force })
     return response.data
   },
 
-  async getAppStats(appId: string): Promise<{ app_id: string; app_name: string; stats: Array<{ service: string; stats: ResourceUsage }> }> {
+  // Jobs
+  async getJob(jobId: string): Promise<Job> {
+    const response = await api.get(`/api/jobs/${jobId}`)
+    return response.data
+  },
+
+  async cancelJob(jobId: string): Promise<Job> {
+    const response = await api.post(`/api/jobs/${jobId}/cancel`)
+    return response.data
+  },
+
+  async waitForJob(jobId: string, intervalMs: number = 2000): Promise<Job> {
+    for (;;) {
+      const job = await this.getJob(jobId)
+      if (['succeeded', 'failed', 'cancelled'].includes(job.status)) {
+        return job
+      }
+      await new Promise((resolve) => setTimeout(resolve, intervalMs))
+    }
+  },
+
+  getJobEventsUrl(jobId: string): string {
+    return `${API_BASE_URL}/api/jobs/${jobId}/events`
+  },
+
+  // WebSocket of dashboard updates; see DashboardUpdate for the messages
+  getUpdatesSocketUrl(): string {
+    return `${API_BASE_URL.replace(/^http/, 'ws')}/api/ws`
+  },
+
+  async performBatchAction(appIds: string[], action: string, parallelism?: number, force: boolean = false): Promise<{ action: string; results: Array<{ app_id: string; app_name: string; status: string; message: string; duration: number; conflicts?: PortConflict[] }>; succeeded: number; failed: number; skipped: number }> {
+    const response = await api.post('/api/apps/actions/batch', { app_ids: appIds, action, parallelism, force })
+    return response.data
+  },
+
+  async getAppStats(appId: string): Promise<{ app_id: string; app_name: string; stats: Array<{ service: string; stats: ResourceUsage }>; total: ResourceUsage }> {
     const response = await api.get(`/api/apps/${appId}/stats`)
     return response.data
   },
@@ -55,13 +93,18 @@ export const apiClient = {
     return response.data
   },
 
+  // Server-Sent Events stream of an app's logs; consume with EventSource
+  getAppLogsStreamUrl(appId: string, tail: number = 100): string {
+    return `${API_BASE_URL}/api/apps/${appId}/logs/stream?tail=${tail}`
+  },
+
   // Docker
   async getDockerInfo(): Promise<DockerInfo> {
     const response = await api.get('/api/docker/info')
     return response.data
   },
 
-  async getDockerStatus(): Promise<{ available: boolean; status: string }> {
+  async getDockerStatus(): Promise<{ available: boolean; status: EngineHealth | 'error'; latency_ms?: number | null; circuit?: 'open' | 'closed' }> {
     const response = await api.get('/api/docker/status')
     return response.data
   },
@@ -72,6 +115,11 @@ export const apiClient = {
     return response.data
   },
 
+  async getSystemHistory(limit?: number): Promise<{ interval: number; cores: number; history: Record<string, number[]> }> {
+    const response = await api.get('/api/system/history', { params: { limit } })
+    return response.data
+  },
+
   async getOpenPorts(): Promise<{ ports: number[]; count: number }> {
     const response = await api.get('/api/system/ports')
     return response.data
@@ -17,6 +17,7 @@ export enum ContainerState {
 }
 
 export interface PortMapping {
+  host_ip?: string
   host_port: number
   container_port: number
   protocol: string
@@ -49,6 +50,7 @@ export interface ComposeApp {
   name: string
   path: string
   compose_file: string
+  override_files: string[]
   state: AppState
   services: ServiceInfo[]
   networks: string[]
@@ -56,6 +58,7 @@ export interface ComposeApp {
   created_at?: string
   updated_at?: string
   auto_start: boolean
+  depends_on: string[]
   cpu_percent: number
   memory_mb: number
 }
@@ -68,12 +71,15 @@ export interface ResourceUsage {
   disk_write_mb: number
   network_rx_mb: number
   network_tx_mb: number
+  memory_limit_mb: number
 }
 
 export interface SystemInfo {
   cpu: {
     count: number
     percent: number
+    per_core?: number[]
+    load_average?: number[]
   }
   memory: {
     total_mb: number
@@ -87,7 +93,14 @@ export interface SystemInfo {
     free_gb: number
     percent: number
   }
+  network?: {
+    rx_mb_s: number
+    tx_mb_s: number
+    rx_total_mb: number
+    tx_total_mb: number
+  }
   platform: string
+  timestamp?: number
 }
 
 export interface DockerInfo {
@@ -113,3 +126,47 @@ export interface LogEntry {
   message: string
   stream: string
 }
+
+export interface PortConflict {
+  port: number
+  protocol: string
+  service: string
+  held_by: string[]
+}
+
+export interface Job {
+  id: string
+  app_id: string
+  app_name: string
+  action: string
+  status: 'queued' | 'running' | 'succeeded' | 'failed' | 'cancelled'
+  created_at: string
+  started_at?: string
+  finished_at?: string
+  progress?: number
+  message?: string
+  output_lines: number
+}
+
+export interface AppUsage {
+  cpu_percent: number
+  memory_mb: number
+  services: Record<string, { cpu_percent: number; memory_mb: number; memory_limit_mb?: number }>
+}
+
+export type EngineHealth = 'healthy' | 'degraded' | 'unavailable' | 'unknown'
+
+export interface EngineStatus {
+  available: boolean
+  status: EngineHealth
+  events_connected: boolean
+  docker: DockerInfo | null
+}
+
+// Messages pushed over the /api/ws WebSocket
+export type DashboardUpdate =
+  | { type: 'snapshot'; apps: ComposeApp[]; usage: Record<string, AppUsage>; system: SystemInfo | null; engine: EngineStatus | null }
+  | { type: 'apps'; changed: ComposeApp[]; removed: string[] }
+  | { type: 'usage'; apps: Record<string, AppUsage> }
+  | ({ type: 'system' } & SystemInfo)
+  | ({ type: 'engine' } & EngineStatus)